@@ -6,23 +6,37 @@ import random
 import re
 import time
 import secrets
+import threading
 from datetime import timedelta
 import base64 # type: ignore
 
 # Import from our new modules
 from session_manager import (
     initialize_user_session, get_user_session, is_session_expired,
-    get_session_time_remaining, get_session_warning, cleanup_expired_sessions,
-    update_conversation_memory, enhance_memory_retention, get_memory_context,
-    session_conversations
+    get_session_time_remaining, get_session_warning, get_session_stats,
+    update_conversation_memory, enhance_memory_retention, get_memory_context, mark_memory_changed,
+    save_user_session, session_lock, CONTEXT_HISTORY_MESSAGES
 )
-from scientific_visualizations import process_scientific_content, format_scientific_response
-from mathematical_utils import process_mathematical_content, format_mathematical_response
+from scientific_visualizations import plan_scientific_content, render_scientific_content, format_scientific_response
+from mathematical_utils import plan_mathematical_content, render_mathematical_content, format_mathematical_response
 from web_utils import (
-    get_external_knowledge, handle_special_queries, get_dynamic_netra_info,
+    start_external_research, finish_external_research, handle_special_queries, get_dynamic_netra_info,
     analyze_query_domain, build_diverse_context
 )
 from knowledge_base import KNOWLEDGE_DOMAINS, COMPANY_INFO
+from engine_router import route_to_engine
+from query_features import extract_query_features
+from analysis_cache import get_cache_stats
+from http_client import get_upstream_stats
+from response_cache import get_response_cache_stats
+from single_flight import get_single_flight_stats
+from circuit_breaker import get_breaker_stats
+from help_index import help_index
+from help_pages import get_help_page_stats, help_pages
+from help_snapshot import (
+    HELP_SNAPSHOT_PATH, load_help_snapshot, reload_help_snapshot, save_help_snapshot, snapshot_sweep_owner
+)
+from message_record import assistant_message, user_message
 
 # IMPORT THE NEW ENGINES
 from physics_engine import physics_engine
@@ -39,87 +53,6 @@ CORS(app)
 # Initialize OpenAI client
 client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
 
-def route_to_engine(message):
-    """Determine which engine to use based on message content"""
-    message_lower = message.lower()
-    
-    # EXPANDED Netra keywords for better detection
-    netra_keywords = [
-        # App name and company
-        'netra', 'strobid', 'jovira',
-        
-        # Account related
-        'account', 'password', 'login', 'signup', 'register', 'sign up', 'log in',
-        'create account', 'new account', 'delete account', 'close account',
-        'verify', 'verification', 'otp', 'code', 'confirm',
-        'forgot password', 'reset password', 'change password',
-        
-        # Support related
-        'support', 'help', 'assist', 'customer service', 'contact',
-        'issue', 'problem', 'ticket', 'complaint', 'not working',
-        'broken', 'error', 'urgent', 'help desk',
-        
-        # Payment related
-        'payment', 'pay', 'billing', 'invoice', 'subscription',
-        'subscribe', 'premium', 'plan', 'upgrade', 'downgrade',
-        'refund', 'money', 'transaction', 'charge',
-        
-        # Features
-        'notification', 'alert', 'setting', 'preference',
-        'profile', 'photo', 'picture', 'avatar',
-        'message', 'chat', 'conversation',
-        
-        # Service related
-        'provider', 'client', 'service', 'book', 'booking',
-        'hire', 'review', 'rating', 'feedback',
-        
-        # How-to questions
-        'how to', 'how do i', 'can i', 'where do i',
-        'what is netra', 'tell me about netra',
-        'netra app', 'about netra'
-    ]
-    
-    # Check for Netra-related queries (HIGHEST PRIORITY)
-    if any(keyword in message_lower for keyword in netra_keywords):
-        print(f"🔍 Routing to Netra Engine: {message[:50]}...")
-        return 'netra'
-    
-    # Physics queries
-    physics_keywords = [
-        'physics', 'force', 'velocity', 'acceleration', 'energy',
-        'projectile', 'pendulum', 'circular motion', 'inclined plane',
-        'newton', 'kinematics', 'mechanics', 'gravity', 'friction',
-        'momentum', 'torque', 'electric field', 'magnetic field'
-    ]
-    
-    if any(keyword in message_lower for keyword in physics_keywords):
-        return 'physics'
-    
-    # Chemistry queries
-    chemistry_keywords = [
-        'chemistry', 'chemical', 'reaction', 'molecule', 'compound',
-        'organic', 'inorganic', 'periodic', 'bond', 'reaction',
-        'synthesis', 'aromatic', 'benzene', 'friedel', 'crafts',
-        'atom', 'element', 'periodic table', 'organic chemistry'
-    ]
-    
-    if any(keyword in message_lower for keyword in chemistry_keywords):
-        return 'chemistry'
-    
-    # Biology queries
-    biology_keywords = [
-        'biology', 'biological', 'cell', 'dna', 'protein',
-        'metabolism', 'krebs', 'glycolysis', 'mitochondria',
-        'enzyme', 'respiration', 'photosynthesis', 'krebs cycle',
-        'cell structure', 'dna replication', 'protein synthesis'
-    ]
-    
-    if any(keyword in message_lower for keyword in biology_keywords):
-        return 'biology'
-    
-    # Default to general AI
-    return 'general'
-
 def format_netra_response(engine_response):
     """
     Format Netra engine response for the chat
@@ -174,16 +107,54 @@ def format_science_response(engine_response, engine_type):
     
     return None
 
+_help_center_started = False
+_help_center_lock = threading.Lock()
+
+def start_help_center():
+    """
+    Load the help snapshot, take part in the refresh sweep and warm the help page.
+    
+    Runs once per worker, on its first request (not at import, so tools and
+    benchmarks that import the engines start no threads and fetch nothing).
+    """
+    global _help_center_started
+    if _help_center_started:
+        return
+    with _help_center_lock:
+        if _help_center_started:
+            return
+        
+        # The snapshot lets a new worker start with the pages and index already loaded
+        help_pages.on_change(save_help_snapshot)
+        load_help_snapshot()
+        if HELP_SNAPSHOT_PATH:
+            # One worker refreshes the help center and saves the snapshot; the others reload its saves
+            help_pages.set_sweep_owner(snapshot_sweep_owner, follow=reload_help_snapshot)
+        
+        # Pages are cached and revalidated in the background by help_pages
+        help_pages.warm(netra_engine.help_url)
+        _help_center_started = True
+
+@app.before_request
+def start_background_work():
+    """Start this worker's background work with its first request"""
+    start_help_center()
+
+@app.teardown_request
+def write_back_session(exception=None):
+    """Hand the session this request touched to the session store's write-back buffer (even if the request failed)"""
+    try:
+        save_user_session()
+    except Exception as e:
+        print(f"Session save error: {e}")
+
 @app.route("/")
 def home():
     return render_template("index.html")
 
 @app.route("/chat", methods=["POST"])
 def chat():
-    # Clean up expired sessions periodically
-    if random.random() < 0.1:
-        cleanup_expired_sessions()
-    
+    # Expired sessions are removed by the session janitor thread, not here
     data = request.get_json()
     message = data.get("message", "").strip()
     
@@ -191,29 +162,31 @@ def chat():
         return jsonify({"reply": "Please enter a message."}), 400
 
     try:
-        # Get user session
-        user_session = get_user_session()
-        
-        # Check if session is expired
-        if is_session_expired():
-            session.clear()
-            return jsonify({
-                "reply": "⏰ **Session Expired**: Your 20-minute chat session has ended. Please refresh the page to start a new session with Jovira.",
-                "session_expired": True
-            })
-        
-        # Check for session warning
-        session_warning = get_session_warning(user_session)
+        # The session's lock is held only while this request reads or changes the session,
+        # never across engine or LLM calls
+        with session_lock():
+            # Get user session
+            user_session = get_user_session()
+            
+            # Check if session is expired
+            if is_session_expired():
+                session.clear()
+                return jsonify({
+                    "reply": "⏰ **Session Expired**: Your 20-minute chat session has ended. Please refresh the page to start a new session with Jovira.",
+                    "session_expired": True
+                })
+            
+            # Check for session warning
+            session_warning = get_session_warning(user_session)
+            
+            # Update conversation context
+            user_session.conversation_context.append(user_message(message))
         
-        # Update conversation context
-        user_session['conversation_context'].append({
-            'sender': 'user',
-            'text': message,
-            'timestamp': time.time()
-        })
+        # Analyze the message once; every classifier below reuses these features
+        features = extract_query_features(message)
         
         # ROUTE TO APPROPRIATE ENGINE
-        engine_type = route_to_engine(message)
+        engine_type = route_to_engine(message, features)
         engine_response = None
         ai_response = None
         
@@ -224,7 +197,8 @@ def chat():
             try:
                 engine_response = netra_engine.process_query(
                     message=message, 
-                    user_id=session.get('user_id', 'anonymous')
+                    user_id=session.get('session_id'),
+                    features=features
                 )
                 
                 if engine_response and engine_response.get('response'):
@@ -254,7 +228,7 @@ def chat():
         elif engine_type == 'physics':
             # Use Physics Engine
             try:
-                engine_response = physics_engine.process_physics_query(message)
+                engine_response = physics_engine.process_physics_query(message, features)
                 ai_response = format_science_response(engine_response, 'physics')
             except Exception as e:
                 print(f"Physics Engine error: {e}")
@@ -263,7 +237,7 @@ def chat():
         elif engine_type == 'chemistry':
             # Use Chemistry Engine
             try:
-                engine_response = chemistry_engine.process_chemistry_query(message)
+                engine_response = chemistry_engine.process_chemistry_query(message, features)
                 ai_response = format_science_response(engine_response, 'chemistry')
             except Exception as e:
                 print(f"Chemistry Engine error: {e}")
@@ -272,7 +246,7 @@ def chat():
         elif engine_type == 'biology':
             # Use Biology Engine
             try:
-                engine_response = biology_engine.process_biology_query(message)
+                engine_response = biology_engine.process_biology_query(message, features)
                 ai_response = format_science_response(engine_response, 'biology')
             except Exception as e:
                 print(f"Biology Engine error: {e}")
@@ -280,25 +254,22 @@ def chat():
             
         else:
             # Use existing OpenAI flow for general queries
-            ai_response = get_ai_response(message, user_session['conversation_context'], user_session)
+            ai_response = get_ai_response(message, user_session.conversation_context, user_session, features)
             suggestions = []
         
         # If no response from specialized engines, fallback to general AI
         if not ai_response and engine_type != 'netra':
-            ai_response = get_ai_response(message, user_session['conversation_context'], user_session)
+            ai_response = get_ai_response(message, user_session.conversation_context, user_session, features)
             suggestions = []
         
         if ai_response:
-            # Update memory with this interaction
-            enhance_memory_retention(user_session, message, ai_response)
-            update_conversation_memory(user_session, message, ai_response)
-            
-            # Add to conversation context
-            user_session['conversation_context'].append({
-                'sender': 'assistant', 
-                'text': ai_response, 
-                'timestamp': time.time()
-            })
+            with session_lock():
+                # Update memory with this interaction
+                enhance_memory_retention(user_session, message, ai_response, features)
+                update_conversation_memory(user_session, message, ai_response, features)
+                
+                # Add to conversation context
+                user_session.conversation_context.append(assistant_message(ai_response))
             
             response_data = {"reply": ai_response}
             
@@ -324,14 +295,11 @@ def chat():
         ]
         
         reply = random.choice(fallback_responses)
-        enhance_memory_retention(user_session, message, reply)
-        update_conversation_memory(user_session, message, reply)
-        
-        user_session['conversation_context'].append({
-            'sender': 'assistant',
-            'text': reply,
-            'timestamp': time.time()
-        })
+        with session_lock():
+            enhance_memory_retention(user_session, message, reply, features)
+            update_conversation_memory(user_session, message, reply, features)
+            
+            user_session.conversation_context.append(assistant_message(reply))
         
         response_data = {"reply": reply}
         if session_warning:
@@ -348,51 +316,61 @@ def chat():
         ]
         return jsonify({"reply": random.choice(error_responses)})
 
-def get_ai_response(message, conversation_context, user_session=None):
+def get_ai_response(message, conversation_context, user_session=None, features=None):
     """Enhanced AI response with memory, calculations, and proper formatting"""
     try:
-        user_name = user_session.get('user_name', 'there')
+        features = extract_query_features(message, features)
+        user_name = user_session.user_name or 'there'
         
         # Check for special queries first (time, calculations, etc.)
-        special_response = handle_special_queries(message)
+        special_response = handle_special_queries(message, features)
         if special_response:
             return special_response
         
-        # Process scientific content (physics, biology, chemistry)
-        scientific_content = process_scientific_content(message)
-        if any([scientific_content['physics_visualizations'], 
-                scientific_content['biology_visualizations'],
-                scientific_content['chemical_mechanisms']]):
-            
-            scientific_response = format_scientific_response(scientific_content)
+        # Scientific content (physics, biology, chemistry): detect first, render only what was asked for
+        science_plan = plan_scientific_content(message, features)
+        if science_plan:
+            scientific_response = format_scientific_response(render_scientific_content(science_plan))
             if scientific_response:
                 return scientific_response
         
-        # Process mathematical content (LaTeX, visualizations, calculations)
-        math_content = process_mathematical_content(message)
-        if any(math_content.values()):
-            user_session['mathematical_requests'] = user_session.get('mathematical_requests', 0) + 1
-            math_response = format_mathematical_response(math_content)
-            if math_response:
-                return math_response
+        # Mathematical content (LaTeX, visualizations, calculations): same detect-then-render split
+        math_plan = plan_mathematical_content(message, features)
+        if any(math_plan.values()):
+            math_content = render_mathematical_content(math_plan)
+            if any(math_content.values()):
+                with session_lock():
+                    user_session.mathematical_requests += 1
+                math_response = format_mathematical_response(math_content)
+                if math_response:
+                    return math_response
         
-        # Analyze which knowledge domains are relevant
-        relevant_domains = analyze_query_domain(message)
+        # Start external research now so the lookups run while the prompt is assembled
+        research = start_external_research(message, features)
         
-        # Get external knowledge for factual queries
-        external_info = get_external_knowledge(message)
-        if external_info['sources_used']:
-            user_session['external_searches'] = user_session.get('external_searches', 0) + 1
-            print(f"External search performed. Sources used: {external_info['sources_used']}")
+        # Analyze which knowledge domains are relevant
+        relevant_domains = analyze_query_domain(message, features)
         
         # Update user preferences based on usage
-        if len(user_session.get('preferred_domains', [])) < 5:
-            for domain in relevant_domains:
-                if domain not in user_session.get('preferred_domains', []):
-                    user_session.setdefault('preferred_domains', []).append(domain)
-        
-        # Get diverse context including memory, Netra information and external research
-        diverse_context = build_diverse_context(user_session, relevant_domains, message, external_info)
+        with session_lock():
+            if len(user_session.peek('preferred_domains')) < 5:
+                for domain in relevant_domains:
+                    if domain not in user_session.peek('preferred_domains'):
+                        user_session.preferred_domains.append(domain)
+        
+        # Get external knowledge for factual queries (waits at most until the research deadline)
+        external_info = finish_external_research(research, features)
+        
+        # Everything read from or written to the session happens here, under its lock
+        with session_lock():
+            if external_info['sources_used']:
+                user_session.external_searches += 1
+                print(f"External search performed. Sources used: {external_info['sources_used']}")
+            
+            # Get diverse context including memory, Netra information and external research
+            diverse_context = build_diverse_context(user_session, relevant_domains, message, external_info)
+            memory_context = get_memory_context(user_session)
+            history = list(conversation_context)[-CONTEXT_HISTORY_MESSAGES:]
         
         # Build comprehensive system message with enhanced memory
         system_message = f"""
@@ -448,7 +426,7 @@ def get_ai_response(message, conversation_context, user_session=None):
 
         USER CONTEXT:
         - Name: {user_name}
-        - Memory: {get_memory_context(user_session)}
+        - Memory: {memory_context}
         - Relevant domains: {', '.join([KNOWLEDGE_DOMAINS[d]['name'] for d in relevant_domains]) if relevant_domains else 'General'}
         - External sources used: {', '.join(external_info['sources_used']) if external_info['sources_used'] else 'None'}
         """
@@ -456,10 +434,8 @@ def get_ai_response(message, conversation_context, user_session=None):
         context_messages = [{"role": "system", "content": system_message}]
         
         # Add conversation history
-        if conversation_context:
-            for msg in conversation_context[-10:]:
-                role = "user" if msg.get('sender') == 'user' else "assistant"
-                context_messages.append({"role": role, "content": msg.get('text', '')})
+        for msg in history:
+            context_messages.append({"role": msg.sender, "content": msg.text})
         
         # Add current message
         context_messages.append({"role": "user", "content": message})
@@ -473,8 +449,9 @@ def get_ai_response(message, conversation_context, user_session=None):
         
         ai_response = response.choices[0].message.content.strip()
         
-        # Enhance memory with this interaction
-        enhance_memory_retention(user_session, message, ai_response)
+        # Enhance memory with this interaction (chat() calls it again; only the first call does the work)
+        with session_lock():
+            enhance_memory_retention(user_session, message, ai_response, features)
         
         return ai_response
         
@@ -507,6 +484,21 @@ def session_status():
         "message": f"Session active - {time_remaining} minutes remaining"
     })
 
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Upstream HTTP and analysis cache counters for monitoring"""
+    return jsonify({
+        "upstreams": get_upstream_stats(),
+        "caches": get_cache_stats(),
+        "responses": get_response_cache_stats(),
+        "single_flight": get_single_flight_stats(),
+        "breakers": get_breaker_stats(),
+        "help_pages": get_help_page_stats(),
+        "help_index": help_index.stats(),
+        "netra_memory": netra_engine.memory.stats(),
+        "sessions": get_session_stats()
+    })
+
 @app.route("/start_new_session", methods=["POST"])
 def start_new_session():
     """Start a new session"""
@@ -519,11 +511,7 @@ def start_new_session():
         "🆕 **New Chat Session**! Great to see you! You have 20 minutes for this conversation. Ask me anything about Netra!"
     ]
     
-    user_session['conversation_context'].append({
-        'sender': 'assistant',
-        'text': random.choice(welcome_messages),
-        'timestamp': time.time()
-    })
+    user_session.conversation_context.append(assistant_message(random.choice(welcome_messages)))
     
     return jsonify({
         "status": "success",
@@ -648,10 +636,12 @@ def generate_image_endpoint():
 @app.route("/clear_history", methods=["POST"])
 def clear_history():
     """Endpoint to clear conversation history"""
-    user_session = get_user_session()
-    user_session['conversation_context'] = []
-    user_session['memory_retention'] = {}
-    user_session['calculation_history'] = []
+    with session_lock():
+        user_session = get_user_session()
+        user_session.conversation_context.clear()
+        user_session.memory_retention = None
+        user_session.calculation_history = None
+        mark_memory_changed(user_session)
     
     return jsonify({
         "status": "success", 
@@ -0,0 +1,98 @@
+"""
+Micro-benchmark for help center search - line-by-line substring scan versus the BM25 index
+
+Run from the repository root:  python benchmarks/bench_help_search.py [--sections N]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from help_index import HelpIndex
+
+TOPICS = [
+    ("Creating an account", "Download the Netra app, tap Create Account, enter your email and verify it with the code we send."),
+    ("Deleting your account", "Go to Settings > Account > Delete Account and confirm with your password. Deletion is permanent."),
+    ("Booking a provider", "Open a provider profile, pick a service, date and time, and confirm the booking in the app."),
+    ("Payments", "Pay by card or mobile money. A deposit confirms the booking and the balance is due after the service."),
+    ("Refunds", "If a provider cancels, your deposit is refunded to the original payment method within three days."),
+    ("Ratings and reviews", "After a completed booking you can rate the provider from one to five stars and leave a review."),
+    ("Notifications", "Choose which booking, payment and chat alerts you receive under Settings > Notifications."),
+    ("Contacting support", "Email support@strobid.com or use the in-app chat under Settings > Help & Support."),
+]
+
+QUERIES = [
+    "How do I get a refund if the provider cancels?",
+    "can i delete my account",
+    "which payment methods are accepted",
+    "how do ratings work",
+    "turn off notifications",
+]
+
+
+def build_page(sections):
+    """Help page text with the given number of sections, cycling through TOPICS"""
+    lines = []
+    for i in range(sections):
+        title, body = TOPICS[i % len(TOPICS)]
+        lines.extend((f"{title} ({i})", body))
+    return '\n'.join(lines)
+
+
+def legacy_search(content, query):
+    """Original _search_help_center scan (kept for comparison)"""
+    query_lower = query.lower()
+    relevant_lines = []
+    for line in content.split('\n'):
+        line_lower = line.lower()
+        if len(line) > 30:
+            if any(word in line_lower for word in query_lower.split()):
+                relevant_lines.append(line)
+    return relevant_lines[:3]
+
+
+def measure(search, seconds=2.0):
+    """Return queries/sec for search over QUERIES"""
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for query in QUERIES:
+            search(query)
+        count += len(QUERIES)
+    return count / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sections', type=int, default=400)
+    args = parser.parse_args(argv)
+
+    content = build_page(args.sections)
+    index = HelpIndex()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        index.update_page('https://netra.strobid.com/help', content)
+    build_ms = 1000 * (time.perf_counter() - started)
+
+    before = measure(lambda query: legacy_search(content, query))
+    after = measure(lambda query: index.search(query, k=3))
+
+    print(f"Help page: {len(content):,} chars, {index.stats()['passages']} passages (indexed in {build_ms:.1f} ms)")
+    print(f"  Before (line scan): {before:,.0f} queries/sec ({1000 / before:.3f} ms/query)")
+    print(f"  After (BM25 index): {after:,.0f} queries/sec ({1000 / after:.3f} ms/query)")
+    print(f"  Speed-up: {after / before:.2f}x")
+    print()
+    for query in QUERIES[:2]:
+        print(f"{query!r}")
+        print(f"  line scan: {legacy_search(content, query)[0]!r}")
+        print(f"  BM25:      {index.search(query, k=1)[0]['text']!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Memory benchmark for conversation histories - dict records versus slotted Message records
+
+Builds a synthetic load of sessions, each with a conversation_context and a
+ConversationMemory-style history, once with the old dict records (ISO string
+timestamps in ConversationMemory) and once with message_record.Message, and
+reports the bytes allocated per session as measured by tracemalloc.
+
+Message texts are allocated the same way in both layouts, so the difference
+is the record overhead alone.
+
+Run from the repository root:  python benchmarks/bench_message_records.py [--sessions N] [--turns N]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from message_record import assistant_message, user_message
+
+
+def make_text(session, turn, sender):
+    """A distinct message text, so no two records share a string"""
+    return f"{sender} message {turn} of session {session}: how do bookings and payments work on Netra?"
+
+
+def dict_sessions(sessions, turns):
+    """Old layout: dict per turn in the session context and in ConversationMemory"""
+    store = []
+    for s in range(sessions):
+        context = []
+        history = []
+        for t in range(turns):
+            message, reply = make_text(s, t, 'user'), make_text(s, t, 'assistant')
+            context.append({'sender': 'user', 'text': message, 'timestamp': time.time()})
+            context.append({'sender': 'assistant', 'text': reply, 'timestamp': time.time()})
+            history.append({'timestamp': datetime.now().isoformat(), 'message': message, 'response': reply})
+        store.append((context, history[-10:]))
+    return store
+
+
+def slotted_sessions(sessions, turns):
+    """New layout: Message records in both places"""
+    store = []
+    for s in range(sessions):
+        context = []
+        history = deque(maxlen=20)
+        for t in range(turns):
+            message, reply = make_text(s, t, 'user'), make_text(s, t, 'assistant')
+            context.append(user_message(message))
+            context.append(assistant_message(reply))
+            now = time.time()
+            history.extend((user_message(message, now), assistant_message(reply, now)))
+        store.append((context, history))
+    return store
+
+
+def text_only(sessions, turns):
+    """Just the message texts, to subtract from both layouts"""
+    return [[(make_text(s, t, 'user'), make_text(s, t, 'assistant')) for t in range(turns)] for s in range(sessions)]
+
+
+def measure(build, sessions, turns):
+    """Bytes still allocated after build(sessions, turns)"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        store = build(sessions, turns)
+        allocated = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del store
+    return allocated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sessions', type=int, default=10000)
+    parser.add_argument('--turns', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    texts = measure(text_only, args.sessions, args.turns)
+    old = measure(dict_sessions, args.sessions, args.turns)
+    new = measure(slotted_sessions, args.sessions, args.turns)
+
+    per_session = lambda total: total / args.sessions
+    print(f"{args.sessions:,} sessions x {args.turns} turns")
+    print(f"  Message texts alone:        {per_session(texts):>9,.0f} bytes/session")
+    print(f"  Before (dict records):      {per_session(old):>9,.0f} bytes/session "
+          f"({per_session(old - texts):,.0f} record overhead)")
+    print(f"  After (slotted Message):    {per_session(new):>9,.0f} bytes/session "
+          f"({per_session(new - texts):,.0f} record overhead)")
+    print(f"  Reduction: {100 * (old - new) / old:.1f}% total, "
+          f"{100 * (old - new) / (old - texts):.1f}% of record overhead")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Micro-benchmark for route_to_engine - messages/sec before and after the shared keyword matcher
+
+The same few messages are routed over and over, so route_to_engine itself would
+only be timing routing_cache hits. The matcher is timed as route_by_keywords on
+fresh QueryFeatures, and route_to_engine with the routing cache cleared before
+every call (a cache miss: the matcher plus the cache key and the cache itself).
+
+Run from the repository root:  python benchmarks/bench_route_to_engine.py
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis_cache import routing_cache
+from engine_router import route_by_keywords, route_to_engine
+from query_features import QueryFeatures
+
+
+def legacy_route_to_engine(message):
+    """Original per-call keyword lists and repeated substring scans (kept for comparison)"""
+    message_lower = message.lower()
+    
+    # EXPANDED Netra keywords for better detection
+    netra_keywords = [
+        # App name and company
+        'netra', 'strobid', 'jovira',
+        
+        # Account related
+        'account', 'password', 'login', 'signup', 'register', 'sign up', 'log in',
+        'create account', 'new account', 'delete account', 'close account',
+        'verify', 'verification', 'otp', 'code', 'confirm',
+        'forgot password', 'reset password', 'change password',
+        
+        # Support related
+        'support', 'help', 'assist', 'customer service', 'contact',
+        'issue', 'problem', 'ticket', 'complaint', 'not working',
+        'broken', 'error', 'urgent', 'help desk',
+        
+        # Payment related
+        'payment', 'pay', 'billing', 'invoice', 'subscription',
+        'subscribe', 'premium', 'plan', 'upgrade', 'downgrade',
+        'refund', 'money', 'transaction', 'charge',
+        
+        # Features
+        'notification', 'alert', 'setting', 'preference',
+        'profile', 'photo', 'picture', 'avatar',
+        'message', 'chat', 'conversation',
+        
+        # Service related
+        'provider', 'client', 'service', 'book', 'booking',
+        'hire', 'review', 'rating', 'feedback',
+        
+        # How-to questions
+        'how to', 'how do i', 'can i', 'where do i',
+        'what is netra', 'tell me about netra',
+        'netra app', 'about netra'
+    ]
+    
+    # Check for Netra-related queries (HIGHEST PRIORITY)
+    if any(keyword in message_lower for keyword in netra_keywords):
+        return 'netra'
+    
+    # Physics queries
+    physics_keywords = [
+        'physics', 'force', 'velocity', 'acceleration', 'energy',
+        'projectile', 'pendulum', 'circular motion', 'inclined plane',
+        'newton', 'kinematics', 'mechanics', 'gravity', 'friction',
+        'momentum', 'torque', 'electric field', 'magnetic field'
+    ]
+    
+    if any(keyword in message_lower for keyword in physics_keywords):
+        return 'physics'
+    
+    # Chemistry queries
+    chemistry_keywords = [
+        'chemistry', 'chemical', 'reaction', 'molecule', 'compound',
+        'organic', 'inorganic', 'periodic', 'bond', 'reaction',
+        'synthesis', 'aromatic', 'benzene', 'friedel', 'crafts',
+        'atom', 'element', 'periodic table', 'organic chemistry'
+    ]
+    
+    if any(keyword in message_lower for keyword in chemistry_keywords):
+        return 'chemistry'
+    
+    # Biology queries
+    biology_keywords = [
+        'biology', 'biological', 'cell', 'dna', 'protein',
+        'metabolism', 'krebs', 'glycolysis', 'mitochondria',
+        'enzyme', 'respiration', 'photosynthesis', 'krebs cycle',
+        'cell structure', 'dna replication', 'protein synthesis'
+    ]
+    
+    if any(keyword in message_lower for keyword in biology_keywords):
+        return 'biology'
+    
+    # Default to general AI
+    return 'general'
+
+
+SENTENCES = [
+    "I have been thinking about this for a while now.",
+    "My cousin said the market near the old bus park was closed yesterday.",
+    "We drove out to the lake and watched the sunset over the hills.",
+    "The recipe calls for two cups of flour, some sugar and a pinch of salt.",
+    "Nobody at the office seemed to know the answer either.",
+    "It rained all weekend so the football match was moved to Tuesday.",
+    "Could you walk through everything slowly without skipping details?",
+    "Last year our neighbours planted mangoes, beans and a few avocado trees.",
+]
+
+
+def long_message(ending, sentences=120):
+    """Build a ~7k character message whose deciding keyword (if any) is at the very end"""
+    body = " ".join(SENTENCES[i % len(SENTENCES)] for i in range(sentences))
+    return f"{body} {ending}"
+
+
+ENDINGS = [
+    "So what is a good recipe for dinner tonight?",
+    "So what is the velocity of a falling rock?",
+    "So how does benzene react in nitration?",
+    "So explain the krebs cycle please.",
+    "So how do i reset my password?",
+]
+
+SHORT_MESSAGES = ENDINGS
+LONG_MESSAGES = [long_message(ending) for ending in ENDINGS]
+
+
+def match_keywords(message):
+    """The keyword matcher and routing rules alone, as on a routing cache miss"""
+    return route_by_keywords(QueryFeatures(message))
+
+
+def route_uncached(message):
+    """route_to_engine on a routing cache miss"""
+    routing_cache.clear()
+    return route_to_engine(message)
+
+
+def measure(route, messages, seconds=2.0):
+    """Return messages/sec for route over the given messages"""
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for message in messages:
+            route(message)
+        count += len(messages)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    # Silence the routing log line so it does not dominate the timing
+    # Routes are not compared here: the token matcher deliberately disagrees with the
+    # substring scan on words like "planted" (see dispatch_regression.py)
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = [
+            (label, messages, measure(legacy_route_to_engine, messages),
+             measure(match_keywords, messages), measure(route_uncached, messages))
+            for label, messages in (("Short", SHORT_MESSAGES), ("Long", LONG_MESSAGES))
+        ]
+
+    for label, messages, before, matcher, uncached in results:
+        average = sum(map(len, messages)) // len(messages)
+        print(f"{label} messages (~{average} chars)")
+        print(f"  Before (per-call keyword lists):   {before:,.0f} messages/sec")
+        print(f"  After (token matcher):             {matcher:,.0f} messages/sec ({matcher / before:.2f}x)")
+        print(f"  After (route_to_engine, uncached): {uncached:,.0f} messages/sec ({uncached / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
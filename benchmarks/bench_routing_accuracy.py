@@ -0,0 +1,141 @@
+"""
+Routing accuracy and latency benchmark over benchmarks/routing_corpus.jsonl
+
+For route_to_engine, analyze_query_domain and handle_special_queries it reports
+classification accuracy and p50/p99 latency per call, so a routing change can be
+checked for extra LLM fallbacks or CPU cost before it ships.
+
+Run from the repository root:  python benchmarks/bench_routing_accuracy.py [--corpus PATH]
+
+Analysis caches are cleared before every timed call, so latencies are for the
+uncached path. Currency and weather lookups are replaced with canned data so
+only our own CPU time is measured.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import web_utils
+from analysis_cache import domain_cache, routing_cache
+from engine_router import route_to_engine
+from web_utils import analyze_query_domain, handle_special_queries
+
+DEFAULT_CORPUS = os.path.join(ROOT, "benchmarks", "routing_corpus.jsonl")
+
+CANNED_RATES = {'EUR': 0.92, 'GBP': 0.79, 'KES': 129.5, 'UGX': 3700.0, 'TZS': 2600.0}
+CANNED_WEATHER = {
+    'city': 'Kampala', 'temperature': 24.0, 'description': 'scattered clouds',
+    'humidity': 70, 'wind_speed': 3.1
+}
+
+
+def special_kind(reply):
+    """Map a handle_special_queries reply back to the kind of query it answered"""
+    if not reply:
+        return None
+    if reply.startswith('⏰'):
+        return 'time'
+    if reply.startswith('💰') or 'exchange rates' in reply:
+        return 'currency'
+    if reply.startswith('🌤️') or 'weather information' in reply:
+        return 'weather'
+    return 'other'
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def timed(function, message):
+    """Call function on message with caches cleared; return (result, microseconds)"""
+    routing_cache.clear()
+    domain_cache.clear()
+    start = time.perf_counter_ns()
+    result = function(message)
+    return result, (time.perf_counter_ns() - start) / 1000
+
+
+def run(records):
+    checks = {
+        'route_to_engine': (route_to_engine, 'engine', lambda result: result),
+        'analyze_query_domain': (analyze_query_domain, 'domain', lambda result: result),
+        'handle_special_queries': (handle_special_queries, 'special', special_kind),
+    }
+
+    report = {}
+    for name, (function, label, classify) in checks.items():
+        latencies = []
+        correct = 0
+        scored = 0
+        per_category = defaultdict(lambda: [0, 0])
+
+        for record in records:
+            result, micros = timed(function, record['message'])
+            latencies.append(micros)
+
+            expected = record[label]
+            if label == 'domain':
+                if expected is None:
+                    continue
+                hit = expected in result
+            else:
+                hit = classify(result) == expected
+
+            scored += 1
+            correct += hit
+            per_category[record['category']][0] += hit
+            per_category[record['category']][1] += 1
+
+        report[name] = {
+            'accuracy': correct / scored if scored else 0.0,
+            'scored': scored,
+            'p50_us': percentile(latencies, 0.50),
+            'p99_us': percentile(latencies, 0.99),
+            'per_category': {category: hits / total for category, (hits, total) in per_category.items()},
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--json', action='store_true', help="print the raw report as JSON")
+    args = parser.parse_args(argv)
+
+    with open(args.corpus, encoding='utf-8') as corpus:
+        records = [json.loads(line) for line in corpus if line.strip()]
+
+    with mock.patch.object(web_utils, 'get_currency_rates', lambda *a, **k: dict(CANNED_RATES)), \
+            mock.patch.object(web_utils, 'get_weather', lambda *a, **k: dict(CANNED_WEATHER)), \
+            contextlib.redirect_stdout(io.StringIO()):
+        report = run(records)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Corpus: {len(records)} queries ({args.corpus})\n")
+    print(f"{'function':<24}{'accuracy':>10}{'p50 (µs)':>11}{'p99 (µs)':>11}")
+    for name, result in report.items():
+        print(f"{name:<24}{result['accuracy']:>10.1%}{result['p50_us']:>11.1f}{result['p99_us']:>11.1f}")
+
+    for name, result in report.items():
+        breakdown = ", ".join(f"{category} {score:.0%}" for category, score in sorted(result['per_category'].items()))
+        print(f"\n{name} by category: {breakdown}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Memory benchmark for live sessions - 25-key session dicts versus slotted UserSession objects
+
+Builds N live sessions (50,000 by default) in a fresh child process per layout
+and reports the resident set size (RSS) growth per session, plus the encoded
+size each layout takes in a shared session store (zlib JSON of the whole dict
+before, UserSession.to_bytes after: zlib JSON of the values in field order).
+
+Every session has the same short conversation in both layouts: a few turns
+of conversation_context, recent topics, domain counters and preferred domains;
+interests, personal details, remembered facts and calculation history stay
+empty, as they do in most real sessions.
+
+Run from the repository root:  python benchmarks/bench_user_session.py [--sessions N] [--turns N]
+"""
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+import zlib
+from collections import deque
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from message_record import assistant_message, user_message
+from user_session import UserSession
+
+DOMAINS = ['general_tech', 'physics', 'science', 'mathematics', 'netra']
+
+
+def rss_bytes():
+    """Current resident set size of this process"""
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def dict_session(index, turns):
+    """The session dict initialize_user_session used to build, after a short conversation"""
+    now = time.time()
+    session_data = {
+        'session_start': now,
+        'conversation_context': deque(maxlen=10),
+        'last_topic': None,
+        'question_count': 0,
+        'user_name': None,
+        'user_interests': [],
+        'conversation_stage': 'greeting',
+        'mood': 'friendly',
+        'remembered_facts': {},
+        'recent_topics': [],
+        'personal_details': {},
+        'image_requests': 0,
+        'coding_help_requests': 0,
+        'voice_requests': 0,
+        'browsing_sessions': 0,
+        'preferred_domains': [],
+        'knowledge_usage': {},
+        'external_searches': 0,
+        'memory_retention': {},
+        'calculation_history': [],
+        'session_warnings': 0,
+        'mathematical_requests': 0,
+        'last_interaction': now
+    }
+    for turn in range(turns):
+        message = f"question {turn} of session {index}"
+        session_data['conversation_context'].append(user_message(message))
+        session_data['conversation_context'].append(assistant_message(f"answer {turn} of session {index}"))
+        session_data['recent_topics'].append(message)
+        domain = DOMAINS[(index + turn) % len(DOMAINS)]
+        session_data['knowledge_usage'][domain] = session_data['knowledge_usage'].get(domain, 0) + 1
+        if domain not in session_data['preferred_domains']:
+            session_data['preferred_domains'].append(domain)
+        session_data['last_interaction'] = session_data['last_activity'] = time.time()
+        session_data['last_topic'] = message
+    return session_data
+
+
+def slotted_session(index, turns):
+    """The same session as a UserSession"""
+    user_session = UserSession(context_size=10)
+    for turn in range(turns):
+        message = f"question {turn} of session {index}"
+        user_session.conversation_context.append(user_message(message))
+        user_session.conversation_context.append(assistant_message(f"answer {turn} of session {index}"))
+        user_session.recent_topics.append(message)
+        domain = DOMAINS[(index + turn) % len(DOMAINS)]
+        user_session.knowledge_usage[domain] = user_session.knowledge_usage.get(domain, 0) + 1
+        if domain not in user_session.preferred_domains:
+            user_session.preferred_domains.append(domain)
+        user_session.last_interaction = user_session.last_activity = time.time()
+        user_session.last_topic = message
+    return user_session
+
+
+def encode_dict(session_data):
+    """How the session stores encoded the dict (zlib-compressed JSON)"""
+    data = dict(session_data)
+    data['conversation_context'] = [[m.sender, m.text, m.timestamp] for m in data['conversation_context']]
+    return zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+
+
+LAYOUTS = {
+    'dict': (dict_session, encode_dict),
+    'slotted': (slotted_session, UserSession.to_bytes),
+}
+
+
+def measure(layout, sessions, turns):
+    """In this process: RSS growth and encoded bytes per session for one layout"""
+    build, encode = LAYOUTS[layout]
+    encoded = sum(len(encode(build(i, turns))) for i in range(100)) / 100
+    gc.collect()
+    before = rss_bytes()
+    live = {f"session-{i}": build(i, turns) for i in range(sessions)}
+    gc.collect()
+    grown = rss_bytes() - before
+    return {'rss_per_session': grown / len(live), 'encoded_bytes': encoded}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sessions', type=int, default=50000)
+    parser.add_argument('--turns', type=int, default=2)
+    parser.add_argument('--layout', choices=LAYOUTS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.layout:
+        # Child process: measure one layout and report it as JSON
+        print(json.dumps(measure(args.layout, args.sessions, args.turns)))
+        return 0
+
+    # A fresh process per layout, so neither inherits the other's freed memory
+    results = {}
+    for layout in LAYOUTS:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--layout', layout,
+             '--sessions', str(args.sessions), '--turns', str(args.turns)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results[layout] = json.loads(output.splitlines()[-1])
+
+    old, new = results['dict'], results['slotted']
+    print(f"{args.sessions:,} live sessions x {args.turns} turns")
+    print(f"  Before (25-key dict):   {old['rss_per_session']:>7,.0f} bytes RSS/session, "
+          f"{old['encoded_bytes']:>5,.0f} bytes in the store")
+    print(f"  After (UserSession):    {new['rss_per_session']:>7,.0f} bytes RSS/session, "
+          f"{new['encoded_bytes']:>5,.0f} bytes in the store")
+    print(f"  Reduction: {100 * (1 - new['rss_per_session'] / old['rss_per_session']):.1f}% RSS, "
+          f"{100 * (1 - new['encoded_bytes'] / old['encoded_bytes']):.1f}% encoded")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
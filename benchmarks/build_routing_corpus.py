@@ -0,0 +1,242 @@
+"""
+Builds benchmarks/routing_corpus.jsonl - labelled queries for the routing benchmark
+
+Every line holds the message and the answer we *want*:
+  category  - netra, physics, chemistry, biology, math, time, currency or weather
+  engine    - engine route_to_engine should pick
+  domain    - knowledge domain analyze_query_domain should return (null = not scored)
+  special   - kind handle_special_queries should answer (time/currency/weather or null)
+
+The corpus is generated from templates with a fixed seed so it is reproducible:
+    python benchmarks/build_routing_corpus.py
+
+The message/engine fields are also what statistical_router.py trains from.
+"""
+
+import json
+import os
+import random
+
+PER_CATEGORY = 420
+SEED = 20241017
+
+OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "routing_corpus.jsonl")
+
+SLOTS = {
+    'city': ['Kampala', 'Nairobi', 'Lagos', 'Accra', 'Kigali', 'Dar es Salaam', 'Addis Ababa',
+             'Johannesburg', 'Juba', 'Entebbe', 'Mombasa', 'Gulu', 'Mbarara', 'Jinja'],
+    'service': ['plumber', 'electrician', 'cleaner', 'hair stylist', 'music teacher', 'mechanic',
+                'carpenter', 'photographer', 'tutor', 'painter', 'gardener', 'fitness trainer'],
+    'feature': ['notifications', 'profile picture', 'bookings', 'reviews', 'payments', 'reels',
+                'messages', 'account settings', 'ratings', 'subscription'],
+    'mass': ['2', '5', '10', '12', '0.5', '70', '1500'],
+    'speed': ['3', '10', '20', '25', '9.8', '40'],
+    'angle': ['30', '45', '60', '15'],
+    'number': ['12', '45', '120', '250', '1000', '3.5', '17', '64', '81', '365'],
+    'percent': ['5', '10', '15', '18', '25', '40'],
+    'element': ['sodium', 'chlorine', 'carbon', 'oxygen', 'iron', 'nitrogen', 'helium', 'calcium'],
+    'compound': ['benzene', 'toluene', 'phenol', 'ethanol', 'methane', 'acetic acid', 'nitrobenzene'],
+    'organelle': ['mitochondria', 'ribosomes', 'nucleus', 'golgi apparatus', 'chloroplasts',
+                  'endoplasmic reticulum', 'lysosomes'],
+    'currency': ['USD', 'EUR', 'GBP', 'KES', 'UGX', 'TZS', 'NGN', 'ZAR'],
+    'zone': ['EAT', 'UTC', 'GMT', 'PST', 'EST', 'CET', 'IST'],
+}
+
+TEMPLATES = {
+    'netra': [
+        "How do I reset my Netra password?",
+        "I forgot my password and can't log in",
+        "how do i create a new account on netra",
+        "Can I delete my account permanently?",
+        "my verification code never arrived",
+        "How do I book a {service} in {city}?",
+        "how do payments work on netra",
+        "I was charged twice, how do I get a refund?",
+        "Where do I change my {feature}?",
+        "how to turn off {feature} alerts",
+        "How do I contact Netra customer service?",
+        "the app keeps showing an error when I open {feature}",
+        "Is there a premium plan or subscription?",
+        "How do I become a service provider on Netra?",
+        "can i rate the {service} after the job",
+        "How do I upgrade my plan?",
+        "what is netra",
+        "tell me about netra and strobid",
+        "My booking with the {service} was cancelled, what now?",
+        "How do I update my profile photo?",
+        "can I pay with mobile money on netra",
+        "I need help, my account is locked",
+        "how do I leave a review for a provider",
+        "Is Netra available in {city}?",
+        "how do I hire a {service} through the app",
+        "It's been a long time and my refund has not arrived",
+    ],
+    'physics': [
+        "What is the velocity of a ball dropped from {number} m after 2 seconds?",
+        "Explain Newton's second law of motion",
+        "calculate the kinetic energy of a {mass} kg mass moving at {speed} m/s",
+        "A projectile is launched at {angle} degrees with speed {speed} m/s, find its range",
+        "what is the period of a simple pendulum of length {number} cm",
+        "explain friction on an inclined plane at {angle} degrees",
+        "How does gravity affect acceleration near the earth's surface?",
+        "what is momentum and how is it conserved in a collision",
+        "Draw the electric field around a point charge",
+        "explain the magnetic field around a current carrying wire",
+        "what is torque and how do you calculate it",
+        "Can you help me with circular motion and centripetal force?",
+        "derive the kinematics equations for constant acceleration",
+        "how much force is needed to accelerate {mass} kg at {speed} m/s²",
+        "what is the potential energy of {mass} kg at a height of {number} m",
+        "explain classical mechanics in simple terms",
+        "Send me a message explaining velocity versus speed",
+        "can you code a projectile motion simulation and explain the physics",
+        "How does a spring pendulum conserve energy?",
+        "What does newton mean as a unit of force?",
+        "how much time does a ball take to fall {number} m under gravity",
+    ],
+    'chemistry': [
+        "Explain the nitration of benzene",
+        "what is the mechanism of friedel crafts alkylation",
+        "How does {element} react with water?",
+        "balance this chemical reaction: H2 + O2 -> H2O",
+        "what type of bond forms between sodium and chlorine",
+        "Explain electrophilic aromatic substitution on {compound}",
+        "What is the difference between organic and inorganic chemistry?",
+        "where is {element} on the periodic table",
+        "how many atoms are in one molecule of {compound}",
+        "what is the molecular structure of {compound}",
+        "describe the synthesis of aspirin",
+        "Why is the nitro group meta directing?",
+        "what is a covalent bond",
+        "Is {compound} an aromatic compound?",
+        "explain the reaction between an acid and a base",
+        "what element has atomic number {number}",
+        "How do I name this organic compound?",
+        "what are the properties of alkali metal elements",
+    ],
+    'biology': [
+        "Explain the Krebs cycle",
+        "what happens during glycolysis",
+        "describe the structure of an animal cell",
+        "What is the function of the {organelle}?",
+        "how does DNA replication work",
+        "explain protein synthesis step by step",
+        "What is photosynthesis and where does it happen?",
+        "how do enzymes speed up reactions in the body",
+        "what is cellular respiration",
+        "How much ATP does glycolysis produce?",
+        "explain the difference between mitosis and meiosis in a cell",
+        "what is metabolism",
+        "describe the electron transport chain in mitochondria",
+        "How is a protein folded after translation?",
+        "What is the role of DNA in heredity?",
+        "explain biological classification of living things",
+        "how much time does each phase of the cell cycle take",
+    ],
+    'math': [
+        "what is {number} + {number}",
+        "calculate {number} * {number}",
+        "solve 3x + 5 = {number}",
+        "what is {percent}% of {number}",
+        "compute the square root of {number}",
+        "calculate the area of a circle with radius {number}",
+        "what is {number} divided by 4",
+        "solve x^2 - 16 = 0",
+        "what's the derivative of x^3 + 2x",
+        "calculate {number}/{number}",
+        "integrate 2x from 0 to {number}",
+        "what is {number} squared",
+        "find the volume of a cube with side {number} cm",
+        "compute the average of {number}, {number} and {number}",
+        "convert {number} cm to inches",
+        "calculate the time to travel {number} km at {speed} km/h",
+    ],
+    'time': [
+        "what time is it in {city}",
+        "current time in {zone}",
+        "What time is it now?",
+        "tell me the time in {city}",
+        "what's the time in {zone} right now",
+        "time in {city} please",
+        "what is the current time in East Africa",
+    ],
+    'currency': [
+        "convert {number} {currency} to {currency}",
+        "what is the exchange rate for {currency}",
+        "currency rates for {currency} today",
+        "exchange rate {currency} to {currency}",
+        "convert {number} dollars to shillings",
+        "show me the currency exchange for {currency}",
+    ],
+    'weather': [
+        "weather in {city}",
+        "what's the weather in {city} today",
+        "weather forecast for {city}",
+        "temperature in {city} right now",
+        "what is the weather like in {city}",
+        "is it raining? weather at {city}",
+    ],
+}
+
+# category -> (engine, domain, special)
+LABELS = {
+    'netra': ('netra', 'netra', None),
+    'physics': ('physics', 'physics', None),
+    'chemistry': ('chemistry', 'chemistry', None),
+    'biology': ('biology', 'biology', None),
+    'math': ('general', 'calculations', None),
+    'time': ('general', None, 'time'),
+    'currency': ('general', None, 'currency'),
+    'weather': ('general', None, 'weather'),
+}
+
+# Light rewording so repeated templates still read like different users
+PREFIXES = ['', '', '', 'hi, ', 'Hey Jovira, ', 'please ', 'quick question: ', 'Hello! ', 'ok so ']
+SUFFIXES = ['', '', '', '?', ' please', ' thanks', '!', ' asap', ' :)']
+
+
+def fill(template, rng):
+    """Fill every {slot} independently"""
+    parts = template.split('{')
+    result = parts[0]
+    for part in parts[1:]:
+        slot, rest = part.split('}', 1)
+        result += rng.choice(SLOTS[slot]) + rest
+    return result
+
+
+def build(rng):
+    records = []
+    for category, templates in TEMPLATES.items():
+        engine, domain, special = LABELS[category]
+        seen = set()
+        attempts = 0
+        while len(seen) < PER_CATEGORY and attempts < PER_CATEGORY * 50:
+            attempts += 1
+            message = rng.choice(PREFIXES) + fill(rng.choice(templates), rng) + rng.choice(SUFFIXES)
+            if rng.random() < 0.3:
+                message = message.lower()
+            if message in seen:
+                continue
+            seen.add(message)
+            records.append({
+                'message': message,
+                'category': category,
+                'engine': engine,
+                'domain': domain,
+                'special': special,
+            })
+    rng.shuffle(records)
+    return records
+
+
+def main():
+    records = build(random.Random(SEED))
+    with open(OUTPUT, 'w', encoding='utf-8') as corpus:
+        for record in records:
+            corpus.write(json.dumps(record, ensure_ascii=False) + '\n')
+    print(f"Wrote {len(records)} queries to {OUTPUT}")
+
+
+if __name__ == "__main__":
+    main()
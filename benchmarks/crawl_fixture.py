@@ -0,0 +1,147 @@
+"""
+Crawler check against a local fixture help center
+
+Serves a small generated help section on 127.0.0.1 (articles linking to each
+other, a duplicate page under a second URL, pages outside the help path and a
+slow endpoint to measure concurrency), runs help_crawler over it and checks that:
+
+  - only pages under /help are fetched, and never more than the page budget
+  - no more than --workers fetches are in flight at once
+  - the duplicate article is stored once
+  - the written snapshot loads and answers a search from the crawled articles
+
+Run from the repository root:  python benchmarks/crawl_fixture.py [--articles N] [--workers N]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import help_crawler
+from help_index import HelpIndex
+from help_pages import HelpPageStore
+from help_snapshot import load_snapshot
+
+FETCH_DELAY = 0.02
+
+
+def article(i, articles):
+    """HTML of fixture article i, linking to its neighbours and to pages out of scope"""
+    links = ''.join(f'<a href="/help/article-{j}">Article {j}</a>' for j in ((i + 1) % articles, (i + 7) % articles))
+    return (
+        f'<html><body><nav><a href="/">Home</a><a href="/blog">Blog</a>{links}</nav>'
+        f'<main><h2>Topic {i}</h2><p>Help article number {i} explains setting {i} of the Netra app '
+        f'in detail for providers and clients.</p></main></body></html>'
+    )
+
+
+def make_handler(articles, state):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with state['lock']:
+                state['requests'].append(self.path)
+                state['in_flight'] += 1
+                state['max_in_flight'] = max(state['max_in_flight'], state['in_flight'])
+            try:
+                time.sleep(FETCH_DELAY)
+                self._respond()
+            finally:
+                with state['lock']:
+                    state['in_flight'] -= 1
+
+        def _respond(self):
+            path = self.path.split('#')[0].rstrip('/')
+            if path == '/help':
+                links = '<a href="/help/article-0">Start</a><a href="/help/copy-of-0">Copy</a>'
+                body = (f'<html><body>{links}<main><h2>Refunds</h2><p>If a provider cancels, your '
+                        f'deposit is refunded to your mobile money wallet within three days.</p></main></body></html>')
+            elif path == '/help/copy-of-0':
+                body = article(0, articles)
+            elif path.startswith('/help/article-'):
+                body = article(int(path.rsplit('-', 1)[1]), articles)
+            else:
+                body = '<html><body><main><p>Not part of the help center.</p></main></body></html>'
+
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('ETag', f'"{hash(body) & 0xffffffff:x}"')
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return FixtureHandler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--articles', type=int, default=40)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args(argv)
+
+    state = {'requests': [], 'in_flight': 0, 'max_in_flight': 0, 'lock': threading.Lock()}
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(args.articles, state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    start_url = f"http://127.0.0.1:{server.server_port}/help"
+    budget = args.articles // 2
+
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot = os.path.join(directory, 'help.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Full crawl: every article plus the landing page, duplicate dropped
+            pages, stats = help_crawler.crawl(start_url, max_pages=args.articles + 10, workers=args.workers)
+            help_crawler.build_knowledge_store(pages, snapshot)
+            full_requests = list(state['requests'])
+            state['requests'].clear()
+
+            # Budgeted crawl
+            budget_pages, budget_stats = help_crawler.crawl(start_url, max_pages=budget, workers=args.workers)
+
+        store, index = HelpPageStore(refresh_interval=0), HelpIndex()
+        loaded = load_snapshot(snapshot, store, index)
+        results = index.search("refund deposit provider cancels", k=1)
+
+    server.shutdown()
+
+    print(f"Full crawl:     {stats['fetched']} fetched, {stats['pages']} articles, "
+          f"{stats['duplicates']} duplicates, max {state['max_in_flight']} in flight")
+    print(f"Budgeted crawl: {budget_stats['fetched']} fetched (budget {budget}), "
+          f"{budget_stats['unvisited']} left unvisited")
+    print(f"Snapshot:       {loaded} pages, top passage {results[0]['text'].splitlines()[0]!r}" if results
+          else f"Snapshot:       {loaded} pages, no search results")
+
+    if any(not path.startswith('/help') for path in full_requests):
+        failures.append("fetched a page outside /help")
+    if stats['pages'] != args.articles + 1 or stats['duplicates'] != 1:
+        failures.append(f"expected {args.articles + 1} articles and 1 duplicate")
+    if budget_stats['fetched'] > budget:
+        failures.append("page budget exceeded")
+    if state['max_in_flight'] > args.workers:
+        failures.append("more concurrent fetches than workers")
+    if loaded != stats['pages'] or not results or not results[0]['url'].endswith('/help'):
+        failures.append("snapshot did not load or did not answer from the crawled pages")
+
+    if failures:
+        print("\nFAILED")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+
+    print("\nOK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
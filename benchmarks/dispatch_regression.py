@@ -0,0 +1,201 @@
+"""
+Dispatch regression suite - token-boundary keyword matching versus the old substring checks
+
+A message sent to the wrong specialised engine is paid for twice: the engine runs
+(and may render a diagram nobody asked for), finds nothing useful, and chat()
+then falls back to get_ai_response anyway. This suite replays known trap
+messages ("fetch" -> 'etc', "display" -> 'pay', "excellent" -> 'cell', ...) and
+the routing corpus through both matching modes and counts:
+
+  wrong engine     - routed somewhere other than the labelled engine
+  double dispatch  - a science engine the message did not belong to ran, answered
+                     nothing, and the LLM was called too
+  stray diagrams   - diagrams rendered by an engine the message did not belong to
+  engine misses    - the right science engine ran but had nothing to say (an engine
+                     coverage gap, reported for context; not a routing cost)
+  junk replies     - of the replies counted as answers above, those whose content
+                     only a keyword hidden inside another word asked for ('eas' in
+                     "please" draws an electrophilic aromatic substitution diagram);
+                     found by replaying the engine call with whole-word features
+
+Run from the repository root:  python benchmarks/dispatch_regression.py [--corpus PATH]
+
+Exits non-zero if a trap is misrouted, or if token matching does worse than
+substring matching on wrong engines, double dispatches, stray diagrams, or
+engine misses plus junk replies (a junk reply is no answer either, so the two
+are compared together).
+Diagram rendering is stubbed out, so only the dispatch decisions are exercised.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+from functools import cached_property
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import chemistry_engine as chemistry_module
+import query_features
+from biology_engine import biology_engine
+from chemistry_engine import chemistry_engine
+from engine_router import route_by_keywords
+from physics_engine import physics_engine
+from query_features import QueryFeatures
+
+DEFAULT_CORPUS = os.path.join(ROOT, "benchmarks", "routing_corpus.jsonl")
+
+# (message, engine it should reach) - each one fooled the substring checks
+TRAPS = [
+    ("Can you fetch the latest football scores?", 'general'),
+    ("Best way to display a table in HTML", 'general'),
+    ("Decode this base64 string for me", 'general'),
+    ("That was an excellent answer", 'general'),
+    ("Write a short explanation of the French revolution", 'general'),
+    ("Name the planets in the solar system", 'general'),
+    ("Reinforce my understanding of the French revolution", 'general'),
+    ("Suggest an elementary school reading list", 'general'),
+    ("Summarize the anatomy of the human heart", 'general'),
+    ("Give me a preview of the essay outline", 'general'),
+    ("Recommend a notebook for journaling", 'general'),
+    ("Write a poem about a quiet shire in the hills", 'general'),
+    ("Generating ideas for a birthday party", 'general'),
+    ("A short poem about footprints in the sand", 'general'),
+    ("What is photosynthesis and where does it happen?", 'biology'),
+    ("Explain friction on an inclined plane", 'physics'),
+    ("What is the molecular structure of nitrobenzene", 'chemistry'),
+    ("Explain Friedel-Crafts acylation", 'chemistry'),
+    ("Explain the Krebs cycle", 'biology'),
+    # Science words every science uses - the first engine in priority order used to take these
+    ("Explain protein synthesis step by step", 'biology'),
+    ("How do enzymes speed up reactions in the body?", 'biology'),
+    ("I was charged twice for my booking", 'netra'),
+    ("Where can I see my payments?", 'netra'),
+]
+
+SCIENCE_ENGINES = {
+    'physics': physics_engine.process_physics_query,
+    'chemistry': chemistry_engine.process_chemistry_query,
+    'biology': biology_engine.process_biology_query,
+}
+
+# Sections format_science_response in app.py turns into a reply
+ANSWER_SECTIONS = ('visualizations', 'calculations', 'explanations', 'predictions')
+
+
+class SubstringFeatures(QueryFeatures):
+    """QueryFeatures with the old `keyword in message.lower()` semantics, for comparison"""
+
+    @cached_property
+    def keyword_hits(self):
+        hits = {}
+        for group, keywords in query_features._keyword_groups.items():
+            found = {keyword for keyword in keywords if keyword in self.lower}
+            if found:
+                hits[group] = found
+        return hits
+
+
+MODES = {'substring': SubstringFeatures, 'token': QueryFeatures}
+
+
+@contextlib.contextmanager
+def stub_rendering():
+    """Replace diagram rendering with a placeholder so only dispatch is measured"""
+    placeholder = lambda *args, **kwargs: 'diagram'
+    with mock.patch.object(physics_engine, 'create_mechanics_diagram', placeholder), \
+            mock.patch.object(physics_engine, 'create_electromagnetism_diagram', placeholder), \
+            mock.patch.object(chemistry_engine, 'create_mechanism_diagram', placeholder), \
+            mock.patch.object(chemistry_engine, '_create_nitro_group_explanation', placeholder), \
+            mock.patch.object(chemistry_module.plt, 'subplots', lambda *a, **k: (mock.Mock(), mock.Mock())), \
+            mock.patch.object(biology_engine, 'create_biochemical_diagram', placeholder):
+        yield
+
+
+def dispatch(message, features_class):
+    """Route one message like chat() does; return (engine, answered, diagrams, junk)"""
+    features = features_class(message)
+    engine = route_by_keywords(features)
+    if engine not in SCIENCE_ENGINES:
+        return engine, True, 0, False
+
+    content = SCIENCE_ENGINES[engine](message, features)
+    answered = any(content.get(section) for section in ANSWER_SECTIONS)
+    junk = False
+    if answered and features_class is not QueryFeatures:
+        # Would the same engine still have answered with whole-word keywords?
+        genuine = SCIENCE_ENGINES[engine](message, QueryFeatures(message))
+        junk = not any(genuine.get(section) for section in ANSWER_SECTIONS)
+    return engine, answered, len(content.get('visualizations', [])), junk
+
+
+def evaluate(cases, features_class):
+    """Count wasted work over (message, expected engine) pairs"""
+    totals = {'wrong_engine': 0, 'double_dispatch': 0, 'stray_diagrams': 0, 'engine_misses': 0, 'junk_replies': 0}
+    misrouted = []
+    for message, expected in cases:
+        engine, answered, diagrams, junk = dispatch(message, features_class)
+        totals['junk_replies'] += junk
+        if engine == expected:
+            totals['engine_misses'] += not answered
+            continue
+
+        totals['wrong_engine'] += 1
+        totals['double_dispatch'] += not answered
+        totals['stray_diagrams'] += diagrams
+        misrouted.append((message, expected, engine))
+    return totals, misrouted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    args = parser.parse_args(argv)
+
+    with open(args.corpus, encoding='utf-8') as corpus:
+        corpus_cases = [(record['message'], record['engine'])
+                        for record in map(json.loads, corpus) if record]
+
+    suites = {'traps': TRAPS, 'corpus': corpus_cases}
+    results = {}
+    with stub_rendering(), contextlib.redirect_stdout(io.StringIO()):
+        for suite, cases in suites.items():
+            for mode, features_class in MODES.items():
+                results[suite, mode] = evaluate(cases, features_class)
+
+    print(f"{'suite':<8}{'mode':<11}{'wrong engine':>14}{'double dispatch':>17}"
+          f"{'stray diagrams':>16}{'engine misses':>15}{'junk replies':>14}")
+    for (suite, mode), (totals, _) in results.items():
+        print(f"{suite:<8}{mode:<11}{totals['wrong_engine']:>14}{totals['double_dispatch']:>17}"
+              f"{totals['stray_diagrams']:>16}{totals['engine_misses']:>15}{totals['junk_replies']:>14}")
+
+    failures = []
+    for message, expected, engine in results['traps', 'token'][1]:
+        failures.append(f"trap misrouted: {message!r} -> {engine} (expected {expected})")
+    for suite in suites:
+        before, after = results[suite, 'substring'][0], results[suite, 'token'][0]
+        for count in ('wrong_engine', 'double_dispatch', 'stray_diagrams'):
+            if after[count] > before[count]:
+                failures.append(f"{suite}: {count.replace('_', ' ')} went up from {before[count]} to {after[count]}")
+        unanswered_before = before['engine_misses'] + before['junk_replies']
+        unanswered_after = after['engine_misses'] + after['junk_replies']
+        if unanswered_after > unanswered_before:
+            failures.append(f"{suite}: engine misses plus junk replies went up "
+                            f"from {unanswered_before} to {unanswered_after}")
+
+    if failures:
+        print("\nFAILED")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+
+    print("\nOK - token matching wastes no more dispatches than substring matching")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
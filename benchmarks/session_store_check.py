@@ -0,0 +1,238 @@
+"""
+Session store check - memory, SQLite and Redis backends, and sessions shared across workers
+
+Starts a minimal Redis stand-in on 127.0.0.1 (GET, SET with PX, DEL, PING,
+SELECT and AUTH over RESP - enough for RedisSessionStore), then for each backend:
+
+  - round-trips a session (conversation_context included) through the store
+  - checks that many dirty sessions are written back in a single batch
+  - checks that expired sessions are gone
+  - for SQLite and Redis, chats through the Flask app in two separate worker
+    processes and checks that the second worker continues the first one's
+    conversation instead of starting a new session
+
+Run from the repository root:  python benchmarks/session_store_check.py [--skip-app]
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from message_record import assistant_message, user_message
+from session_manager import SessionCodec
+from session_store import MemorySessionStore, RedisSessionStore, SQLiteSessionStore, WriteBackBuffer
+from user_session import UserSession
+
+SECRET = 'session-store-check'
+
+
+class RedisStandIn(socketserver.ThreadingTCPServer):
+    """Just enough of a Redis server for the session store, keeping values in a dict"""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), RedisHandler)
+        self.data = {}  # key -> (value, expires_at or None)
+        self.commands = 0
+        self.lock = threading.Lock()
+
+
+class RedisHandler(socketserver.StreamRequestHandler):
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        server = self.server
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            name = args[0].upper()
+            with server.lock:
+                server.commands += 1
+                if name == b'SET':
+                    expires = time.time() + int(args[4]) / 1000 if len(args) > 4 and args[3].upper() == b'PX' else None
+                    server.data[args[1]] = (args[2], expires)
+                    reply = b'+OK\r\n'
+                elif name == b'GET':
+                    value, expires = server.data.get(args[1], (None, None))
+                    if value is None or (expires is not None and expires <= time.time()):
+                        reply = b'$-1\r\n'
+                    else:
+                        reply = b'$%d\r\n%s\r\n' % (len(value), value)
+                elif name == b'DEL':
+                    reply = b':%d\r\n' % (server.data.pop(args[1], None) is not None)
+                elif name in (b'PING', b'SELECT', b'AUTH'):
+                    reply = b'+OK\r\n'
+                else:
+                    reply = b'-ERR unknown command\r\n'
+            self.wfile.write(reply)
+
+
+def sample_session(index):
+    user_session = UserSession()
+    user_session.conversation_context.append(user_message(f"question {index}"))
+    user_session.conversation_context.append(assistant_message(f"answer {index} ![Graph](data:image/png;base64,AAAA)"))
+    user_session.knowledge_usage['physics'] = index
+    user_session.recent_topics.append(f"topic {index}")
+    return user_session
+
+
+def check_store(label, make_store):
+    """Round trip, batched write-back and expiry for one backend; returns failures"""
+    failures = []
+    store = make_store()
+    writer = WriteBackBuffer(store, interval=0.05)
+    sessions = {f"{label}-{i}": sample_session(i) for i in range(50)}
+    for session_id, data in sessions.items():
+        writer.mark(session_id, data, time.time() + 60)
+    time.sleep(0.3)
+
+    stats = writer.stats()
+    if stats['sessions_written'] != 50 or stats['flushes'] != 1:
+        failures.append(f"{label}: expected 50 sessions in 1 flush, got {stats}")
+
+    # A second instance stands in for another worker
+    other = make_store()
+    loaded = other.get(f"{label}-7")
+    if loaded is None or [m.text for m in loaded.conversation_context] != ['question 7', 'answer 7 [image: Graph]'] \
+            or loaded.knowledge_usage != {'physics': 7}:
+        failures.append(f"{label}: session did not round trip: {loaded}")
+
+    store.put('short-lived', sample_session(0), time.time() + 0.1)
+    time.sleep(0.2)
+    store.expire()
+    if store.get('short-lived') is not None:
+        failures.append(f"{label}: expired session still readable")
+
+    print(f"{label:<8} written {stats['sessions_written']} sessions in {stats['flushes']} batch(es), "
+          f"{store.stats()}")
+    return failures
+
+
+def chat_worker(messages, cookie, results):
+    """One 'worker': import the app (configured by the environment) and send messages with the given cookie"""
+    from unittest import mock
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+        import session_manager
+
+    def reply(**kwargs):
+        response = mock.Mock()
+        response.choices = [mock.Mock()]
+        response.choices[0].message.content = f"reply with {len(kwargs['messages'])} messages of context"
+        return response
+
+    app.client.chat.completions.create = reply
+    client = app.app.test_client()
+    if cookie:
+        client.set_cookie('session', cookie)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for message in messages:
+            client.post('/chat', json={'message': message})
+        session_manager.session_writes.flush()
+    results.put((client.get_cookie('session').value, session_manager.get_session_stats()))
+
+
+def check_workers(label, spec):
+    """Chat on one worker process, continue on another; the context must carry over"""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    failures = []
+
+    # Spawned workers read their configuration from the environment they start with
+    saved_environ = dict(os.environ)
+    os.environ.update({'SESSION_STORE': spec, 'SESSION_SECRET': SECRET, 'OPENAI_API_KEY': 'x',
+                       'HELP_REFRESH_INTERVAL': '0', 'HELP_SNAPSHOT_PATH': ''})
+    try:
+        first = context.Process(target=chat_worker, args=(["tell me a joke", "another one"], None, results))
+        first.start()
+        cookie, _ = results.get(timeout=120)
+        first.join()
+
+        second = context.Process(target=chat_worker, args=(["and one more"], cookie, results))
+        second.start()
+        results.get(timeout=120)
+        second.join()
+    finally:
+        os.environ.clear()
+        os.environ.update(saved_environ)
+
+    store = SQLiteSessionStore(spec[len('sqlite:///'):], SessionCodec) if spec.startswith('sqlite') \
+        else RedisSessionStore(spec, SessionCodec)
+    from flask.sessions import SecureCookieSessionInterface
+    from flask import Flask
+    flask_app = Flask('check')
+    flask_app.secret_key = SECRET
+    session_id = SecureCookieSessionInterface().get_signing_serializer(flask_app).loads(cookie)['session_id']
+    data = store.get(session_id)
+    texts = [message.text for message in data.conversation_context] if data else []
+    if texts[:1] != ["tell me a joke"] or "and one more" not in texts:
+        failures.append(f"{label}: conversation did not continue across workers: {texts}")
+    else:
+        print(f"{label:<8} one conversation across two workers: {len(texts)} messages, last {texts[-1]!r}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--skip-app', action='store_true', help='skip the two-worker Flask check')
+    args = parser.parse_args(argv)
+
+    redis = RedisStandIn()
+    threading.Thread(target=redis.serve_forever, daemon=True).start()
+    redis_url = f"redis://127.0.0.1:{redis.server_address[1]}/0"
+
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        sqlite_path = os.path.join(directory, 'sessions.db')
+        backends = [
+            ('memory', MemorySessionStore, None),
+            ('sqlite', lambda: SQLiteSessionStore(sqlite_path, SessionCodec), f"sqlite:///{sqlite_path}"),
+            ('redis', lambda: RedisSessionStore(redis_url, SessionCodec), redis_url),
+        ]
+        for label, make_store, spec in backends:
+            if label == 'memory':
+                # One process only: the second "worker" shares the same dict
+                shared = make_store()
+                make_store = lambda shared=shared: shared
+            failures += check_store(label, make_store)
+
+        if not args.skip_app:
+            for label, _, spec in backends[1:]:
+                failures += check_workers(label, spec)
+
+    redis.shutdown()
+
+    if failures:
+        print("\nFAILED")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+
+    print("\nOK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,30 @@ import base64
 from matplotlib.patches import FancyBboxPatch, Circle, Ellipse, Rectangle # type: ignore
 import networkx as nx # type: ignore
 
+from query_features import extract_query_features, register_keyword_groups
+
+# Biology diagram detection: keyword -> diagram type
+BIOLOGY_DIAGRAM_KEYWORDS = {
+    'krebs cycle': 'krebs_cycle',
+    'citric acid cycle': 'krebs_cycle',
+    'glycolysis': 'glycolysis',
+    'electron transport chain': 'electron_transport_chain',
+    'etc': 'electron_transport_chain',
+    'dna replication': 'dna_replication',
+    'protein synthesis': 'protein_synthesis',
+    'cell structure': 'cell_structure',
+    'eukaryotic cell': 'cell_structure'
+}
+
+BIOLOGY_QUERY_KEYWORDS = {
+    'calculation': ['calculate', 'yield', 'atp'],
+    'glycolysis': ['glycolysis'],
+    'krebs': ['krebs'],
+    'photosynthesis': ['photosynthesis', 'chloroplast', 'chlorophyll']
+}
+
+register_keyword_groups('biology_engine', {'diagram': BIOLOGY_DIAGRAM_KEYWORDS, **BIOLOGY_QUERY_KEYWORDS})
+
 class BiologyEngine:
     def __init__(self):
         self.biological_constants = {
@@ -443,7 +467,7 @@ class BiologyEngine:
             print(f"Metabolic calculation error: {e}")
             return None
     
-    def process_biology_query(self, message):
+    def process_biology_query(self, message, features=None):
         """Process biology-related queries"""
         biology_content = {
             'visualizations': [],
@@ -452,24 +476,12 @@ class BiologyEngine:
             'pathways': []
         }
         
-        message_lower = message.lower()
-        
-        # Biology diagram detection
-        biology_keywords = {
-            'krebs cycle': 'krebs_cycle',
-            'citric acid cycle': 'krebs_cycle',
-            'glycolysis': 'glycolysis',
-            'electron transport chain': 'electron_transport_chain',
-            'etc': 'electron_transport_chain',
-            'dna replication': 'dna_replication',
-            'protein synthesis': 'protein_synthesis',
-            'cell structure': 'cell_structure',
-            'eukaryotic cell': 'cell_structure'
-        }
+        features = extract_query_features(message, features)
+        diagram_hits = features.hits('biology_engine', 'diagram')
         
         # Create visualizations
-        for keyword, diagram_type in biology_keywords.items():
-            if keyword in message_lower:
+        for keyword, diagram_type in BIOLOGY_DIAGRAM_KEYWORDS.items():
+            if keyword in diagram_hits:
                 visualization = self.create_biochemical_diagram(diagram_type)
                 if visualization:
                     biology_content['visualizations'].append({
@@ -478,30 +490,37 @@ class BiologyEngine:
                     })
         
         # Perform calculations
-        if any(word in message_lower for word in ['calculate', 'yield', 'atp']):
-            if 'glycolysis' in message_lower:
+        if features.has('biology_engine', 'calculation'):
+            if features.has('biology_engine', 'glycolysis'):
                 calc_result = self.calculate_metabolic_yield({'pathway': 'glycolysis'})
                 if calc_result:
                     biology_content['calculations'].append(calc_result)
             
-            if 'krebs' in message_lower:
+            if features.has('biology_engine', 'krebs'):
                 calc_result = self.calculate_metabolic_yield({'pathway': 'krebs_cycle_per_acetyl_coa'})
                 if calc_result:
                     biology_content['calculations'].append(calc_result)
         
         # Add explanations
-        if 'krebs' in message_lower:
+        if features.has('biology_engine', 'krebs'):
             biology_content['explanations'].append(
                 "The Krebs cycle completes the oxidation of glucose, producing high-energy "
                 "electron carriers (NADH, FADH2) that drive ATP synthesis in the electron transport chain."
             )
         
-        if 'glycolysis' in message_lower:
+        if features.has('biology_engine', 'glycolysis'):
             biology_content['explanations'].append(
                 "Glycolysis breaks down glucose into pyruvate, producing a net gain of 2 ATP "
                 "and 2 NADH molecules through substrate-level phosphorylation."
             )
         
+        if features.has('biology_engine', 'photosynthesis'):
+            biology_content['explanations'].append(
+                "Photosynthesis happens in the chloroplasts of plant cells: the light reactions in the "
+                "thylakoid membranes split water and make ATP and NADPH, and the Calvin cycle in the "
+                "stroma uses them to fix CO2 into glucose (6CO2 + 6H2O → C6H12O6 + 6O2)."
+            )
+        
         return biology_content
 
 # Create global instance
@@ -5,6 +5,36 @@ import base64
 from matplotlib.patches import Circle, FancyBboxPatch, ConnectionPatch # type: ignore
 import networkx as nx # type: ignore
 
+from query_features import extract_query_features, register_keyword_groups
+
+# Mechanism detection: keyword -> diagram type
+MECHANISM_KEYWORDS = {
+    'friedel crafts': 'friedel_crafts',
+    'electrophilic aromatic substitution': 'electrophilic_aromatic_substitution', 
+    'eas': 'electrophilic_aromatic_substitution',
+    'substituent effect': 'substituent_effects',
+    'ortho para meta': 'substituent_effects',
+    'synthesis planning': 'synthesis_planning',
+    'order of operations': 'synthesis_planning',
+    'nitration of benzene': 'benzene_nitration',
+    'benzene nitration': 'benzene_nitration',
+    'hno3 h2so4': 'benzene_nitration'
+}
+
+CHEMISTRY_QUERY_KEYWORDS = {
+    'alkylation': ['alkylation'],
+    'acylation': ['acylation'],
+    'nitration': ['nitration', 'nitro', 'nitrobenzene', 'no2', 'hno3'],
+    'calculation': ['calculate', 'yield', 'concentration'],
+    'yield': ['yield'],
+    'concentration': ['concentration'],
+    'prediction': ['predict', 'substitution', 'directing'],
+    'aromatic': ['aromatic'],
+    'synthesis': ['synthesis']
+}
+
+register_keyword_groups('chemistry_engine', {'mechanism': MECHANISM_KEYWORDS, **CHEMISTRY_QUERY_KEYWORDS})
+
 class ChemistryEngine:
     def __init__(self):
         self.chemical_constants = {
@@ -429,7 +459,7 @@ class ChemistryEngine:
             else:
                 return "Meta position (both deactivating)"
     
-    def process_chemistry_query(self, message):
+    def process_chemistry_query(self, message, features=None):
         """Process chemistry-related queries"""
         chemistry_content = {
             'visualizations': [],
@@ -438,29 +468,16 @@ class ChemistryEngine:
             'predictions': []
         }
         
-        message_lower = message.lower()
-        
-        # Mechanism detection - UPDATED WITH NITRATION
-        mechanism_keywords = {
-            'friedel crafts': 'friedel_crafts',
-            'electrophilic aromatic substitution': 'electrophilic_aromatic_substitution', 
-            'eas': 'electrophilic_aromatic_substitution',
-            'substituent effect': 'substituent_effects',
-            'ortho para meta': 'substituent_effects',
-            'synthesis planning': 'synthesis_planning',
-            'order of operations': 'synthesis_planning',
-            'nitration of benzene': 'benzene_nitration',
-            'benzene nitration': 'benzene_nitration',
-            'hno3 h2so4': 'benzene_nitration'
-        }
+        features = extract_query_features(message, features)
+        mechanism_hits = features.hits('chemistry_engine', 'mechanism')
         
         # Create visualizations
-        for keyword, diagram_type in mechanism_keywords.items():
-            if keyword in message_lower:
+        for keyword, diagram_type in MECHANISM_KEYWORDS.items():
+            if keyword in mechanism_hits:
                 params = {}
-                if 'alkylation' in message_lower:
+                if features.has('chemistry_engine', 'alkylation'):
                     params['reaction_type'] = 'alkylation'
-                elif 'acylation' in message_lower:
+                elif features.has('chemistry_engine', 'acylation'):
                     params['reaction_type'] = 'acylation'
                     
                 visualization = self.create_mechanism_diagram(diagram_type, params)
@@ -471,7 +488,7 @@ class ChemistryEngine:
                     })
         
         # Handle nitration-specific explanations
-        if any(word in message_lower for word in ['nitration', 'nitro', 'no2', 'hno3']):
+        if features.has('chemistry_engine', 'nitration'):
             # Add nitration mechanism explanation
             chemistry_content['explanations'].extend([
                 "**Nitration of Benzene Mechanism:**",
@@ -503,19 +520,19 @@ class ChemistryEngine:
                 print(f"Nitro group explanation error: {e}")
         
         # Perform calculations
-        if any(word in message_lower for word in ['calculate', 'yield', 'concentration']):
-            if 'yield' in message_lower:
+        if features.has('chemistry_engine', 'calculation'):
+            if features.has('chemistry_engine', 'yield'):
                 calc_result = self.calculate_reaction_parameters({'type': 'yield'})
                 if calc_result:
                     chemistry_content['calculations'].append(calc_result)
             
-            if 'concentration' in message_lower:
+            if features.has('chemistry_engine', 'concentration'):
                 calc_result = self.calculate_reaction_parameters({'type': 'concentration'})
                 if calc_result:
                     chemistry_content['calculations'].append(calc_result)
         
         # Make predictions
-        if any(word in message_lower for word in ['predict', 'substitution', 'directing']):
+        if features.has('chemistry_engine', 'prediction'):
             prediction = self.predict_substitution_pattern('-NO2', '-CH3')
             chemistry_content['predictions'].append({
                 'prediction': prediction,
@@ -523,7 +540,7 @@ class ChemistryEngine:
             })
         
         # Add explanations
-        if 'aromatic' in message_lower and 'synthesis' in message_lower:
+        if features.has('chemistry_engine', 'aromatic') and features.has('chemistry_engine', 'synthesis'):
             chemistry_content['explanations'].append(
                 "In aromatic synthesis, install ortho/para directors FIRST, then meta directors. "
                 "This controls the position of subsequent substitutions."
@@ -0,0 +1,111 @@
+"""
+Circuit Breaker - fail fast on upstreams that keep failing
+
+closed     calls go through; consecutive failures are counted
+open       after BREAKER_FAILURE_THRESHOLD failures in a row every call fails
+           instantly with CircuitOpenError for BREAKER_RESET_TIMEOUT seconds
+half_open  after the timeout one probe call is let through: success closes the
+           breaker, failure opens it again for another timeout
+"""
+
+import os
+import threading
+import time
+
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", 3))
+BREAKER_RESET_TIMEOUT = float(os.environ.get("BREAKER_RESET_TIMEOUT", 30))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open"""
+
+
+class CircuitBreaker:
+    """Per-upstream breaker: counts consecutive failures and short-circuits while open"""
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self.times_opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def is_open(self):
+        """True while calls would be rejected outright (no probe is due yet)"""
+        with self._lock:
+            if self.state == 'open':
+                return time.monotonic() - self.opened_at < self.reset_timeout
+            return self.state == 'half_open' and self._probing
+
+    def _before_call(self):
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.name} circuit open")
+                self.state = 'half_open'
+
+            if self.state == 'half_open':
+                # Exactly one probe at a time while half open
+                if self._probing:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.name} circuit half open, probe in progress")
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                print(f"✅ {self.name} recovered, circuit closed")
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.times_opened += 1
+                    print(f"⚡ {self.name} failing, circuit open for {self.reset_timeout:.0f}s")
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def call(self, fetch):
+        """Run fetch() through the breaker; raises CircuitOpenError while open"""
+        self._before_call()
+        try:
+            result = fetch()
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'times_opened': self.times_opened,
+                'rejected_calls': self.rejected
+            }
+
+
+google_breaker = CircuitBreaker('google')
+wikipedia_breaker = CircuitBreaker('wikipedia')
+currency_breaker = CircuitBreaker('currency')
+weather_breaker = CircuitBreaker('weather')
+
+
+def get_breaker_stats():
+    """State and counters of every upstream breaker"""
+    return {
+        breaker.name: breaker.stats()
+        for breaker in (google_breaker, wikipedia_breaker, currency_breaker, weather_breaker)
+    }
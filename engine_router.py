@@ -0,0 +1,148 @@
+"""
+Engine Router - decides which engine answers a chat message
+"""
+
+import os
+
+from analysis_cache import routing_cache
+from query_features import extract_query_features, register_keyword_groups
+from statistical_router import StatisticalRouter
+
+# Optional statistical mode: ROUTER_MODE=statistical with weights trained by
+# `python statistical_router.py train ...`; the keyword cascade stays as fallback
+ROUTER_MODE = os.environ.get("ROUTER_MODE", "keyword")
+ROUTER_WEIGHTS = os.environ.get("ROUTER_WEIGHTS", "router_weights.npz")
+ROUTER_MIN_CONFIDENCE = float(os.environ.get("ROUTER_MIN_CONFIDENCE", 0.8))
+
+# Engines in priority order: any Netra hit wins, then the science engine with the strongest hits
+ENGINE_KEYWORDS = {
+    # EXPANDED Netra keywords for better detection (HIGHEST PRIORITY)
+    'netra': [
+        # App name and company
+        'netra', 'strobid', 'jovira',
+
+        # Account related
+        'account', 'password', 'login', 'signup', 'register', 'sign up', 'log in',
+        'create account', 'new account', 'delete account', 'close account',
+        'verify', 'verification', 'otp', 'code', 'confirm',
+        'forgot password', 'reset password', 'change password',
+
+        # Support related
+        'support', 'help', 'assist', 'customer service', 'contact',
+        'issue', 'problem', 'ticket', 'complaint', 'not working',
+        'broken', 'error', 'urgent', 'help desk',
+
+        # Payment related
+        'payment', 'pay', 'billing', 'invoice', 'subscription',
+        'subscribe', 'premium', 'plan', 'upgrade', 'downgrade',
+        'refund', 'money', 'transaction', 'charge',
+
+        # Features
+        'notification', 'alert', 'setting', 'preference',
+        'profile', 'photo', 'picture', 'avatar',
+        'message', 'chat', 'conversation',
+
+        # Service related
+        'provider', 'client', 'service', 'book', 'booking',
+        'hire', 'review', 'rating', 'feedback',
+
+        # How-to questions
+        'how to', 'how do i', 'can i', 'where do i',
+        'what is netra', 'tell me about netra',
+        'netra app', 'about netra'
+    ],
+
+    'physics': [
+        'physics', 'force', 'velocity', 'acceleration', 'energy',
+        'projectile', 'pendulum', 'circular motion', 'inclined plane',
+        'newton', 'kinematics', 'mechanics', 'gravity', 'friction',
+        'momentum', 'torque', 'electric field', 'magnetic field'
+    ],
+
+    'chemistry': [
+        'chemistry', 'chemical', 'reaction', 'molecule', 'molecular', 'compound',
+        'organic', 'inorganic', 'periodic', 'bond',
+        'synthesis', 'aromatic', 'benzene', 'friedel', 'crafts',
+        'atom', 'atomic', 'element', 'periodic table', 'organic chemistry'
+    ],
+
+    'biology': [
+        'biology', 'biological', 'cell', 'cellular', 'dna', 'protein',
+        'metabolism', 'krebs', 'glycolysis', 'mitochondria',
+        'enzyme', 'respiration', 'photosynthesis', 'krebs cycle',
+        'cell structure', 'dna replication', 'protein synthesis'
+    ]
+}
+
+# Compiled once into the shared matcher - every engine's keywords are found in one pass
+register_keyword_groups('engine', ENGINE_KEYWORDS)
+
+SCIENCE_ENGINES = ('physics', 'chemistry', 'biology')
+
+# Science words every science uses ("protein synthesis", "enzyme reactions"): they count
+# for half, so a subject-specific word from another engine outranks them
+SHARED_SCIENCE_KEYWORDS = {'reaction', 'synthesis'}
+
+
+def load_statistical_router():
+    """Load the trained router when statistical mode is enabled"""
+    if ROUTER_MODE != 'statistical':
+        return None
+
+    try:
+        router = StatisticalRouter.load(ROUTER_WEIGHTS)
+        print(f"📈 Statistical router loaded from {ROUTER_WEIGHTS}")
+        return router
+    except Exception as e:
+        print(f"Statistical router unavailable, using keywords only: {e}")
+        return None
+
+
+statistical_router = load_statistical_router()
+
+
+def science_score(hits, other_hits):
+    """Weight of one science engine's keyword hits; words inside another engine's phrase hit don't count"""
+    score = 0
+    for keyword in hits:
+        if any(keyword != other and f" {keyword} " in f" {other} " for other in other_hits):
+            continue
+        score += 0.5 if keyword in SHARED_SCIENCE_KEYWORDS else 1
+    return score
+
+
+def route_by_keywords(features):
+    """Netra on any hit; otherwise the science engine with the strongest hits (priority order breaks ties)"""
+    if features.has('engine', 'netra'):
+        return 'netra'
+
+    science_hits = {engine_type: features.hits('engine', engine_type) for engine_type in SCIENCE_ENGINES}
+    all_hits = set().union(*science_hits.values())
+    best_engine, best_score = 'general', 0
+    for engine_type, hits in science_hits.items():
+        score = science_score(hits, all_hits)
+        if score > best_score:
+            best_engine, best_score = engine_type, score
+
+    # Default to general AI
+    return best_engine
+
+
+def _route(features):
+    """Statistical prediction when confident enough, keyword cascade otherwise"""
+    if statistical_router is not None:
+        engine_type, confidence = statistical_router.predict(features)
+        if confidence >= ROUTER_MIN_CONFIDENCE:
+            return engine_type
+
+    return route_by_keywords(features)
+
+
+def route_to_engine(message, features=None):
+    """Determine which engine to use based on message content"""
+    features = extract_query_features(message, features)
+    engine_type = routing_cache.get_or_compute(features.cache_key, lambda: _route(features))
+
+    if engine_type == 'netra':
+        print(f"🔍 Routing to Netra Engine: {message[:50]}...")
+    return engine_type
@@ -0,0 +1,166 @@
+"""
+Help Crawler - offline crawl of the Netra help center into the knowledge store
+
+Walks every page under the start URL's path (same host, breadth first) with a
+page budget and a bounded number of concurrent fetches, extracts each article's
+text, drops pages whose text duplicates one already seen (by content hash), and
+writes the pages and their BM25 index to the help snapshot. Workers load that
+snapshot at startup, so answers come from the indexed corpus and the refresher
+only revalidates pages instead of scraping on each request.
+
+Run from the repository root:
+
+    python help_crawler.py [--start URL] [--max-pages N] [--workers N] [--snapshot PATH]
+"""
+
+import argparse
+import hashlib
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urldefrag, urljoin, urlparse
+
+from bs4 import BeautifulSoup
+
+from help_index import HelpIndex
+from help_pages import HEADERS, HelpPageStore, extract_page_text
+from help_snapshot import HELP_SNAPSHOT_PATH, save_snapshot
+from http_client import http_get
+
+DEFAULT_START_URL = "https://netra.strobid.com/help"
+DEFAULT_MAX_PAGES = 200
+DEFAULT_WORKERS = 4
+
+
+def normalize_url(url):
+    """Crawl key for a URL: fragment dropped, trailing slash removed"""
+    url = urldefrag(url)[0]
+    return url[:-1] if url.endswith('/') and urlparse(url).path != '/' else url
+
+
+def in_scope(url, start_url):
+    """True for http(s) URLs on the start URL's host under its path"""
+    parsed, start = urlparse(url), urlparse(start_url)
+    prefix = start.path.rstrip('/')
+    return (parsed.scheme in ('http', 'https') and parsed.netloc == start.netloc
+            and (parsed.path == prefix or parsed.path.startswith(prefix + '/')))
+
+
+def fetch_article(url):
+    """Download one page; returns (page record, links on it) or None for non-HTML responses"""
+    response = http_get(url, upstream='netra_help', headers=HEADERS)
+    response.raise_for_status()
+    if 'html' not in response.headers.get('Content-Type', 'text/html'):
+        return None
+
+    soup = BeautifulSoup(response.text, 'html.parser')
+    # Links first: navigation is stripped from the soup when the text is extracted
+    links = [urljoin(response.url or url, anchor['href']) for anchor in soup.find_all('a', href=True)]
+    now = time.time()
+    page = {
+        'text': extract_page_text(soup),
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'fetched_at': now,
+        'checked_at': now
+    }
+    return page, links
+
+
+def crawl(start_url=DEFAULT_START_URL, max_pages=DEFAULT_MAX_PAGES, workers=DEFAULT_WORKERS):
+    """
+    Crawl the help section breadth first.
+
+    Returns (pages, stats): pages maps URL -> page record for every distinct
+    article; at most max_pages URLs are fetched and at most workers at a time.
+    """
+    start_url = normalize_url(start_url)
+    seen_urls = {start_url}
+    seen_hashes = set()
+    frontier = [start_url]
+    pages = {}
+    stats = {'fetched': 0, 'duplicates': 0, 'empty': 0, 'errors': 0}
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='crawl') as pool:
+        pending = {}
+        while frontier or pending:
+            while frontier and len(pending) < workers and stats['fetched'] + len(pending) < max_pages:
+                url = frontier.pop(0)
+                pending[pool.submit(fetch_article, url)] = url
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                url = pending.pop(future)
+                stats['fetched'] += 1
+                try:
+                    result = future.result()
+                except Exception as e:
+                    stats['errors'] += 1
+                    print(f"❌ {url}: {e}")
+                    continue
+                if result is None:
+                    continue
+
+                page, links = result
+                for link in links:
+                    link = normalize_url(link)
+                    if link not in seen_urls and in_scope(link, start_url):
+                        seen_urls.add(link)
+                        frontier.append(link)
+
+                if not page['text']:
+                    stats['empty'] += 1
+                    continue
+                digest = hashlib.blake2b(page['text'].encode('utf-8'), digest_size=16).digest()
+                if digest in seen_hashes:
+                    stats['duplicates'] += 1
+                    continue
+                seen_hashes.add(digest)
+                pages[url] = page
+                print(f"📄 {url} ({len(page['text'])} chars)")
+
+    stats['pages'] = len(pages)
+    stats['unvisited'] = len(frontier)
+    return pages, stats
+
+
+def build_knowledge_store(pages, snapshot_path=HELP_SNAPSHOT_PATH):
+    """Index crawled pages and write them to the snapshot workers load at startup"""
+    store = HelpPageStore(refresh_interval=0)
+    index = HelpIndex()
+    store.restore(pages)
+    for url, page in pages.items():
+        index.update_page(url, page['text'])
+    save_snapshot(snapshot_path, store, index)
+    return index.stats()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--start', default=DEFAULT_START_URL, help='URL the crawl starts from and stays under')
+    parser.add_argument('--max-pages', type=int, default=DEFAULT_MAX_PAGES, help='most pages to fetch')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='concurrent fetches')
+    parser.add_argument('--snapshot', default=HELP_SNAPSHOT_PATH, help='snapshot file to write')
+    args = parser.parse_args(argv)
+
+    if not args.snapshot:
+        parser.error("no snapshot path: pass --snapshot or set HELP_SNAPSHOT_PATH")
+
+    started = time.perf_counter()
+    pages, stats = crawl(args.start, args.max_pages, args.workers)
+    if not pages:
+        print(f"❌ Nothing crawled from {args.start}, snapshot left unchanged")
+        return 1
+
+    index_stats = build_knowledge_store(pages, args.snapshot)
+    print(f"\n✅ Crawled {stats['fetched']} URLs in {time.perf_counter() - started:.1f}s: "
+          f"{stats['pages']} articles, {stats['duplicates']} duplicates, {stats['empty']} empty, "
+          f"{stats['errors']} errors, {stats['unvisited']} left unvisited")
+    print(f"💾 {index_stats['passages']} passages, {index_stats['terms']} terms written to {args.snapshot}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""
+Help Index - BM25-ranked inverted index over Netra help center passages
+
+Each help page is split into passages (a few consecutive lines of text), and
+every passage is indexed once: term -> {passage id: term frequency}. A query
+only touches the postings of its own (non-stopword) terms, so search is a few
+dictionary lookups instead of a substring scan over every line of every page.
+
+Updates are incremental: when a page changes, only the passages that were
+added or removed are touched; passages that did not change keep their postings.
+"""
+
+import hashlib
+import heapq
+import math
+import os
+import threading
+from collections import Counter
+
+from keyword_matcher import tokenize
+
+# BM25 parameters: term frequency saturation and document length normalisation
+BM25_K1 = float(os.environ.get("HELP_INDEX_K1", 1.2))
+BM25_B = float(os.environ.get("HELP_INDEX_B", 0.75))
+
+# Lines are grouped until a passage reaches this many characters
+PASSAGE_CHARS = int(os.environ.get("HELP_PASSAGE_CHARS", 240))
+MIN_PASSAGE_CHARS = 30
+
+STOPWORDS = frozenset((
+    'a', 'about', 'after', 'all', 'also', 'am', 'an', 'and', 'any', 'are', 'as', 'at',
+    'be', 'been', 'before', 'being', 'but', 'by', 'can', 'could', 'did', 'do', 'does',
+    'for', 'from', 'get', 'had', 'has', 'have', 'he', 'her', 'his', 'how', 'i', 'if',
+    'in', 'into', 'is', 'it', 'its', 'me', 'more', 'my', 'no', 'not', 'of', 'on', 'or',
+    'our', 'out', 'she', 'should', 'so', 'than', 'that', 'the', 'their', 'them', 'then',
+    'there', 'these', 'they', 'this', 'to', 'up', 'us', 'was', 'we', 'were', 'what',
+    'when', 'where', 'which', 'who', 'why', 'will', 'with', 'would', 'you', 'your'
+))
+
+
+def stem(token):
+    """Crude suffix stripping so 'payments', 'booking' and 'booked' meet their base word"""
+    if len(token) > 5 and token.endswith('ing'):
+        return token[:-3]
+    if len(token) > 4 and token.endswith('ed'):
+        return token[:-2]
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def index_terms(text):
+    """Stemmed, stopword-free terms of a piece of text"""
+    return [stem(token) for token in tokenize(text) if token not in STOPWORDS]
+
+
+def split_passages(text):
+    """
+    Group the lines of a page into passages of at most about PASSAGE_CHARS.
+
+    A short line (a heading) starts a new passage once the current one has body
+    text, so each passage stays on one topic and carries its heading with it.
+    """
+    passages = []
+    current = []
+    length = 0
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if len(line) < MIN_PASSAGE_CHARS and length >= MIN_PASSAGE_CHARS:
+            passages.append('\n'.join(current))
+            current, length = [], 0
+        current.append(line)
+        length += len(line)
+        if length >= PASSAGE_CHARS:
+            passages.append('\n'.join(current))
+            current, length = [], 0
+    if current and length >= MIN_PASSAGE_CHARS:
+        passages.append('\n'.join(current))
+    return passages
+
+
+class HelpIndex:
+    """Inverted index of help passages with BM25 scoring and per-page incremental updates"""
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}       # term -> {passage id: term frequency}
+        self.passages = {}       # passage id -> {'url', 'text', 'length'}
+        self.page_passages = {}  # url -> set of passage ids
+        self.total_length = 0
+        self.searches = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def passage_id(url, text):
+        return hashlib.blake2b(f"{url}\n{text}".encode('utf-8'), digest_size=8).hexdigest()
+
+    def _add_passage(self, pid, url, text):
+        terms = Counter(index_terms(text))
+        length = sum(terms.values())
+        if not length:
+            return False
+        self.passages[pid] = {'url': url, 'text': text, 'length': length}
+        self.total_length += length
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[pid] = frequency
+        return True
+
+    def _remove_passage(self, pid):
+        passage = self.passages.pop(pid)
+        self.total_length -= passage['length']
+        for term in set(index_terms(passage['text'])):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(pid, None)
+                if not postings:
+                    del self.postings[term]
+
+    def update_page(self, url, text):
+        """(Re)index a page; only passages that appeared or disappeared are touched"""
+        new_passages = {self.passage_id(url, passage): passage for passage in split_passages(text or '')}
+        with self._lock:
+            old_ids = self.page_passages.get(url, set())
+            removed = old_ids - new_passages.keys()
+            for pid in removed:
+                self._remove_passage(pid)
+
+            kept = old_ids - removed
+            added = 0
+            for pid, passage in new_passages.items():
+                if pid not in kept and self._add_passage(pid, url, passage):
+                    kept.add(pid)
+                    added += 1
+
+            if kept:
+                self.page_passages[url] = kept
+            else:
+                self.page_passages.pop(url, None)
+
+        print(f"🔎 Help index updated for {url}: +{added} -{len(removed)} passages")
+        return added, len(removed)
+
+    def remove_page(self, url):
+        """Drop every passage of a page from the index"""
+        self.update_page(url, '')
+
+    def search(self, query, k=3):
+        """Top-k passages for a query as [{'text', 'url', 'score'}], best first"""
+        terms = set(index_terms(query))
+        with self._lock:
+            self.searches += 1
+            count = len(self.passages)
+            if not terms or not count:
+                return []
+
+            average_length = self.total_length / count
+            scores = {}
+            for term in terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for pid, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.passages[pid]['length'] / average_length)
+                    scores[pid] = scores.get(pid, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+            best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [
+                {'text': self.passages[pid]['text'], 'url': self.passages[pid]['url'], 'score': round(score, 3)}
+                for pid, score in best
+            ]
+
+    def export(self):
+        """Passages and postings as plain data, for snapshots"""
+        with self._lock:
+            return {
+                'passages': {pid: dict(passage) for pid, passage in self.passages.items()},
+                'postings': {term: dict(postings) for term, postings in self.postings.items()}
+            }
+
+    def restore(self, state):
+        """Replace the index with one exported earlier (no re-tokenizing)"""
+        page_passages = {}
+        for pid, passage in state['passages'].items():
+            page_passages.setdefault(passage['url'], set()).add(pid)
+        with self._lock:
+            self.passages = state['passages']
+            self.postings = state['postings']
+            self.page_passages = page_passages
+            self.total_length = sum(passage['length'] for passage in self.passages.values())
+
+    def stats(self):
+        """Size of the index for monitoring"""
+        with self._lock:
+            return {
+                'pages': len(self.page_passages),
+                'passages': len(self.passages),
+                'terms': len(self.postings),
+                'searches': self.searches
+            }
+
+
+help_index = HelpIndex()
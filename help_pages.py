@@ -0,0 +1,249 @@
+"""
+Help Pages - Netra help center pages kept warm by a background refresher
+
+User requests read the last good copy of a page and never wait on the network
+once it has been fetched: a daemon thread revalidates each known page once it is
+HELP_REFRESH_INTERVAL seconds old, with a conditional GET (If-None-Match /
+If-Modified-Since). A 304 only bumps the timestamp; a 200 is re-parsed and
+swapped in, and listeners registered with on_change() are told about it.
+
+Revalidation is spread out: the refresher wakes HELP_REFRESH_SLICES times per
+interval and checks only the oldest due pages, about 1/HELP_REFRESH_SLICES of
+them, instead of fetching the whole help center at once. When workers share a
+snapshot, set_sweep_owner() lets one worker do the checking while the others
+follow its saves.
+
+A copy older than HELP_PAGE_MAX_AGE is still served as-is, with a background
+revalidation queued. Only the very first read of a page (before the warm-up
+finishes) fetches inline, shared with the refresher through single flight.
+"""
+
+import math
+import os
+import queue
+import threading
+import time
+
+from bs4 import BeautifulSoup
+
+from http_client import http_get
+from single_flight import help_page_flight
+
+HELP_REFRESH_INTERVAL = float(os.environ.get("HELP_REFRESH_INTERVAL", 600))  # 0 = no refresher thread
+HELP_PAGE_MAX_AGE = float(os.environ.get("HELP_PAGE_MAX_AGE", 3600))
+HELP_REFRESH_SLICES = max(1, int(os.environ.get("HELP_REFRESH_SLICES", 60)))
+
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+
+
+def extract_page_text(html):
+    """Main text content of an HTML page (markup or a parsed soup, which is modified), without scripts, styles and navigation"""
+    soup = html if isinstance(html, BeautifulSoup) else BeautifulSoup(html, 'html.parser')
+
+    # Remove unwanted elements
+    for element in soup.find_all(['script', 'style', 'nav', 'footer']):
+        element.decompose()
+
+    main = soup.find('main') or soup.find('article') or soup.body
+    return main.get_text(separator='\n', strip=True) if main else ''
+
+
+class HelpPageStore:
+    """Last good copy of each help page plus the validators needed to revalidate it"""
+
+    def __init__(self, refresh_interval=HELP_REFRESH_INTERVAL, max_age=HELP_PAGE_MAX_AGE, slices=HELP_REFRESH_SLICES):
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.slices = slices
+        self.sweep_owner = None  # callable: does this worker revalidate pages? (None = always)
+        self.follow = None  # called instead when another worker owns the sweep
+        self.owns_sweep = True
+        self.pages = {}  # url -> {'text', 'etag', 'last_modified', 'fetched_at', 'checked_at'}
+        self.listeners = []
+        self.stale_served = 0
+        self.not_modified = 0
+        self.changed = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._thread = None
+
+    def on_change(self, listener):
+        """Call listener(url, text) whenever a page's content changes"""
+        self.listeners.append(listener)
+
+    def set_sweep_owner(self, is_owner, follow=None):
+        """Revalidate pages only while is_owner() is true; otherwise call follow() each slice"""
+        self.sweep_owner = is_owner
+        self.follow = follow
+
+    def get(self, url):
+        """Text of a page - stale or not - or None when it could not be fetched yet"""
+        with self._lock:
+            page = self.pages.get(url)
+
+        if page is None:
+            try:
+                return help_page_flight.do(url, lambda: self.refresh(url))
+            except Exception as e:
+                print(f"Error fetching {url}: {e}")
+                return None
+
+        if time.time() - page['checked_at'] > self.max_age:
+            with self._lock:
+                self.stale_served += 1
+            self.revalidate_later(url)
+        return page['text']
+
+    def revalidate_later(self, url):
+        """Queue a background revalidation of url (at most one pending per page)"""
+        if self.refresh_interval <= 0:
+            return
+        self.start()
+        with self._lock:
+            if url in self._queued:
+                return
+            self._queued.add(url)
+        self._queue.put(url)
+
+    def refresh(self, url):
+        """Conditional GET of url; re-parse and notify listeners only if it changed"""
+        with self._lock:
+            page = self.pages.get(url)
+
+        headers = dict(HEADERS)
+        if page is not None:
+            if page['etag']:
+                headers['If-None-Match'] = page['etag']
+            if page['last_modified']:
+                headers['If-Modified-Since'] = page['last_modified']
+
+        response = http_get(url, upstream='netra_help', headers=headers)
+        now = time.time()
+        if response.status_code == 304 and page is not None:
+            with self._lock:
+                page['checked_at'] = now
+                self.not_modified += 1
+            return page['text']
+
+        response.raise_for_status()
+        text = extract_page_text(response.text)
+        with self._lock:
+            self.pages[url] = {
+                'text': text,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': now,
+                'checked_at': now
+            }
+            changed = page is None or page['text'] != text
+            self.changed += changed
+
+        if changed:
+            for listener in self.listeners:
+                try:
+                    listener(url, text)
+                except Exception as e:
+                    print(f"Help page listener error: {e}")
+        return text
+
+    def _revalidate(self, url):
+        try:
+            help_page_flight.do(url, lambda: self.refresh(url))
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            print(f"Help page refresh failed for {url}, keeping the cached copy: {e}")
+
+    def due_pages(self, now=None):
+        """Oldest pages past the refresh interval, at most one slice's share of all pages"""
+        now = time.time() if now is None else now
+        with self._lock:
+            limit = math.ceil(len(self.pages) / self.slices)
+            due = [(page['checked_at'], url) for url, page in self.pages.items()
+                   if now - page['checked_at'] >= self.refresh_interval]
+        due.sort()
+        return [url for _, url in due[:limit]]
+
+    def sweep_slice(self):
+        """One slice of the sweep: revalidate the oldest due pages (or follow the owner's work)"""
+        self.owns_sweep = self.sweep_owner is None or bool(self.sweep_owner())
+        if not self.owns_sweep:
+            if self.follow is not None:
+                self.follow()
+            return
+        for url in self.due_pages():
+            self._revalidate(url)
+
+    def _run(self):
+        """Refresher loop: queued revalidations as they come, one slice of due pages per tick"""
+        tick = self.refresh_interval / self.slices
+        next_slice = time.time()
+        while True:
+            timeout = max(0.0, next_slice - time.time())
+            try:
+                url = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                try:
+                    self.sweep_slice()
+                except Exception as e:
+                    print(f"Help page sweep error: {e}")
+                next_slice = time.time() + tick
+                continue
+
+            with self._lock:
+                self._queued.discard(url)
+            self._revalidate(url)
+
+    def start(self):
+        """Start the refresher thread once (no-op when the interval is 0)"""
+        if self.refresh_interval <= 0 or self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='help-page-refresher', daemon=True)
+        self._thread.start()
+        print(f"🔄 Help page refresher running every {self.refresh_interval:.0f}s")
+
+    def warm(self, *urls):
+        """Fetch pages in the background so the first user request finds them cached"""
+        for url in urls:
+            self.revalidate_later(url)
+
+    def export(self):
+        """Copy of every page record, for snapshots"""
+        with self._lock:
+            return {url: dict(page) for url, page in self.pages.items()}
+
+    def restore(self, pages):
+        """Load page records from a snapshot (a copy checked more recently here wins; no listeners fire)"""
+        with self._lock:
+            for url, page in pages.items():
+                current = self.pages.get(url)
+                if current is None or current['checked_at'] < page['checked_at']:
+                    self.pages[url] = page
+
+    def stats(self):
+        """Pages held and refresh counters for monitoring"""
+        now = time.time()
+        with self._lock:
+            return {
+                'pages': len(self.pages),
+                'oldest_check_seconds': round(max((now - page['checked_at'] for page in self.pages.values()), default=0.0), 1),
+                'stale_served': self.stale_served,
+                'not_modified': self.not_modified,
+                'changed': self.changed,
+                'refresh_errors': self.errors,
+                'refresher_running': self._thread is not None,
+                'sweep_owner': self.owns_sweep
+            }
+
+
+help_pages = HelpPageStore()
+
+
+def get_help_page_stats():
+    """Refresh counters of the help page store"""
+    return help_pages.stats()
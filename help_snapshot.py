@@ -0,0 +1,257 @@
+"""
+Help Snapshot - on-disk copy of the parsed help pages and their search index
+
+New workers load the snapshot when they start serving (start_help_center in
+app.py) instead of fetching and parsing the help center themselves. Loading copies the pages and index into the
+worker's own memory; the file is not read again after that. The snapshot is a
+small SQLite file: page records (text plus ETag / Last-Modified, so the
+refresher's first check is a cheap conditional GET), passages and postings.
+
+Page changes are saved in batches: the first change schedules a save
+HELP_SNAPSHOT_SAVE_DELAY seconds later, and every change until then rides along.
+Only one worker writes the file - whichever holds an exclusive lock on
+<snapshot>.lock (the others skip their saves). That worker also owns the help
+page refresh; the others reload the file when it changes. Each save builds a complete new
+file next to the old one and swaps it in with os.replace, so a reader never sees
+a half-written snapshot.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no file locks, every worker saves
+    fcntl = None
+
+from help_index import help_index
+from help_pages import help_pages
+
+# "" disables the snapshot. The default is in the temp directory: writable on read-only
+# deployments, shared by every worker on the host, and never inside the source tree
+HELP_SNAPSHOT_PATH = os.environ.get(
+    "HELP_SNAPSHOT_PATH",
+    os.path.join(tempfile.gettempdir(), "netra_help_snapshot.db")
+)
+
+HELP_SNAPSHOT_SAVE_DELAY = float(os.environ.get("HELP_SNAPSHOT_SAVE_DELAY", 5))
+
+SNAPSHOT_VERSION = 1
+
+_save_lock = threading.Lock()
+
+
+def save_snapshot(path=HELP_SNAPSHOT_PATH, pages=help_pages, index=help_index):
+    """Write pages and index to path atomically; returns the number of pages saved"""
+    if not path:
+        return 0
+
+    page_records = pages.export()
+    state = index.export()
+    directory = os.path.dirname(os.path.abspath(path))
+
+    with _save_lock:
+        handle, temp_path = tempfile.mkstemp(prefix='.help_snapshot.', suffix='.tmp', dir=directory)
+        os.close(handle)
+        try:
+            conn = sqlite3.connect(temp_path)
+            try:
+                conn.executescript(
+                    "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);"
+                    "CREATE TABLE pages (url TEXT PRIMARY KEY, text TEXT, etag TEXT, "
+                    "last_modified TEXT, fetched_at REAL, checked_at REAL);"
+                    "CREATE TABLE passages (pid TEXT PRIMARY KEY, url TEXT, text TEXT, length INTEGER);"
+                    "CREATE TABLE postings (term TEXT PRIMARY KEY, entries TEXT);"
+                )
+                conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                    ('version', str(SNAPSHOT_VERSION)),
+                    ('saved_at', str(time.time()))
+                ])
+                conn.executemany("INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?)", [
+                    (url, page['text'], page['etag'], page['last_modified'], page['fetched_at'], page['checked_at'])
+                    for url, page in page_records.items()
+                ])
+                conn.executemany("INSERT INTO passages VALUES (?, ?, ?, ?)", [
+                    (pid, passage['url'], passage['text'], passage['length'])
+                    for pid, passage in state['passages'].items()
+                ])
+                conn.executemany("INSERT INTO postings VALUES (?, ?)", [
+                    (term, json.dumps(entries, separators=(',', ':')))
+                    for term, entries in state['postings'].items()
+                ])
+                conn.commit()
+            finally:
+                conn.close()
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    return len(page_records)
+
+
+def load_snapshot(path=HELP_SNAPSHOT_PATH, pages=help_pages, index=help_index):
+    """Fill pages and index from the snapshot at path; returns the number of pages loaded"""
+    if not path or not os.path.exists(path):
+        return 0
+
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if version is None or int(version[0]) != SNAPSHOT_VERSION:
+            print(f"Help snapshot {path} has an unknown format, ignoring it")
+            return 0
+
+        page_records = {
+            url: {'text': text, 'etag': etag, 'last_modified': last_modified,
+                  'fetched_at': fetched_at, 'checked_at': checked_at}
+            for url, text, etag, last_modified, fetched_at, checked_at in conn.execute("SELECT * FROM pages")
+        }
+        state = {
+            'passages': {
+                pid: {'url': url, 'text': text, 'length': length}
+                for pid, url, text, length in conn.execute("SELECT * FROM passages")
+            },
+            'postings': {term: json.loads(entries) for term, entries in conn.execute("SELECT * FROM postings")}
+        }
+    finally:
+        conn.close()
+
+    pages.restore(page_records)
+    index.restore(state)
+    return len(page_records)
+
+
+_loaded_mtime = None
+
+
+def load_help_snapshot():
+    """Load the default snapshot at startup; a missing or broken file just means a cold start"""
+    global _loaded_mtime
+    started = time.perf_counter()
+    try:
+        mtime = os.path.getmtime(HELP_SNAPSHOT_PATH) if HELP_SNAPSHOT_PATH and os.path.exists(HELP_SNAPSHOT_PATH) else None
+        loaded = load_snapshot()
+    except Exception as e:
+        print(f"Help snapshot unavailable, starting cold: {e}")
+        return 0
+    _loaded_mtime = mtime
+    if loaded:
+        print(f"💾 Loaded {loaded} help pages from snapshot in {1000 * (time.perf_counter() - started):.1f} ms")
+    return loaded
+
+
+def reload_help_snapshot():
+    """
+    Follower workers: pick up pages the sweep owner saved since the last load.
+    
+    Called once per refresh slice; costs one stat() unless the file changed.
+    Pages only this worker has (fetched on a cold miss) are re-indexed, since
+    loading replaces the whole index.
+    """
+    global _loaded_mtime
+    if not HELP_SNAPSHOT_PATH:
+        return 0
+    try:
+        mtime = os.path.getmtime(HELP_SNAPSHOT_PATH)
+    except OSError:
+        return 0
+    if mtime == _loaded_mtime:
+        return 0
+    
+    own_pages = help_pages.export()
+    try:
+        loaded = load_snapshot()
+    except Exception as e:
+        print(f"Help snapshot reload failed: {e}")
+        return 0
+    _loaded_mtime = mtime
+    for url, page in own_pages.items():
+        if url not in help_index.page_passages:
+            help_index.update_page(url, page['text'])
+    return loaded
+
+
+def snapshot_sweep_owner():
+    """Sweep-owner check for help_pages: the worker that writes the snapshot also refreshes the pages"""
+    return snapshot_saver.writer_lock.held()
+
+
+class SnapshotWriterLock:
+    """
+    Exclusive, non-blocking flock on <snapshot>.lock, held for the life of the worker.
+    
+    The worker that gets it writes the snapshot; the others check again on each
+    save, so another worker takes over when the writer exits.
+    """
+    
+    def __init__(self, path):
+        self.path = path + '.lock'
+        self._handle = None
+        self._pid = None
+    
+    def held(self):
+        """True if this worker holds (or just acquired) the lock"""
+        if fcntl is None:
+            return True
+        if self._handle is not None and self._pid == os.getpid():
+            return True
+        
+        handle = open(self.path, 'a')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self._handle, self._pid = handle, os.getpid()
+        print(f"📝 Worker {self._pid} writes the help snapshot")
+        return True
+
+
+class SnapshotSaver:
+    """Batches page changes into one save HELP_SNAPSHOT_SAVE_DELAY seconds after the first"""
+    
+    def __init__(self, path=HELP_SNAPSHOT_PATH, delay=HELP_SNAPSHOT_SAVE_DELAY):
+        self.path = path
+        self.delay = delay
+        self.writer_lock = SnapshotWriterLock(path) if path else None
+        self.saves = 0
+        self.skipped = 0
+        self._timer = None
+        self._lock = threading.Lock()
+    
+    def schedule(self):
+        """Save soon, unless a save is already scheduled"""
+        if not self.path:
+            return
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self.delay, self._save)
+            self._timer.daemon = True
+        self._timer.start()
+    
+    def _save(self):
+        with self._lock:
+            self._timer = None
+        try:
+            if not self.writer_lock.held():
+                self.skipped += 1
+                return
+            save_snapshot(self.path)
+            self.saves += 1
+        except Exception as e:
+            print(f"Help snapshot save failed: {e}")
+
+
+snapshot_saver = SnapshotSaver()
+
+
+def save_help_snapshot(url=None, text=None):
+    """on_change listener: schedule a batched save of the pages and index"""
+    snapshot_saver.schedule()
@@ -0,0 +1,133 @@
+"""
+HTTP Client - shared keep-alive connection pools for every outbound request
+
+All scraping and API calls go through http_get(), which reuses one pooled
+session per host (so repeated calls skip the TCP+TLS handshake), applies
+separate connect/read timeouts and records per-upstream metrics.
+
+HTTP/2 is used when HTTP_CLIENT_HTTP2=1 and httpx (with h2) is installed;
+otherwise requests with urllib3 pools is used.
+"""
+
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx # type: ignore
+except ImportError:
+    httpx = None
+
+# Fail fast on unreachable hosts, but give slow upstreams time to answer
+CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 3.05))
+READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 8))
+POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 10))
+USE_HTTP2 = os.environ.get("HTTP_CLIENT_HTTP2", "0") == "1"
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _create_http2_client():
+    """httpx client with HTTP/2 enabled, or None when httpx/h2 are unavailable"""
+    if not USE_HTTP2 or httpx is None:
+        return None
+    try:
+        client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=POOL_SIZE * 4, max_keepalive_connections=POOL_SIZE),
+            follow_redirects=True
+        )
+        print("🌐 HTTP client using HTTP/2 (httpx)")
+        return client
+    except Exception as e:
+        print(f"HTTP/2 unavailable, using requests: {e}")
+        return None
+
+
+_http2_client = _create_http2_client()
+
+
+def _get_session(host):
+    """One pooled requests.Session per host, created on first use"""
+    session = _sessions.get(host)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=0)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _sessions[host] = session
+    return session
+
+
+def _record(upstream, started, status=None, error=None):
+    """Add one call to the upstream's counters"""
+    elapsed = time.perf_counter() - started
+    with _stats_lock:
+        stats = _stats.setdefault(upstream, {
+            'requests': 0, 'errors': 0, 'status': {},
+            'total_seconds': 0.0, 'max_seconds': 0.0, 'last_error': None
+        })
+        stats['requests'] += 1
+        stats['total_seconds'] += elapsed
+        stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+        if status is not None:
+            status_class = f"{status // 100}xx"
+            stats['status'][status_class] = stats['status'].get(status_class, 0) + 1
+        if error is not None:
+            stats['errors'] += 1
+            stats['last_error'] = f"{type(error).__name__}: {error}"
+
+
+def http_get(url, upstream=None, timeout=None, headers=None, **kwargs):
+    """
+    GET a URL through the shared pools.
+
+    upstream names the service in the metrics (defaults to the host name).
+    timeout is a (connect, read) pair or a single number for both.
+    Raises the same way requests.get does.
+    """
+    host = urlparse(url).netloc
+    upstream = upstream or host
+    timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+    started = time.perf_counter()
+
+    try:
+        if _http2_client is not None:
+            if isinstance(timeout, tuple):
+                timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+            response = _http2_client.get(url, headers=headers, timeout=timeout, **kwargs)
+        else:
+            response = _get_session(host).get(url, headers=headers, timeout=timeout, **kwargs)
+    except Exception as e:
+        _record(upstream, started, error=e)
+        raise
+
+    _record(upstream, started, status=response.status_code)
+    return response
+
+
+def get_upstream_stats():
+    """Per-upstream request counts, status classes, errors and latency"""
+    with _stats_lock:
+        return {
+            upstream: {
+                'requests': stats['requests'],
+                'errors': stats['errors'],
+                'status': dict(stats['status']),
+                'avg_ms': round(1000 * stats['total_seconds'] / stats['requests'], 1) if stats['requests'] else 0.0,
+                'max_ms': round(1000 * stats['max_seconds'], 1),
+                'last_error': stats['last_error']
+            }
+            for upstream, stats in _stats.items()
+        }
@@ -0,0 +1,102 @@
+"""
+Keyword Matcher - token-boundary keyword and phrase matching shared by every classifier
+"""
+
+import re
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Byte table that keeps [a-z0-9] and turns every other byte into a space; splitting
+# the translated text gives the same tokens as TOKEN_PATTERN, several times faster
+TOKEN_BYTES = bytes(byte if chr(byte) in '0123456789abcdefghijklmnopqrstuvwxyz' else 32 for byte in range(256))
+
+# Words this short are left as written - inflecting them ('hi' -> 'his') invents new words
+MIN_INFLECTED_LENGTH = 3
+
+
+def tokenize(text):
+    """Lower-cased alphanumeric tokens; punctuation and apostrophes split words"""
+    # Non-ASCII characters become '?' and then spaces, as TOKEN_PATTERN would skip them
+    return text.lower().encode('ascii', 'replace').translate(TOKEN_BYTES).decode('ascii').split()
+
+
+def inflections(word):
+    """Regular English inflections of a word, so 'payment' also matches 'payments'"""
+    forms = {word}
+    if len(word) < MIN_INFLECTED_LENGTH or word.isdigit():
+        return forms
+
+    forms.update((word + 's', word + 'es', word + 'ed', word + 'ing'))
+    if word.endswith('e') and word[-2] not in 'aeiou':
+        forms.update((word + 'd', word[:-1] + 'ing'))
+    if word.endswith('y') and word[-2] not in 'aeiou':
+        forms.update((word[:-1] + 'ies', word[:-1] + 'ied'))
+    return forms
+
+
+class KeywordMatcher:
+    """
+    Compiled matcher for named keyword groups.
+
+    Keywords match whole tokens only, so 'etc' no longer fires on "fetch" or
+    'pay' on "display". A phrase keyword matches a run of consecutive tokens
+    (an n-gram) of the message. The last word of every keyword also matches its
+    regular inflections ('booking' -> "bookings", 'charge' -> "charged").
+
+    Every surface form is precomputed at build time. A message costs one set
+    intersection for its distinct words, plus one substring check for each
+    phrase whose words all occur in it.
+    """
+
+    def __init__(self, groups):
+        self.groups = {name: tuple(dict.fromkeys(keywords)) for name, keywords in groups.items()}
+
+        # surface n-gram -> {(group, keyword)} it proves
+        self._index = {}
+        # last token of a phrase -> (' surface ', tokens) of the phrases ending with it
+        self._phrases = {}
+
+        for name, keywords in self.groups.items():
+            for keyword in keywords:
+                tokens = tokenize(keyword)
+                if not tokens:
+                    continue
+
+                for last in inflections(tokens[-1]):
+                    surface_tokens = tokens[:-1] + [last]
+                    surface = ' '.join(surface_tokens)
+                    if surface not in self._index and len(surface_tokens) > 1:
+                        self._phrases.setdefault(last, []).append((f" {surface} ", frozenset(surface_tokens)))
+                    self._index.setdefault(surface, set()).add((name, keyword))
+
+        self._words = frozenset(surface for surface in self._index if ' ' not in surface)
+        self._phrases = {last: tuple(phrases) for last, phrases in self._phrases.items()}
+        self._phrase_ends = frozenset(self._phrases)
+
+    def find_tokens(self, tokens):
+        """Return {group: set of keywords} for a tokenized message"""
+        found = set()
+        index = self._index
+        present = set(tokens)
+
+        for token in present & self._words:
+            found.update(index[token])
+
+        # A phrase is only looked for when all of its words occur somewhere in the message;
+        # then it matches if it is a run of consecutive tokens of the space-joined text
+        ends = present & self._phrase_ends
+        if ends:
+            text = f" {' '.join(tokens)} "
+            for last in ends:
+                for padded, words in self._phrases[last]:
+                    if words <= present and padded in text:
+                        found.update(index[padded[1:-1]])
+
+        hits = {}
+        for group, keyword in found:
+            hits.setdefault(group, set()).add(keyword)
+        return hits
+
+    def find(self, text):
+        """Return {group: set of keywords} for every keyword occurring in text"""
+        return self.find_tokens(tokenize(text))
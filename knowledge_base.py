@@ -52,12 +52,12 @@ KNOWLEDGE_DOMAINS = {
     },
     'biology': {
         'name': 'Biology',
-        'keywords': ['biology', 'cell', 'dna', 'genetics', 'ecosystem', 'evolution', 'physiology', 'anatomy', 'biochemistry'],
+        'keywords': ['biology', 'cell', 'cellular', 'dna', 'genetics', 'ecosystem', 'evolution', 'physiology', 'anatomy', 'biochemistry'],
         'description': 'Biological concepts and systems'
     },
     'chemistry': {
         'name': 'Chemistry',
-        'keywords': ['chemistry', 'reaction', 'molecule', 'atom', 'bond', 'organic', 'inorganic', 'mechanism', 'periodic'],
+        'keywords': ['chemistry', 'reaction', 'molecule', 'molecular', 'atom', 'atomic', 'bond', 'organic', 'inorganic', 'mechanism', 'periodic'],
         'description': 'Chemical reactions and mechanisms'
     }
 }
@@ -7,6 +7,38 @@ import base64
 import math
 from matplotlib.patches import Circle, Rectangle # type: ignore
 
+from query_features import extract_query_features, register_keyword_groups
+
+# LaTeX delimiters: \[...\], \(...\), $$...$$ and $...$
+LATEX_PATTERNS = [re.compile(pattern, re.DOTALL) for pattern in [
+    r'\\\[(.*?)\\\]',
+    r'\\\((.*?)\\\)',
+    r'\$\$(.*?)\$\$',
+    r'\$(.*?)\$'
+]]
+
+# Keyword -> visualization type; the first keyword (in table order) found wins
+VISUALIZATION_KEYWORDS = {
+    'graph': 'function',
+    'plot': 'function', 
+    'diagram': 'geometry',
+    'visualize': 'geometry',
+    'draw': 'geometry',
+    'shape': 'geometry',
+    'coordinate': 'coordinate',
+    'vector': 'vector'
+}
+
+CALCULATION_PATTERNS = [re.compile(pattern) for pattern in [
+    r'calculate\s+(.+)',
+    r'compute\s+(.+)',
+    r'solve\s+(.+)',
+    r'what is\s+(.+)',
+    r'(\d+[\+\-\*\/\^]\d+)'
+]]
+
+register_keyword_groups('visualization', {'math': VISUALIZATION_KEYWORDS})
+
 def render_latex_equation(latex_code):
     """Render LaTeX equation to base64 image"""
     try:
@@ -314,8 +346,41 @@ def handle_calculations(query):
     
     return None
 
-def process_mathematical_content(message):
-    """Process mathematical content including LaTeX and visualizations"""
+def plan_mathematical_content(message, features=None):
+    """Detection phase: what to render and calculate, without touching sympy or matplotlib"""
+    plan = {
+        'latex_equations': [],
+        'visualizations': [],
+        'calculations': []
+    }
+    
+    features = extract_query_features(message, features)
+    
+    # Detect LaTeX expressions
+    for pattern in LATEX_PATTERNS:
+        for match in pattern.findall(message):
+            if match.strip():
+                plan['latex_equations'].append(match.strip())
+    
+    # Detect visualization requests (the first keyword in table order wins)
+    visualization_hits = features.hits('visualization', 'math')
+    viz_type = next((viz for keyword, viz in VISUALIZATION_KEYWORDS.items() if keyword in visualization_hits), None)
+    if viz_type:
+        plan['visualizations'].append(viz_type)
+    
+    # Detect calculations - without a digit there is nothing to compute ("what is love")
+    for pattern in CALCULATION_PATTERNS:
+        for match in pattern.findall(features.lower):
+            if isinstance(match, tuple):
+                match = match[0]
+            expression = match.strip()
+            if any(char.isdigit() for char in expression) and expression not in plan['calculations']:
+                plan['calculations'].append(expression)
+    
+    return plan
+
+def render_mathematical_content(plan):
+    """Execution phase: render and evaluate exactly what the plan lists"""
     mathematical_content = {
         'latex_equations': [],
         'visualizations': [],
@@ -323,64 +388,26 @@ def process_mathematical_content(message):
     }
     
     try:
-        # Detect LaTeX expressions
-        latex_patterns = [
-            r'\\\[(.*?)\\\]',  # \[...\]
-            r'\\\((.*?)\\\)',  # \(...\)
-            r'\$\$(.*?)\$\$',  # $$...$$
-            r'\$(.*?)\$'       # $...$
-        ]
-        
-        for pattern in latex_patterns:
-            matches = re.findall(pattern, message, re.DOTALL)
-            for match in matches:
-                if match.strip():
-                    rendered_image = render_latex_equation(match.strip())
-                    if rendered_image:
-                        mathematical_content['latex_equations'].append({
-                            'latex': match.strip(),
-                            'image': rendered_image
-                        })
-        
-        # Detect visualization requests
-        viz_keywords = {
-            'graph': 'function',
-            'plot': 'function', 
-            'diagram': 'geometry',
-            'visualize': 'geometry',
-            'draw': 'geometry',
-            'shape': 'geometry',
-            'coordinate': 'coordinate',
-            'vector': 'vector'
-        }
-        
-        for keyword, viz_type in viz_keywords.items():
-            if keyword in message.lower():
-                visualization = create_mathematical_visualization(viz_type)
-                if visualization:
-                    mathematical_content['visualizations'].append({
-                        'type': viz_type,
-                        'image': visualization
-                    })
-                break
-        
-        # Detect calculations
-        calc_patterns = [
-            r'calculate\s+(.+)',
-            r'compute\s+(.+)',
-            r'solve\s+(.+)',
-            r'what is\s+(.+)',
-            r'(\d+[\+\-\*\/\^]\d+)'
-        ]
-        
-        for pattern in calc_patterns:
-            matches = re.findall(pattern, message.lower())
-            for match in matches:
-                if isinstance(match, tuple):
-                    match = match[0]
-                calculation_result = perform_advanced_calculation(match.strip())
-                if calculation_result:
-                    mathematical_content['calculations'].append(calculation_result)
+        for latex in plan['latex_equations']:
+            rendered_image = render_latex_equation(latex)
+            if rendered_image:
+                mathematical_content['latex_equations'].append({
+                    'latex': latex,
+                    'image': rendered_image
+                })
+        
+        for viz_type in plan['visualizations']:
+            visualization = create_mathematical_visualization(viz_type)
+            if visualization:
+                mathematical_content['visualizations'].append({
+                    'type': viz_type,
+                    'image': visualization
+                })
+        
+        for expression in plan['calculations']:
+            calculation_result = perform_advanced_calculation(expression)
+            if calculation_result:
+                mathematical_content['calculations'].append(calculation_result)
         
         return mathematical_content
         
@@ -388,6 +415,10 @@ def process_mathematical_content(message):
         print(f"Mathematical content processing error: {e}")
         return mathematical_content
 
+def process_mathematical_content(message, features=None):
+    """Process mathematical content including LaTeX and visualizations"""
+    return render_mathematical_content(plan_mathematical_content(message, features))
+
 def format_mathematical_response(math_content):
     """Format mathematical content for response"""
     response_parts = []
@@ -0,0 +1,72 @@
+"""
+Message Record - compact record for one conversation turn
+
+Session conversation_context and ConversationMemory histories hold one of these
+per message instead of a dict: __slots__ drops the per-instance __dict__, the
+timestamp is a float instead of an ISO string, and the sender is one of two
+interned strings shared by every record.
+
+Records are history, not the reply itself: inline base64 images (diagrams from
+the science and math engines) are replaced by a short placeholder and very long
+texts are cut, so a record's size does not depend on what was rendered.
+"""
+
+import os
+import re
+import sys
+import time
+
+SENDER_USER = sys.intern('user')
+SENDER_ASSISTANT = sys.intern('assistant')
+
+# Longest text kept in a history record
+MESSAGE_TEXT_LIMIT = int(os.environ.get("MESSAGE_TEXT_LIMIT", 4000))
+
+MARKDOWN_IMAGE_PATTERN = re.compile(r'!\[([^\]]*)\]\(data:image/[^)]*\)')
+DATA_URI_PATTERN = re.compile(r'data:image/[\w.+-]+;base64,[A-Za-z0-9+/=]+')
+
+
+def strip_images(text):
+    """Replace inline base64 images with placeholders ('![Graph](data:...)' -> '[image: Graph]')"""
+    if 'data:image/' not in text:
+        return text
+    text = MARKDOWN_IMAGE_PATTERN.sub(lambda match: f"[image: {match.group(1) or 'diagram'}]", text)
+    return DATA_URI_PATTERN.sub('[image]', text)
+
+
+def compact_text(text, limit=MESSAGE_TEXT_LIMIT):
+    """Text as stored in a record: images stripped, cut to limit characters"""
+    text = strip_images(text or '')
+    if len(text) > limit:
+        text = text[:limit] + ' …'
+    return text
+
+
+class Message:
+    """One turn of a conversation: who said it, what was said and when (epoch seconds)"""
+
+    __slots__ = ('sender', 'text', 'timestamp')
+
+    def __init__(self, sender, text, timestamp=None):
+        self.sender = SENDER_USER if sender == SENDER_USER else SENDER_ASSISTANT
+        self.text = text
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    @property
+    def is_user(self):
+        return self.sender is SENDER_USER
+
+    def nbytes(self):
+        """Approximate bytes held by this record (the sender string is shared, so not counted)"""
+        return sys.getsizeof(self) + sys.getsizeof(self.text) + sys.getsizeof(self.timestamp)
+
+    def __repr__(self):
+        return f"Message({self.sender!r}, {self.text[:40]!r}, {self.timestamp})"
+
+
+def user_message(text, timestamp=None):
+    return Message(SENDER_USER, compact_text(text), timestamp)
+
+
+def assistant_message(text, timestamp=None):
+    return Message(SENDER_ASSISTANT, compact_text(text), timestamp)
@@ -2,115 +2,218 @@
 Netra Engine - With Memory and Conversation Understanding
 """
 
-import requests
 import re
 import time
 import json
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
-from collections import Counter
+from collections import Counter, OrderedDict, deque
 import hashlib
+import os
+import threading
+
+from analysis_cache import intent_cache
+from help_index import help_index
+from help_pages import help_pages
+from message_record import Message, assistant_message, user_message
+from query_features import QueryFeatures, extract_query_features, register_keyword_groups
+
+# Intent patterns
+INTENT_PATTERNS = {
+    'greeting': ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening'],
+    'thanks': ['thanks', 'thank you', 'appreciate', 'thx'],
+    'what_is': ['what is', 'tell me about', 'about', 'explain'],
+    'how_to': ['how to', 'how do i', 'how can i', 'steps to', 'guide'],
+    'can_i': ['can i', 'is it possible', 'am i able', 'do you allow'],
+    'delete': ['delete', 'remove', 'close account', 'cancel account'],
+    'create': ['create', 'sign up', 'register', 'make account', 'new account'],
+    'book': ['book', 'booking', 'schedule', 'appointment', 'reserve', 'hire'],
+    'rate': ['rate', 'rating', 'review', 'feedback', 'star'],
+    'pay': ['pay', 'payment', 'money', 'cost', 'price', 'fee'],
+    'support': ['support', 'help', 'contact', 'customer service']
+}
+
+# Follow-up patterns
+FOLLOW_UP_PATTERNS = ['what about', 'how about', 'and', 'also', 'then', 'what regarding']
+
+# Passages returned from a help center search
+HELP_SEARCH_RESULTS = 3
+
+# Conversation memory bounds: users remembered at once and idle seconds before forgetting one
+MEMORY_MAX_USERS = int(os.environ.get("NETRA_MEMORY_MAX_USERS", 10000))
+MEMORY_TTL = float(os.environ.get("NETRA_MEMORY_TTL", 1800))
+
+register_keyword_groups('intent', INTENT_PATTERNS)
+register_keyword_groups('follow_up', {'any': FOLLOW_UP_PATTERNS})
 
 class ConversationMemory:
-    """Stores conversation history and context for each user"""
+    """
+    Stores conversation history and context for each user.
     
-    def __init__(self):
-        self.conversations = {}  # user_id -> list of messages
-        self.context = {}  # user_id -> current context
-        self.max_history = 10  # Remember last 10 messages
+    Bounded: at most max_users users are remembered (least recently active are
+    evicted first), a user idle for longer than ttl seconds is forgotten, and
+    each history is a ring buffer of the last max_history exchanges (a user
+    Message followed by the assistant's reply). Since users
+    are kept in activity order, expired users are always at the front, so
+    expiring them costs O(expired).
+    """
+    
+    def __init__(self, max_users: int = MEMORY_MAX_USERS, ttl: float = MEMORY_TTL, max_history: int = 10):
+        self.max_users = max_users
+        self.ttl = ttl
+        self.max_history = max_history  # Remember last 10 messages
+        self.users = OrderedDict()  # user_id -> {'history', 'context', 'last_seen', 'bytes'}, oldest first
+        self.bytes_used = 0
+        self.lru_evictions = 0
+        self.ttl_evictions = 0
+        self._lock = threading.RLock()
+    
+    def _drop(self, user_id: str) -> None:
+        entry = self.users.pop(user_id)
+        self.bytes_used -= entry['bytes']
+    
+    def _expire(self, now: float) -> None:
+        """Forget users idle for longer than the TTL (they are at the front)"""
+        while self.users:
+            user_id, entry = next(iter(self.users.items()))
+            if now - entry['last_seen'] <= self.ttl:
+                break
+            self._drop(user_id)
+            self.ttl_evictions += 1
+    
+    def _entry(self, user_id: str, create: bool = False) -> Optional[Dict]:
+        """A live user's entry (marked as just active), created when asked for"""
+        now = time.monotonic()
+        self._expire(now)
+        entry = self.users.get(user_id)
+        if entry is None:
+            if not create:
+                return None
+            entry = self.users[user_id] = {
+                'history': deque(maxlen=2 * self.max_history),
+                'context': {},
+                'last_seen': now,
+                'bytes': 0
+            }
+            while len(self.users) > self.max_users:
+                self._drop(next(iter(self.users)))
+                self.lru_evictions += 1
+        else:
+            entry['last_seen'] = now
+            self.users.move_to_end(user_id)
+        return entry
     
     def add_message(self, user_id: str, message: str, response: str):
         """Add a message to conversation history"""
-        if user_id not in self.conversations:
-            self.conversations[user_id] = []
-            self.context[user_id] = {}
-        
-        self.conversations[user_id].append({
-            'timestamp': datetime.now().isoformat(),
-            'message': message,
-            'response': response
-        })
-        
-        # Keep only last max_history messages
-        if len(self.conversations[user_id]) > self.max_history:
-            self.conversations[user_id] = self.conversations[user_id][-self.max_history:]
+        now = time.time()
+        records = (user_message(message, now), assistant_message(response, now))
+        size = sum(record.nbytes() for record in records)
+        with self._lock:
+            entry = self._entry(user_id, create=True)
+            history = entry['history']
+            # The ring buffer drops the oldest exchange once full
+            if len(history) == history.maxlen:
+                size -= history[0].nbytes() + history[1].nbytes()
+            history.extend(records)
+            entry['bytes'] += size
+            self.bytes_used += size
     
-    def get_last_message(self, user_id: str) -> Optional[Dict]:
+    def get_last_message(self, user_id: str) -> Optional[Message]:
         """Get the last message from a user"""
-        if user_id in self.conversations and self.conversations[user_id]:
-            return self.conversations[user_id][-1]
+        with self._lock:
+            entry = self._entry(user_id)
+            if entry and entry['history']:
+                return entry['history'][-2]
         return None
     
     def get_conversation_summary(self, user_id: str) -> str:
         """Get a summary of the conversation for context"""
-        if user_id not in self.conversations:
-            return ""
+        with self._lock:
+            entry = self._entry(user_id)
+            if entry is None:
+                return ""
+            recent = list(entry['history'])[-6:]  # Last 3 exchanges
         
         summary = []
-        for msg in self.conversations[user_id][-3:]:  # Last 3 messages
-            summary.append(f"User: {msg['message']}")
-            summary.append(f"Assistant: {msg['response'][:100]}...")
+        for msg in recent:
+            if msg.is_user:
+                summary.append(f"User: {msg.text}")
+            else:
+                summary.append(f"Assistant: {msg.text[:100]}...")
         
         return "\n".join(summary)
     
     def set_context(self, user_id: str, key: str, value: Any):
         """Set context value for a user"""
-        if user_id not in self.context:
-            self.context[user_id] = {}
-        self.context[user_id][key] = value
+        with self._lock:
+            self._entry(user_id, create=True)['context'][key] = value
     
     def get_context(self, user_id: str, key: str, default=None) -> Any:
         """Get context value for a user"""
-        if user_id in self.context:
-            return self.context[user_id].get(key, default)
+        with self._lock:
+            entry = self._entry(user_id)
+            if entry is not None:
+                return entry['context'].get(key, default)
         return default
     
-    def detect_intent(self, message: str, user_id: str = None) -> Dict:
-        """Detect what the user is asking about, using context"""
-        message_lower = message.lower()
-        
-        # Intent patterns
-        intents = {
-            'greeting': ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening'],
-            'thanks': ['thanks', 'thank you', 'appreciate', 'thx'],
-            'what_is': ['what is', 'tell me about', 'about', 'explain'],
-            'how_to': ['how to', 'how do i', 'how can i', 'steps to', 'guide'],
-            'can_i': ['can i', 'is it possible', 'am i able', 'do you allow'],
-            'delete': ['delete', 'remove', 'close account', 'cancel account'],
-            'create': ['create', 'sign up', 'register', 'make account', 'new account'],
-            'book': ['book', 'booking', 'schedule', 'appointment', 'reserve', 'hire'],
-            'rate': ['rate', 'rating', 'review', 'feedback', 'star'],
-            'pay': ['pay', 'payment', 'money', 'cost', 'price', 'fee'],
-            'support': ['support', 'help', 'contact', 'customer service']
-        }
+    def forget(self, user_id: str) -> None:
+        """Drop everything remembered about a user"""
+        with self._lock:
+            if user_id in self.users:
+                self._drop(user_id)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Users held, approximate bytes of history and eviction counters"""
+        with self._lock:
+            self._expire(time.monotonic())
+            return {
+                'users': len(self.users),
+                'max_users': self.max_users,
+                'messages': sum(len(entry['history']) for entry in self.users.values()),
+                'bytes_used': self.bytes_used,
+                'lru_evictions': self.lru_evictions,
+                'ttl_evictions': self.ttl_evictions
+            }
+    
+    def _match_intents(self, features: QueryFeatures) -> tuple:
+        """Context-free part of intent detection, shared by every user and cached"""
+        # One entry per matched pattern, in table order - the last one wins
+        matched = tuple(
+            intent
+            for intent, patterns in INTENT_PATTERNS.items()
+            for pattern in patterns
+            if pattern in features.hits('intent', intent)
+        )
         
         # Check for follow-up patterns
-        follow_up_patterns = ['what about', 'how about', 'and', 'also', 'then', 'what regarding']
-        is_follow_up = any(pattern in message_lower for pattern in follow_up_patterns)
+        is_follow_up = features.has('follow_up', 'any')
+        keywords = tuple(w for w in features.words if len(w) > 3)
+        
+        return matched, is_follow_up, keywords
+    
+    def detect_intent(self, message: str, user_id: str = None, features: Optional[QueryFeatures] = None) -> Dict:
+        """Detect what the user is asking about, using context"""
+        features = extract_query_features(message, features)
+        matched, is_follow_up, keywords = intent_cache.get_or_compute(
+            features.cache_key, lambda: self._match_intents(features)
+        )
         
         # Detect primary intent
-        detected_intent = 'general'
-        confidence = 0
+        detected_intent = matched[-1] if matched else 'general'
+        confidence = 10 * len(matched)
         
-        for intent, patterns in intents.items():
-            for pattern in patterns:
-                if pattern in message_lower:
-                    # If it's a follow-up, give higher weight to related intents
-                    if is_follow_up and user_id:
-                        last_intent = self.get_context(user_id, 'last_intent')
-                        if last_intent and intent == last_intent:
-                            confidence += 30
-                    
-                    confidence += 10
-                    detected_intent = intent
+        # If it's a follow-up, give higher weight to related intents
+        if is_follow_up and user_id:
+            last_intent = self.get_context(user_id, 'last_intent')
+            if last_intent:
+                confidence += 30 * matched.count(last_intent)
         
         return {
             'intent': detected_intent,
             'confidence': min(100, confidence),
             'is_follow_up': is_follow_up,
-            'keywords': [w for w in message_lower.split() if len(w) > 3]
+            'keywords': list(keywords)
         }
     
     def extract_topic(self, message: str) -> str:
@@ -130,6 +233,10 @@ class ConversationMemory:
             return ' '.join(key_words[:2])  # Return first two key words
         return message
 
+# Help pages are indexed as they are fetched and re-indexed whenever they change
+# (the snapshot, refresher and warm-up are started by the app, see start_help_center)
+help_pages.on_change(help_index.update_page)
+
 class HumanizedNetraEngine:
     """
     Netra AI Assistant with memory and conversation understanding
@@ -140,10 +247,6 @@ class HumanizedNetraEngine:
         self.help_url = "https://netra.strobid.com/help"
         self.memory = ConversationMemory()
         self.knowledge_base = self._initialize_knowledge()
-        
-        # Cache for fetched pages
-        self.page_cache = {}
-        self.last_fetch = None
     
     def _initialize_knowledge(self) -> Dict:
         """Initialize base knowledge about Netra"""
@@ -172,35 +275,8 @@ class HumanizedNetraEngine:
         }
     
     def _fetch_page_content(self, url: str) -> Optional[str]:
-        """Fetch and cache page content"""
-        # Check cache first
-        if url in self.page_cache:
-            cache_time, content = self.page_cache[url]
-            if datetime.now() - cache_time < timedelta(hours=1):
-                return content
-        
-        try:
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Remove unwanted elements
-            for element in soup.find_all(['script', 'style', 'nav', 'footer']):
-                element.decompose()
-            
-            # Get main content
-            main = soup.find('main') or soup.find('article') or soup.body
-            text = main.get_text(separator='\n', strip=True) if main else ''
-            
-            # Cache it
-            self.page_cache[url] = (datetime.now(), text)
-            return text
-            
-        except Exception as e:
-            print(f"Error fetching {url}: {e}")
-            return None
+        """Text of a help page - the refresher keeps it warm, so this never waits on a refetch"""
+        return help_pages.get(url)
     
     def _search_help_center(self, query: str) -> Optional[Dict]:
         """Search the help center for relevant information"""
@@ -208,34 +284,22 @@ class HumanizedNetraEngine:
         if not content:
             return None
         
-        # Simple relevance scoring
-        query_lower = query.lower()
-        lines = content.split('\n')
-        
-        relevant_lines = []
-        score = 0
-        
-        for line in lines:
-            line_lower = line.lower()
-            if len(line) > 30:  # Only meaningful lines
-                if any(word in line_lower for word in query_lower.split()):
-                    relevant_lines.append(line)
-                    score += 1
-        
-        if relevant_lines:
+        passages = help_index.search(query, k=HELP_SEARCH_RESULTS)
+        if passages:
             return {
-                'content': '\n'.join(relevant_lines[:3]),
+                'content': '\n\n'.join(passage['text'] for passage in passages),
                 'source': 'help center',
-                'score': score
+                'score': passages[0]['score']
             }
         
         return None
     
-    def _generate_response(self, message: str, user_id: str) -> str:
+    def _generate_response(self, message: str, user_id: str, features: Optional[QueryFeatures] = None) -> str:
         """Generate a response based on message and conversation history"""
+        features = extract_query_features(message, features)
         
         # Get intent
-        intent_info = self.memory.detect_intent(message, user_id)
+        intent_info = self.memory.detect_intent(message, user_id, features)
         intent = intent_info['intent']
         is_follow_up = intent_info['is_follow_up']
         
@@ -257,7 +321,7 @@ class HumanizedNetraEngine:
         elif intent == 'what_is':
             # Check knowledge base first
             for key, info in self.knowledge_base.items():
-                if any(kw in message.lower() for kw in info['keywords']):
+                if any(kw in features.lower for kw in info['keywords']):
                     response = f"**{info['title']}**\n\n"
                     response += '\n'.join(info['content'])
                     return response
@@ -366,23 +430,26 @@ class HumanizedNetraEngine:
         # Default response
         return "I'm here to help with Netra! You can ask me about creating accounts, making bookings, ratings and reviews, payments, or contacting support. What would you like to know?"
     
-    def process_query(self, message: str, user_id: str = None) -> Dict[str, Any]:
+    def process_query(self, message: str, user_id: str = None, features: Optional[QueryFeatures] = None) -> Dict[str, Any]:
         """Process user query with memory and context"""
         try:
-            # Use a default user_id if none provided
-            if not user_id:
+            # Use a default user_id if none provided; anonymous queries are not remembered
+            anonymous = not user_id
+            if anonymous:
                 user_id = hashlib.md5(message.encode()).hexdigest()
             
             print(f"\n👤 User {user_id[:8]}: {message}")
             
             # Generate response
-            response = self._generate_response(message, user_id)
+            response = self._generate_response(message, user_id, features)
             
             # Store in memory
             self.memory.add_message(user_id, message, response)
             
             # Generate suggestions based on context
             last_intent = self.memory.get_context(user_id, 'last_intent', 'general')
+            if anonymous:
+                self.memory.forget(user_id)
             
             suggestions_map = {
                 'greeting': [
@@ -5,6 +5,49 @@ import base64
 import sympy as sp # type: ignore
 from matplotlib.patches import Circle, Rectangle, Arrow, FancyArrowPatch, Polygon, Arc # type: ignore
 
+from query_features import extract_query_features, register_keyword_groups
+
+# Mechanics detection: keyword -> diagram type
+MECHANICS_DIAGRAM_KEYWORDS = {
+    'projectile': 'projectile_motion',
+    'force': 'forces', 
+    'kinematics': 'projectile_motion',
+    'pendulum': 'pendulum',
+    'spring': 'spring_mass',
+    'inclined plane': 'inclined_plane',
+    'ramp': 'inclined_plane',
+    'slope': 'inclined_plane',
+    'circular motion': 'circular_motion',
+    'centripetal': 'circular_motion',
+    'collision': 'collisions'
+}
+
+# Electromagnetism detection: keyword -> diagram type
+EM_DIAGRAM_KEYWORDS = {
+    'electric field': 'electric_field',
+    'magnetic field': 'magnetic_field', 
+    'circuit': 'circuit',
+    'voltage': 'circuit',
+    'current': 'circuit',
+    'resistor': 'circuit'
+}
+
+PHYSICS_QUERY_KEYWORDS = {
+    'angle': ['angle'],
+    'mass': ['mass', 'kg'],
+    'calculation': ['calculate', 'compute', 'solve'],
+    'kinematics': ['velocity', 'acceleration', 'projectile'],
+    'energy': ['energy', 'kinetic', 'potential'],
+    'incline': ['inclined', 'ramp', 'slope'],
+    'constants': ['constant', 'gravity', 'speed of light']
+}
+
+register_keyword_groups('physics_engine', {
+    'mechanics': MECHANICS_DIAGRAM_KEYWORDS,
+    'electromagnetism': EM_DIAGRAM_KEYWORDS,
+    **PHYSICS_QUERY_KEYWORDS
+})
+
 class PhysicsEngine:
     def __init__(self):
         self.physical_constants = {
@@ -382,7 +425,7 @@ class PhysicsEngine:
             print(f"Kinematics calculation error: {e}")
             return None
 
-    def process_physics_query(self, message):
+    def process_physics_query(self, message, features=None):
         """Process physics-related queries"""
         physics_content = {
             'visualizations': [],
@@ -391,51 +434,29 @@ class PhysicsEngine:
             'constants': []
         }
         
-        message_lower = message.lower()
-        
-        # Mechanics detection
-        mechanics_keywords = {
-            'projectile': 'projectile_motion',
-            'force': 'forces', 
-            'kinematics': 'projectile_motion',
-            'pendulum': 'pendulum',
-            'spring': 'spring_mass',
-            'inclined plane': 'inclined_plane',
-            'ramp': 'inclined_plane',
-            'slope': 'inclined_plane',
-            'circular motion': 'circular_motion',
-            'centripetal': 'circular_motion',
-            'collision': 'collisions'
-        }
-        
-        # Electromagnetism detection
-        em_keywords = {
-            'electric field': 'electric_field',
-            'magnetic field': 'magnetic_field', 
-            'circuit': 'circuit',
-            'voltage': 'circuit',
-            'current': 'circuit',
-            'resistor': 'circuit'
-        }
+        features = extract_query_features(message, features)
+        mechanics_hits = features.hits('physics_engine', 'mechanics')
+        em_hits = features.hits('physics_engine', 'electromagnetism')
         
         # Create visualizations
-        for keyword, diagram_type in mechanics_keywords.items():
-            if keyword in message_lower:
+        for keyword, diagram_type in MECHANICS_DIAGRAM_KEYWORDS.items():
+            if keyword in mechanics_hits:
                 params = {}
                 
                 # Extract parameters from message
-                if 'angle' in message_lower:
-                    if '30' in message_lower:
+                # Whole numbers only, so '30' is not read out of "300"
+                if features.has('physics_engine', 'angle'):
+                    if 30 in features.numbers:
                         params['angle'] = 30
-                    elif '45' in message_lower:
+                    elif 45 in features.numbers:
                         params['angle'] = 45
-                    elif '60' in message_lower:
+                    elif 60 in features.numbers:
                         params['angle'] = 60
                 
-                if 'mass' in message_lower or 'kg' in message_lower:
-                    if '5' in message_lower:
+                if features.has('physics_engine', 'mass') or any(unit == 'kg' for _, unit in features.units):
+                    if 5 in features.numbers:
                         params['mass'] = 5
-                    elif '10' in message_lower:
+                    elif 10 in features.numbers:
                         params['mass'] = 10
                 
                 visualization = self.create_mechanics_diagram(diagram_type, params)
@@ -445,8 +466,8 @@ class PhysicsEngine:
                         'image': visualization
                     })
         
-        for keyword, diagram_type in em_keywords.items():
-            if keyword in message_lower:
+        for keyword, diagram_type in EM_DIAGRAM_KEYWORDS.items():
+            if keyword in em_hits:
                 visualization = self.create_electromagnetism_diagram(diagram_type)
                 if visualization:
                     physics_content['visualizations'].append({
@@ -455,24 +476,24 @@ class PhysicsEngine:
                     })
         
         # Perform calculations
-        if any(word in message_lower for word in ['calculate', 'compute', 'solve']):
-            if any(word in message_lower for word in ['velocity', 'acceleration', 'projectile']):
+        if features.has('physics_engine', 'calculation'):
+            if features.has('physics_engine', 'kinematics'):
                 calc_result = self.calculate_kinematics({'type': 'projectile'})
                 if calc_result:
                     physics_content['calculations'].append(calc_result)
             
-            if any(word in message_lower for word in ['energy', 'kinetic', 'potential']):
+            if features.has('physics_engine', 'energy'):
                 calc_result = self.calculate_energy({'type': 'kinetic'})
                 if calc_result:
                     physics_content['calculations'].append(calc_result)
             
-            if any(word in message_lower for word in ['inclined', 'ramp', 'slope']):
+            if features.has('physics_engine', 'incline'):
                 calc_result = self.calculate_kinematics({'type': 'inclined_plane'})
                 if calc_result:
                     physics_content['calculations'].append(calc_result)
         
         # Add physical constants if requested
-        if any(word in message_lower for word in ['constant', 'gravity', 'speed of light']):
+        if features.has('physics_engine', 'constants'):
             physics_content['constants'] = self.physical_constants
         
         return physics_content
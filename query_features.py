@@ -0,0 +1,117 @@
+"""
+Query Features - text analysis computed once per request and shared by every classifier
+"""
+
+import hashlib
+import re
+import threading
+from functools import cached_property
+
+from keyword_matcher import KeywordMatcher, tokenize
+
+# (kind, name) -> keywords, filled in by the modules that own each table
+_keyword_groups = {}
+_matcher = None
+_matcher_lock = threading.Lock()
+
+PRINTABLE_ASCII = bytes(range(32, 127))
+
+NUMBER_PATTERN = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?')
+UNIT_PATTERN = re.compile(
+    r'(-?\d+(?:\.\d+)?)\s*'
+    r'(m/s²|m/s\^2|m/s2|m/s|km/h|kg|km|cm|mm|mg|ml|mol|°c|°f|kj|kw|hz|'
+    r'ugx|kes|usd|eur|gbp|%|g|m|s|n|j|w|v|a|k|l)(?![a-z])'
+)
+
+
+def register_keyword_groups(kind, groups):
+    """Add keyword tables to the shared matcher; a module calls this once at import"""
+    global _matcher
+    with _matcher_lock:
+        for name, keywords in groups.items():
+            _keyword_groups[(kind, name)] = tuple(keywords)
+        _matcher = None
+
+
+def _get_matcher():
+    """Compile the shared matcher on first use (and again after new registrations)"""
+    global _matcher
+    matcher = _matcher
+    if matcher is None:
+        with _matcher_lock:
+            if _matcher is None:
+                _matcher = KeywordMatcher(_keyword_groups)
+            matcher = _matcher
+    return matcher
+
+
+class QueryFeatures:
+    """
+    Everything the classifiers need to know about one message.
+
+    The expensive parts (keyword scan, tokens, numbers) are computed on first
+    access and then reused by every consumer for the rest of the request.
+    """
+
+    def __init__(self, message):
+        self.text = message
+        self.lower = message.lower()
+        self.memory_retained = False  # set once this message's facts are stored in the session
+
+    @cached_property
+    def normalized(self):
+        """Lower-cased message with runs of whitespace collapsed"""
+        text = self.lower
+        # Most messages already are (every whitespace character but ' ' is unprintable): skip the split
+        if text.isascii():
+            printable = not text.encode('ascii').translate(None, PRINTABLE_ASCII)
+        else:
+            printable = text.isprintable()
+        if printable and '  ' not in text and text[:1] != ' ' and text[-1:] != ' ':
+            return text
+        return ' '.join(self.words)
+
+    @cached_property
+    def cache_key(self):
+        """Hash of the normalized message - equal for repeated phrasings of the same text"""
+        return hashlib.blake2b(self.normalized.encode('utf-8'), digest_size=16).digest()
+
+    @cached_property
+    def words(self):
+        """Whitespace-separated words of the lower-cased message"""
+        return self.lower.split()
+
+    @cached_property
+    def tokens(self):
+        """Alphanumeric tokens - the unit keywords are matched against"""
+        return tokenize(self.lower)
+
+    @cached_property
+    def keyword_hits(self):
+        """{(kind, name): matched keywords} for every registered group"""
+        return _get_matcher().find_tokens(self.tokens)
+
+    @cached_property
+    def numbers(self):
+        """Every number in the message, in order of appearance"""
+        return [float(number) for number in NUMBER_PATTERN.findall(self.lower)]
+
+    @cached_property
+    def units(self):
+        """(value, unit) pairs such as (9.8, 'm/s²') or (5.0, 'kg')"""
+        return [(float(value), unit) for value, unit in UNIT_PATTERN.findall(self.lower)]
+
+    def hits(self, kind, name):
+        """Keywords of one group found in the message (empty set if none)"""
+        return self.keyword_hits.get((kind, name), set())
+
+    def has(self, kind, name):
+        """True if any keyword of the group occurs in the message as whole words"""
+        return (kind, name) in self.keyword_hits
+
+
+def extract_query_features(message, features=None):
+    """Return features for message, reusing the request's features when already computed"""
+    if features is not None and features.text == message:
+        return features
+    return QueryFeatures(message)
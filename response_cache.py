@@ -0,0 +1,191 @@
+"""
+Response Cache - TTL caches for upstream lookups (Wikipedia, Google)
+
+Each cache is a bounded in-memory LRU whose entries expire after a TTL. When
+RESPONSE_CACHE_DB points at a file, entries are also written to SQLite, so a
+restarted worker starts warm.
+
+Empty answers (404s, result pages with nothing on them) are cached too, under a
+shorter negative TTL, so a topic with no article is not re-fetched on every ask.
+Errors are never cached: a fetch that raises is retried next time.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 1024))
+RESPONSE_CACHE_DB = os.environ.get("RESPONSE_CACHE_DB")  # unset = memory only
+NEGATIVE_CACHE_TTL = float(os.environ.get("NEGATIVE_CACHE_TTL", 600))
+
+
+def normalize_query(query):
+    """Cache key for a free-text query: lower-cased with whitespace collapsed"""
+    return ' '.join(query.lower().split())
+
+
+class SQLiteTier:
+    """Shared on-disk store behind every TTLCache (one table, namespaced keys)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "namespace TEXT, key TEXT, value TEXT, expires REAL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self._conn.execute("DELETE FROM responses WHERE expires < ?", (time.time(),))
+            self._conn.commit()
+
+    def get(self, namespace, key):
+        """Return (value, expires) or None when absent or expired"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires FROM responses WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0]), row[1]
+
+    def put(self, namespace, key, value, expires):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (namespace, key, value, expires) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), expires)
+            )
+            self._conn.commit()
+
+    def clear(self, namespace):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE namespace = ?", (namespace,))
+            self._conn.commit()
+
+
+def _open_disk_tier():
+    """Open the SQLite tier when configured; fall back to memory only on any error"""
+    if not RESPONSE_CACHE_DB:
+        return None
+    try:
+        tier = SQLiteTier(RESPONSE_CACHE_DB)
+        print(f"💾 Response cache persisted to {RESPONSE_CACHE_DB}")
+        return tier
+    except Exception as e:
+        print(f"Response cache disk tier unavailable, using memory only: {e}")
+        return None
+
+
+disk_tier = _open_disk_tier()
+
+
+class TTLCache:
+    """Thread-safe bounded LRU whose entries expire, with an optional SQLite tier"""
+
+    def __init__(self, name, ttl, negative_ttl=NEGATIVE_CACHE_TTL, maxsize=RESPONSE_CACHE_SIZE, disk=None):
+        self.name = name
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.maxsize = maxsize
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.disk_hits = 0
+        self._data = OrderedDict()  # key -> (value, expires)
+        self._lock = threading.Lock()
+
+    def _store(self, key, value, expires):
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def lookup(self, key):
+        """Return (found, value); an expired entry counts as not found"""
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    self.negative_hits += not entry[0]
+                    return True, entry[0]
+                del self._data[key]
+
+        if self.disk is not None:
+            try:
+                entry = self.disk.get(self.name, key)
+            except Exception as e:
+                print(f"Response cache disk read error: {e}")
+                entry = None
+            if entry is not None:
+                self._store(key, *entry)
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self.negative_hits += not entry[0]
+                return True, entry[0]
+
+        with self._lock:
+            self.misses += 1
+        return False, None
+
+    def put(self, key, value):
+        """Cache a value; empty values (None, [], {}) get the shorter negative TTL"""
+        expires = time.time() + (self.ttl if value else self.negative_ttl)
+        self._store(key, value, expires)
+        if self.disk is not None:
+            try:
+                self.disk.put(self.name, key, value, expires)
+            except Exception as e:
+                print(f"Response cache disk write error: {e}")
+
+    def get_or_fetch(self, key, fetch):
+        """Return the cached value for key, calling fetch() on a miss; exceptions are not cached"""
+        found, value = self.lookup(key)
+        if found:
+            return value
+        value = fetch()
+        self.put(key, value)
+        return value
+
+    def clear(self):
+        """Drop every entry (memory and disk) and reset the counters"""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.negative_hits = self.disk_hits = 0
+        if self.disk is not None:
+            self.disk.clear(self.name)
+
+    def stats(self):
+        """Size and hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'negative_hits': self.negative_hits,
+                'disk_hits': self.disk_hits,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+# Encyclopedia summaries change slowly; search result pages go stale sooner
+wikipedia_cache = TTLCache('wikipedia', ttl=float(os.environ.get("WIKIPEDIA_CACHE_TTL", 6 * 3600)), disk=disk_tier)
+google_cache = TTLCache('google', ttl=float(os.environ.get("GOOGLE_CACHE_TTL", 3600)), disk=disk_tier)
+
+
+def get_response_cache_stats():
+    """Hit/miss counters for every response cache"""
+    return {cache.name: cache.stats() for cache in (wikipedia_cache, google_cache)}
@@ -11,6 +11,35 @@ import io
 import base64
 import random
 
+from query_features import extract_query_features, register_keyword_groups
+
+# Keyword -> diagram type; the first keyword (in table order) found in a message wins
+PHYSICS_DIAGRAM_KEYWORDS = {
+    'force': 'mechanics', 'motion': 'mechanics', 'kinematics': 'mechanics',
+    'optics': 'optics', 'light': 'optics', 'lens': 'optics',
+    'electric': 'electricity', 'electricity': 'electricity', 'electrical': 'electricity',
+    'circuit': 'electricity', 'magnetic': 'electricity',
+    'wave': 'waves', 'sound': 'waves', 'thermodynamics': 'thermodynamics'
+}
+
+BIOLOGY_DIAGRAM_KEYWORDS = {
+    'cell': 'cell', 'dna': 'dna', 'krebs': 'krebs_cycle',
+    'ecosystem': 'ecosystem', 'neuron': 'neuron', 'biology': 'general'
+}
+
+MECHANISM_DIAGRAM_KEYWORDS = {
+    'alkene': 'alkene_hydration', 'hydration': 'alkene_hydration',
+    'sn2': 'sn2', 'substitution': 'sn2',
+    'electrophilic': 'electrophilic_aromatic', 'aromatic': 'electrophilic_aromatic',
+    'carbonyl': 'carbonyl', 'mechanism': 'general'
+}
+
+register_keyword_groups('diagram', {
+    'physics': PHYSICS_DIAGRAM_KEYWORDS,
+    'biology': BIOLOGY_DIAGRAM_KEYWORDS,
+    'mechanism': MECHANISM_DIAGRAM_KEYWORDS
+})
+
 def save_plot_to_base64(fig):
     """Save matplotlib figure to base64 string"""
     try:
@@ -762,8 +791,29 @@ def create_general_mechanism(ax, parameters):
         print(f"General mechanism error: {e}")
         return None
 
-def process_scientific_content(message):
-    """Process scientific content including physics, biology, and chemistry"""
+# Plan section -> (diagram keyword group, keyword table, renderer)
+SCIENTIFIC_SECTIONS = {
+    'physics_visualizations': ('physics', PHYSICS_DIAGRAM_KEYWORDS, create_physics_visualization),
+    'biology_visualizations': ('biology', BIOLOGY_DIAGRAM_KEYWORDS, create_biology_visualization),
+    'chemical_mechanisms': ('mechanism', MECHANISM_DIAGRAM_KEYWORDS, create_chemical_mechanism_visualization)
+}
+
+def plan_scientific_content(message, features=None):
+    """Detection phase: list the (section, diagram type) pairs a message asks for, rendering nothing"""
+    features = extract_query_features(message, features)
+    plan = []
+    
+    for section, (group, keywords, _) in SCIENTIFIC_SECTIONS.items():
+        hits = features.hits('diagram', group)
+        # The first keyword in table order picks the diagram
+        diagram_type = next((diagram for keyword, diagram in keywords.items() if keyword in hits), None)
+        if diagram_type:
+            plan.append((section, diagram_type))
+    
+    return plan
+
+def render_scientific_content(plan):
+    """Execution phase: render exactly the diagrams in the plan"""
     scientific_content = {
         'physics_visualizations': [],
         'biology_visualizations': [],
@@ -774,66 +824,22 @@ def process_scientific_content(message):
         'calculations': []
     }
     
-    try:
-        message_lower = message.lower()
-        
-        # Physics detection and visualization
-        physics_keywords = {
-            'force': 'mechanics', 'motion': 'mechanics', 'kinematics': 'mechanics',
-            'optics': 'optics', 'light': 'optics', 'lens': 'optics',
-            'electric': 'electricity', 'circuit': 'electricity', 'magnetic': 'electricity',
-            'wave': 'waves', 'sound': 'waves', 'thermodynamics': 'thermodynamics'
-        }
-        
-        for keyword, physics_type in physics_keywords.items():
-            if keyword in message_lower:
-                visualization = create_physics_visualization(physics_type)
-                if visualization:
-                    scientific_content['physics_visualizations'].append({
-                        'type': physics_type,
-                        'image': visualization
-                    })
-                break
-        
-        # Biology detection and visualization
-        biology_keywords = {
-            'cell': 'cell', 'dna': 'dna', 'krebs': 'krebs_cycle',
-            'ecosystem': 'ecosystem', 'neuron': 'neuron', 'biology': 'general'
-        }
-        
-        for keyword, biology_type in biology_keywords.items():
-            if keyword in message_lower:
-                visualization = create_biology_visualization(biology_type)
-                if visualization:
-                    scientific_content['biology_visualizations'].append({
-                        'type': biology_type,
-                        'image': visualization
-                    })
-                break
-        
-        # Chemical mechanisms detection
-        mechanism_keywords = {
-            'alkene': 'alkene_hydration', 'hydration': 'alkene_hydration',
-            'sn2': 'sn2', 'substitution': 'sn2',
-            'electrophilic': 'electrophilic_aromatic', 'aromatic': 'electrophilic_aromatic',
-            'carbonyl': 'carbonyl', 'mechanism': 'general'
-        }
-        
-        for keyword, mechanism_type in mechanism_keywords.items():
-            if keyword in message_lower:
-                visualization = create_chemical_mechanism_visualization(mechanism_type)
-                if visualization:
-                    scientific_content['chemical_mechanisms'].append({
-                        'type': mechanism_type,
-                        'image': visualization
-                    })
-                break
-        
-        return scientific_content
-        
-    except Exception as e:
-        print(f"Scientific content processing error: {e}")
-        return scientific_content
+    for section, diagram_type in plan:
+        try:
+            visualization = SCIENTIFIC_SECTIONS[section][2](diagram_type)
+            if visualization:
+                scientific_content[section].append({
+                    'type': diagram_type,
+                    'image': visualization
+                })
+        except Exception as e:
+            print(f"Scientific content processing error: {e}")
+    
+    return scientific_content
+
+def process_scientific_content(message, features=None):
+    """Process scientific content including physics, biology, and chemistry"""
+    return render_scientific_content(plan_scientific_content(message, features))
 
 def format_scientific_response(scientific_content):
     """Format scientific content for response"""
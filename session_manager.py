@@ -1,11 +1,152 @@
+import os
+import re
 import time
 import secrets
-import re
+import threading
+import weakref
+from contextlib import contextmanager
 from datetime import datetime, timezone, timedelta
-from flask import session
+from flask import g, session
+
+from knowledge_base import KNOWLEDGE_DOMAINS
+from query_features import extract_query_features, register_keyword_groups
+from session_store import (
+    SESSION_FLUSH_INTERVAL, SESSION_SHARDS, SESSION_STORE, MemorySessionStore, WriteBackBuffer,
+    open_session_store, shard_index
+)
+from user_session import UserSession
+
+MEMORY_KEYWORDS = {
+    'calculation': ['calculate', 'compute', 'solve', 'math'],
+    'browsing': ['browse', 'analyze', 'find', 'search', 'look up']
+}
+
+register_keyword_groups('memory', MEMORY_KEYWORDS)
+
+# Personal facts and calculations in one pass. Only the trigger phrase is consumed (the
+# fact itself is read by a lookahead), so finditer also reports facts stated inside an
+# earlier fact's text ("i live in kampala and i like physics" gives a location and an
+# interest). More specific phrases come first: "i am from ..." is a location, not a name.
+# The leading character class lets the scan skip positions no phrase can start at.
+FACT_PATTERN = re.compile(
+    r'(?=[ibmc\d])(?:'
+    r'(?:i (?:live in|am from) |based in )(?=(?P<user_location>[^.?!]+))'
+    r'|(?:i work as |i am an? |my job is )(?=(?P<user_profession>[^.?!]+))'
+    r'|(?:i (?:like|love|enjoy) |interested in )(?=(?P<user_interests>[^.?!]+))'
+    r'|(?:my name is |i am |call me )(?=(?P<user_name>[^.?!]+))'
+    r'|(?P<calculation>\d)'
+    r')'
+)
+
+SESSION_LIFETIME = 1200  # 20 minutes in seconds
+
+# conversation_context is a ring buffer of the last N messages (get_ai_response replays them)
+CONTEXT_HISTORY_MESSAGES = int(os.environ.get("CONTEXT_HISTORY_MESSAGES", 10))
+
+class SessionCodec:
+    """UserSession <-> zlib-compressed, versioned JSON, for the SQLite and Redis session stores"""
+    
+    @staticmethod
+    def encode(user_session):
+        return user_session.to_bytes()
+    
+    @staticmethod
+    def decode(blob):
+        return UserSession.from_bytes(blob)
+
+# Session storage for conversation history: SESSION_STORE picks memory, SQLite or Redis.
+# Changed sessions are written back in batches after each request (see session_store.py);
+# the in-memory store needs no batching, so it is written through.
+session_store = open_session_store(SESSION_STORE, SessionCodec)
+session_writes = WriteBackBuffer(
+    session_store, interval=0 if isinstance(session_store, MemorySessionStore) else SESSION_FLUSH_INTERVAL
+)
+
+class SessionLocks:
+    """
+    One lock per live session id, kept in lock-striped weak maps.
+    
+    A lock exists only while some request holds a reference to it, so the map
+    never grows with dead sessions, and requests for different sessions never
+    share a lock.
+    """
+    
+    def __init__(self, shards=SESSION_SHARDS):
+        self.shards = [(threading.Lock(), weakref.WeakValueDictionary()) for _ in range(max(1, shards))]
+    
+    def get(self, session_id):
+        guard, locks = self.shards[shard_index(session_id, len(self.shards))]
+        with guard:
+            lock = locks.get(session_id)
+            if lock is None:
+                lock = locks[session_id] = threading.RLock()
+            return lock
+
+session_locks = SessionLocks()
+
+@contextmanager
+def session_lock(session_id=None):
+    """Hold the current (or given) session's lock while a request changes or reads its session"""
+    session_id = session_id or session.get('session_id')
+    if session_id is None:
+        yield
+        return
+    with session_locks.get(session_id):
+        yield
+
+class LiveSessions:
+    """
+    Session objects in use by this worker's requests, with how many requests hold each.
+    
+    Overlapping requests for one session (a chat waiting on the LLM and a second
+    message) share one object instead of each decoding its own copy from the
+    store, so neither request's changes overwrite the other's. An object is
+    dropped when its last request ends; after that the store is the source.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}  # session_id -> [session_data, requests holding it]
+    
+    def acquire(self, session_id):
+        """The live object for session_id (now held once more), or None"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            entry[1] += 1
+            return entry[0]
+    
+    def add(self, session_id, session_data):
+        with self._lock:
+            self._sessions[session_id] = [session_data, 1]
+    
+    def release(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del self._sessions[session_id]
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+live_sessions = LiveSessions()
 
-# Session storage for conversation history (shared with app.py)
-session_conversations = {}
+def _hold(session_id, session_data):
+    """Remember which live session this request holds, releasing any other it held"""
+    held_id = g.get('user_session_id')
+    if held_id is not None and held_id != session_id:
+        live_sessions.release(held_id)
+    g.user_session = session_data
+    g.user_session_id = session_id
+
+# Expired sessions are removed by a janitor thread, never on a request thread
+SESSION_JANITOR_INTERVAL = float(os.environ.get("SESSION_JANITOR_INTERVAL", 30))
+_janitor = None
+_janitor_lock = threading.Lock()
 
 def initialize_user_session():
     """Initialize a new user session with 20-minute lifetime"""
@@ -15,34 +156,13 @@ def initialize_user_session():
     session['conversation_count'] = 0
     session['last_activity'] = time.time()
     
-    # Initialize session data
-    session_data = {
-        'session_start': session['session_start'],
-        'conversation_context': [],
-        'last_topic': None,
-        'question_count': 0,
-        'user_name': None,
-        'user_interests': [],
-        'conversation_stage': 'greeting',
-        'mood': 'friendly',
-        'remembered_facts': {},
-        'recent_topics': [],
-        'personal_details': {},
-        'image_requests': 0,
-        'coding_help_requests': 0,
-        'voice_requests': 0,
-        'browsing_sessions': 0,
-        'preferred_domains': [],
-        'knowledge_usage': {},
-        'external_searches': 0,
-        'memory_retention': {},
-        'calculation_history': [],
-        'session_warnings': 0,
-        'mathematical_requests': 0,
-        'last_interaction': time.time()
-    }
-    
-    session_conversations[session['session_id']] = session_data
+    # Initialize session data (lists and dicts are only created once something is stored in them)
+    session_data = UserSession(session['session_start'], CONTEXT_HISTORY_MESSAGES)
+    
+    live_sessions.add(session['session_id'], session_data)
+    _hold(session['session_id'], session_data)
+    session_writes.mark(session['session_id'], session_data, session['session_start'] + SESSION_LIFETIME)
+    _start_janitor()
     return session_data
 
 def get_user_session():
@@ -52,15 +172,44 @@ def get_user_session():
     
     session_id = session['session_id']
     
-    # Check if session exists in storage
-    if session_id not in session_conversations:
-        return initialize_user_session()
-    
-    # Update last activity
-    session['last_activity'] = time.time()
-    session_conversations[session_id]['last_activity'] = time.time()
+    with session_lock(session_id):
+        if g.get('user_session_id') == session_id:
+            # Already held by this request
+            session_data = g.user_session
+        else:
+            # Another request of this worker may be using the session right now; share its object
+            session_data = live_sessions.acquire(session_id)
+            if session_data is None:
+                # Check if session exists in storage (on any worker); if the store is down, start over
+                try:
+                    session_data = session_writes.get(session_id)
+                except Exception as e:
+                    print(f"Session store read failed, starting a new session: {e}")
+                    session_data = None
+                if session_data is None:
+                    return initialize_user_session()
+                live_sessions.add(session_id, session_data)
+            _hold(session_id, session_data)
+        
+        # Update last activity
+        session['last_activity'] = time.time()
+        session_data.last_activity = session['last_activity']
     
-    return session_conversations[session_id]
+    return session_data
+
+def save_user_session():
+    """Queue the session used by this request for write-back and let go of it (called when every request ends)"""
+    session_data = g.pop('user_session', None)
+    session_id = g.pop('user_session_id', None)
+    if session_data is None:
+        return
+    with session_lock(session_id):
+        try:
+            # A session cleared from the cookie (expired) is not written back
+            if session.get('session_id') == session_id:
+                session_writes.mark(session_id, session_data, session_data.session_start + SESSION_LIFETIME)
+        finally:
+            live_sessions.release(session_id)
 
 def is_session_expired():
     """Check if current session has expired (20 minutes)"""
@@ -68,7 +217,7 @@ def is_session_expired():
         return True
     
     session_duration = time.time() - session['session_start']
-    return session_duration > 1200  # 20 minutes in seconds
+    return session_duration > SESSION_LIFETIME
 
 def get_session_time_remaining():
     """Get remaining time in session in minutes"""
@@ -76,15 +225,15 @@ def get_session_time_remaining():
         return 0
     
     elapsed = time.time() - session['session_start']
-    remaining = 1200 - elapsed  # 20 minutes in seconds
+    remaining = SESSION_LIFETIME - elapsed
     return max(0, int(remaining / 60))  # Convert to minutes
 
 def get_session_warning(user_session):
     """Get session warning message if needed"""
     time_remaining = get_session_time_remaining()
     
-    if time_remaining <= 5 and time_remaining > 0 and user_session['session_warnings'] < 2:
-        user_session['session_warnings'] += 1
+    if time_remaining <= 5 and time_remaining > 0 and user_session.session_warnings < 2:
+        user_session.session_warnings += 1
         if time_remaining == 1:
             return "⏰ **Session Alert**: Your chat session will expire in 1 minute. Please complete your conversation."
         else:
@@ -92,94 +241,151 @@ def get_session_warning(user_session):
     
     return None
 
-def cleanup_expired_sessions():
-    """Clean up expired sessions (older than 20 minutes)"""
-    current_time = time.time()
-    expired_sessions = []
-    
-    for session_id, session_data in session_conversations.items():
-        if current_time - session_data.get('session_start', 0) > 1200:  # 20 minutes
-            expired_sessions.append(session_id)
-    
-    for session_id in expired_sessions:
-        del session_conversations[session_id]
+def cleanup_expired_sessions(now=None):
+    """Remove sessions older than 20 minutes; costs O(expired), not O(all sessions)"""
+    return session_store.expire(now)
 
-def enhance_memory_retention(user_session, message, response):
-    """Enhanced memory system to prevent conversation breaks"""
-    message_lower = message.lower()
-    
-    # Store important facts from conversation
-    important_patterns = {
-        'user_name': r'(?:my name is|i am|call me) ([^.?!]+)',
-        'user_location': r'(?:i live in|i am from|based in) ([^.?!]+)',
-        'user_interests': r'(?:i like|i love|i enjoy|interested in) ([^.?!]+)',
-        'user_profession': r'(?:i work as|i am a|my job is) ([^.?!]+)'
-    }
+def _run_janitor():
+    """Expire sessions when the next one is due (memory store) or every interval (shared stores)"""
+    while True:
+        next_expiry = session_store.next_expiry() if isinstance(session_store, MemorySessionStore) else None
+        if next_expiry is None:
+            time.sleep(SESSION_JANITOR_INTERVAL)
+        else:
+            # New sessions always expire after the ones already queued, so no need to wake early;
+            # waking at most once a second batches sessions that expire close together
+            time.sleep(min(SESSION_JANITOR_INTERVAL, max(1.0, next_expiry - time.time())))
+        try:
+            removed = cleanup_expired_sessions()
+        except Exception as e:
+            print(f"Session janitor error: {e}")
+            continue
+        if removed:
+            print(f"🧹 Removed {removed} expired sessions")
+
+def _start_janitor():
+    global _janitor
+    if _janitor is not None:
+        return
+    with _janitor_lock:
+        if _janitor is not None:
+            return
+        _janitor = threading.Thread(target=_run_janitor, name='session-janitor', daemon=True)
+    _janitor.start()
+
+def get_session_stats():
+    """Session store size and expiry counters, plus write-back counters"""
+    stats = session_store.stats()
+    stats.update(session_writes.stats())
+    stats['live'] = len(live_sessions)
+    with _memory_context_stats_lock:
+        stats['memory_context'] = dict(memory_context_stats)
+    return stats
+
+def extract_memory_facts(features):
+    """{fact type: text} for the personal facts stated in the message, plus 'calculation' if it has numbers"""
+    facts = {}
+    for match in FACT_PATTERN.finditer(features.lower):
+        facts.setdefault(match.lastgroup, match.group(match.lastgroup).strip())
+    return facts
+
+def enhance_memory_retention(user_session, message, response, features=None):
+    """Enhanced memory system to prevent conversation breaks (runs once per message, however often it is called)"""
+    features = extract_query_features(message, features)
+    if features.memory_retained:
+        return
+    features.memory_retained = True
     
-    for fact_type, pattern in important_patterns.items():
-        match = re.search(pattern, message_lower)
-        if match and fact_type not in user_session['memory_retention']:
-            user_session['memory_retention'][fact_type] = match.group(1).strip()
+    facts = extract_memory_facts(features)
+    for fact_type, value in facts.items():
+        if fact_type != 'calculation' and fact_type not in user_session.peek('memory_retention'):
+            user_session.memory_retention[fact_type] = value
+            mark_memory_changed(user_session)
     
     # Store calculation results
-    if any(word in message_lower for word in ['calculate', 'compute', 'solve', 'math']):
-        calculation_match = re.search(r'([\d\s\+\-\*\/\(\)\.]+)=?', message)
-        if calculation_match:
-            user_session['calculation_history'] = user_session.get('calculation_history', [])
-            user_session['calculation_history'].append({
-                'query': message,
-                'result': response,
-                'timestamp': time.time()
-            })
-    
-    # Keep only recent calculations (last 10)
-    if len(user_session.get('calculation_history', [])) > 10:
-        user_session['calculation_history'] = user_session['calculation_history'][-10:]
+    if 'calculation' in facts and features.has('memory', 'calculation'):
+        calculation_history = user_session.calculation_history
+        calculation_history.append({
+            'query': message,
+            'result': response,
+            'timestamp': time.time()
+        })
+        
+        # Keep only recent calculations (last 10)
+        if len(calculation_history) > 10:
+            del calculation_history[:-10]
 
-def get_memory_context(user_session):
-    """Get comprehensive memory context for AI"""
+def mark_memory_changed(user_session):
+    """A remembered fact has changed; render the memory context again on next use"""
+    user_session.memory_context = None
+
+def top_domains(user_session):
+    """The (at most two) knowledge domains the user asks about most"""
+    ranked = sorted(user_session.peek('knowledge_usage').items(), key=lambda x: x[1], reverse=True)[:2]
+    return tuple(domain for domain, count in ranked if count > 0)
+
+def memory_inputs(user_session):
+    """What the rendered memory facts show besides remembered facts: name, recent topics and top domains"""
+    return user_session.user_name, tuple(user_session.peek('recent_topics')[-3:]), top_domains(user_session)
+
+def render_memory_facts(user_session):
+    """The session-dependent part of the memory context"""
     memory_parts = []
     
     # Personal information
-    if user_session.get('user_name'):
-        memory_parts.append(f"User's name: {user_session['user_name']}")
+    if user_session.user_name:
+        memory_parts.append(f"User's name: {user_session.user_name}")
     
-    if user_session.get('memory_retention'):
-        for fact_type, value in user_session['memory_retention'].items():
-            memory_parts.append(f"{fact_type.replace('_', ' ').title()}: {value}")
+    for fact_type, value in user_session.peek('memory_retention').items():
+        memory_parts.append(f"{fact_type.replace('_', ' ').title()}: {value}")
     
     # Recent topics
-    if user_session.get('recent_topics'):
-        memory_parts.append(f"Recent topics: {', '.join(user_session['recent_topics'][-3:])}")
+    if user_session.peek('recent_topics'):
+        memory_parts.append(f"Recent topics: {', '.join(user_session.recent_topics[-3:])}")
     
     # Domain preferences
-    if user_session.get('knowledge_usage'):
-        top_domains = sorted(user_session['knowledge_usage'].items(), key=lambda x: x[1], reverse=True)[:2]
-        if top_domains:
-            from knowledge_base import KNOWLEDGE_DOMAINS
-            domain_names = [KNOWLEDGE_DOMAINS[domain]['name'] for domain, count in top_domains if count > 0]
-            if domain_names:
-                memory_parts.append(f"User frequently asks about: {', '.join(domain_names)}")
+    domain_names = [KNOWLEDGE_DOMAINS[domain]['name'] for domain in top_domains(user_session)]
+    if domain_names:
+        memory_parts.append(f"User frequently asks about: {', '.join(domain_names)}")
+    
+    return " | ".join(memory_parts)
+
+memory_context_stats = {'renders': 0, 'reuses': 0}
+_memory_context_stats_lock = threading.Lock()
+
+def get_memory_context(user_session):
+    """Get comprehensive memory context for AI (facts are re-rendered only when what they show has changed)"""
+    inputs = memory_inputs(user_session)
+    cached = user_session.memory_context
+    if cached is not None and cached[0] == inputs:
+        facts = cached[1]
+        outcome = 'reuses'
+    else:
+        facts = render_memory_facts(user_session)
+        user_session.memory_context = (inputs, facts)
+        outcome = 'renders'
+    with _memory_context_stats_lock:
+        memory_context_stats[outcome] += 1
     
     # Session info
     time_remaining = get_session_time_remaining()
-    memory_parts.append(f"Session time remaining: {time_remaining} minutes")
-    
-    return " | ".join(memory_parts) if memory_parts else "New conversation"
+    session_info = f"Session time remaining: {time_remaining} minutes"
+    return f"{facts} | {session_info}" if facts else session_info
 
-def update_conversation_memory(user_session, message, response):
+def update_conversation_memory(user_session, message, response, features=None):
     """Enhanced conversation memory tracking"""
-    message_lower = message.lower()
+    features = extract_query_features(message, features)
+    message_lower = features.lower
     
     # Track browsing sessions
-    if any(word in message_lower for word in ['browse', 'analyze', 'find', 'search', 'look up']):
-        user_session['browsing_sessions'] = user_session.get('browsing_sessions', 0) + 1
+    if features.has('memory', 'browsing'):
+        user_session.browsing_sessions += 1
     
     # Update recent topics
-    user_session['recent_topics'] = user_session.get('recent_topics', [])
-    if len(user_session['recent_topics']) >= 5:
-        user_session['recent_topics'].pop(0)
-    user_session['recent_topics'].append(message_lower[:40])
+    recent_topics = user_session.recent_topics
+    if len(recent_topics) >= 5:
+        recent_topics.pop(0)
+    recent_topics.append(message_lower[:40])
     
-    user_session['last_interaction'] = time.time()
-    user_session['last_topic'] = message_lower
\ No newline at end of file
+    user_session.last_interaction = time.time()
+    user_session.last_topic = message_lower
\ No newline at end of file
@@ -0,0 +1,476 @@
+"""
+Session Store - where chat sessions live between requests
+
+memory    a dict in this process (the default; one worker only)
+sqlite    a WAL-mode SQLite file every worker on the host opens
+redis     any server speaking the Redis protocol (RESP), shared across hosts
+
+SESSION_STORE picks the backend: "memory", "sqlite:///path/to/sessions.db" or
+"redis://[:password@]host:port/db". With a shared backend, any worker can serve
+any request of a session, so no sticky sessions are needed.
+
+Requests do not write to the backend themselves. A changed session is handed to
+WriteBackBuffer, which writes every dirty session in one batch (one transaction,
+or one pipelined round trip) every SESSION_FLUSH_INTERVAL seconds. Until then the
+worker serves that session from its dirty copy. Sessions are encoded when they
+are handed over, on the request's thread, so the flusher never reads a session
+another request is changing.
+
+Within one worker, overlapping requests for a session share one live object
+(see session_manager.LiveSessions). Across workers, writes are last-writer-wins:
+two workers serving the same session at the same moment each write their whole
+copy, and the later write replaces the earlier one.
+
+The memory backend is split into SESSION_SHARDS lock-striped shards, so
+requests for different sessions rarely wait on the same lock.
+"""
+
+import atexit
+import heapq
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import unquote, urlparse
+
+SESSION_STORE = os.environ.get("SESSION_STORE", "memory")
+SESSION_FLUSH_INTERVAL = float(os.environ.get("SESSION_FLUSH_INTERVAL", 0.05))  # 0 = write through
+SESSION_SHARDS = int(os.environ.get("SESSION_SHARDS", 16))
+
+
+def shard_index(session_id, shards):
+    """Stable shard number for a session id (ids are random hex, so this spreads evenly)"""
+    return zlib.crc32(session_id.encode('utf-8')) % shards
+
+
+class SessionStore:
+    """
+    Interface every backend implements.
+
+    Sessions are session objects (UserSession). The memory backend keeps the
+    objects themselves; the others store them as bytes produced by the codec (an
+    object with encode(session) -> bytes and decode(bytes) -> session).
+    """
+
+    name = 'base'
+    codec = None
+
+    def encode(self, data):
+        """The value put_many stores for a session (the session object itself when there is no codec)"""
+        return self.codec.encode(data) if self.codec is not None else data
+
+    def decode(self, value):
+        """A stored value back into a session; None (a missing session) when it cannot be read"""
+        try:
+            return self.codec.decode(value)
+        except Exception as e:
+            print(f"Unreadable session in {self.name} store, starting over: {e}")
+            return None
+
+    def get(self, session_id):
+        """The session object, or None when it does not exist or has expired"""
+        raise NotImplementedError
+
+    def put_many(self, items):
+        """Write [(session_id, encoded value, expires_at)] in one batch"""
+        raise NotImplementedError
+
+    def put(self, session_id, data, expires_at):
+        self.put_many([(session_id, self.encode(data), expires_at)])
+
+    def delete(self, session_id):
+        raise NotImplementedError
+
+    def expire(self, now=None):
+        """Remove expired sessions; returns how many were removed"""
+        return 0
+
+    def stats(self):
+        return {'backend': self.name}
+
+
+class _MemoryShard:
+    """One stripe of the memory store: its own sessions, expiry heap and lock"""
+
+    def __init__(self):
+        self.sessions = {}
+        self.expires = {}
+        self.heap = []  # (expires_at, session_id)
+        self.lock = threading.Lock()
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Session objects in dicts of this process, split over lock-striped shards.
+
+    Each shard expires its sessions through a min-heap of (expires_at,
+    session_id), so expiry costs O(expired) and holds one shard lock at a time.
+    """
+
+    name = 'memory'
+
+    def __init__(self, shards=SESSION_SHARDS):
+        self.shards = [_MemoryShard() for _ in range(max(1, shards))]
+        self.expired = 0
+
+    def _shard(self, session_id):
+        return self.shards[shard_index(session_id, len(self.shards))]
+
+    def get(self, session_id):
+        shard = self._shard(session_id)
+        with shard.lock:
+            return shard.sessions.get(session_id)
+
+    def put_many(self, items):
+        for session_id, data, expires_at in items:
+            shard = self._shard(session_id)
+            with shard.lock:
+                shard.sessions[session_id] = data
+                if shard.expires.get(session_id) != expires_at:
+                    shard.expires[session_id] = expires_at
+                    heapq.heappush(shard.heap, (expires_at, session_id))
+
+    def delete(self, session_id):
+        shard = self._shard(session_id)
+        with shard.lock:
+            shard.sessions.pop(session_id, None)
+            shard.expires.pop(session_id, None)
+
+    def expire(self, now=None):
+        """Pop only the heap entries that are due: O(expired), not O(all sessions)"""
+        now = time.time() if now is None else now
+        removed = 0
+        for shard in self.shards:
+            with shard.lock:
+                while shard.heap and shard.heap[0][0] <= now:
+                    expires_at, session_id = heapq.heappop(shard.heap)
+                    # Skip entries superseded by a later put or a delete
+                    if shard.expires.get(session_id) != expires_at:
+                        continue
+                    del shard.expires[session_id]
+                    shard.sessions.pop(session_id, None)
+                    removed += 1
+        self.expired += removed
+        return removed
+
+    def next_expiry(self):
+        due = []
+        for shard in self.shards:
+            with shard.lock:
+                if shard.heap:
+                    due.append(shard.heap[0][0])
+        return min(due, default=None)
+
+    def stats(self):
+        sessions = queued = 0
+        for shard in self.shards:
+            with shard.lock:
+                sessions += len(shard.sessions)
+                queued += len(shard.heap)
+        return {
+            'backend': self.name,
+            'shards': len(self.shards),
+            'sessions': sessions,
+            'expiry_queue': queued,
+            'expired': self.expired
+        }
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions as encoded blobs in one SQLite table, shared by every worker on the host"""
+
+    name = 'sqlite'
+
+    def __init__(self, path, codec):
+        self.path = path
+        self.codec = codec
+        self.expired = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, data BLOB, expires REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)")
+            self._conn.commit()
+
+    def get(self, session_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE session_id = ? AND expires > ?",
+                (session_id, time.time())
+            ).fetchone()
+        return self.decode(row[0]) if row else None
+
+    def put_many(self, items):
+        rows = list(items)
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)", rows)
+
+    def delete(self, session_id):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def expire(self, now=None):
+        """Delete through the expires index, so only expired rows are touched"""
+        now = time.time() if now is None else now
+        with self._lock:
+            with self._conn:
+                removed = self._conn.execute("DELETE FROM sessions WHERE expires <= ?", (now,)).rowcount
+            self.expired += removed
+        return removed
+
+    def stats(self):
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {'backend': self.name, 'path': self.path, 'sessions': count, 'expired': self.expired}
+
+
+class RedisError(Exception):
+    """Error reply from the Redis server"""
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Sessions as encoded values under netragpt:session:<id>, over a minimal RESP client.
+
+    Expiry is left to the server (every SET carries a PX time to live). One
+    connection per store, serialized by a lock; batches are pipelined.
+    """
+
+    name = 'redis'
+    KEY_PREFIX = 'netragpt:session:'
+
+    def __init__(self, url, codec, timeout=5.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.codec = codec
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    # --- RESP protocol ---------------------------------------------------
+
+    @staticmethod
+    def _encode_command(*args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode('utf-8')
+        if kind == b'-':
+            raise RedisError(rest.decode('utf-8'))
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(rest)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise RedisError(f"Unexpected reply {line!r}")
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock, self._reader = sock, sock.makefile('rb')
+        setup = []
+        if self.password:
+            setup.append(('AUTH', self.password))
+        if self.db:
+            setup.append(('SELECT', self.db))
+        if setup:
+            self._send(setup)
+
+    def _send(self, commands):
+        self._sock.sendall(b''.join(self._encode_command(*command) for command in commands))
+        replies = [self._read_reply_safely() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def _read_reply_safely(self):
+        # Read every reply of a pipeline even when one of them is an error
+        try:
+            return self._read_reply()
+        except RedisError as e:
+            return e
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = self._reader = None
+
+    def pipeline(self, commands):
+        """Send commands in one round trip and return their replies; reconnects once on a dropped connection"""
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._send(commands)
+                except (ConnectionError, OSError):
+                    self._close()
+                    if attempt == 2:
+                        raise
+
+    # --- SessionStore ----------------------------------------------------
+
+    def get(self, session_id):
+        value = self.pipeline([('GET', self.KEY_PREFIX + session_id)])[0]
+        return self.decode(value) if value is not None else None
+
+    def put_many(self, items):
+        now = time.time()
+        commands = [
+            ('SET', self.KEY_PREFIX + session_id, value, 'PX', max(1, int(1000 * (expires_at - now))))
+            for session_id, value, expires_at in items
+        ]
+        if commands:
+            self.pipeline(commands)
+
+    def delete(self, session_id):
+        self.pipeline([('DEL', self.KEY_PREFIX + session_id)])
+
+    def ping(self):
+        """Raise unless the server answers (open_session_store checks this before using Redis)"""
+        self.pipeline([('PING',)])
+
+    def stats(self):
+        return {'backend': self.name, 'server': f"{self.host}:{self.port}/{self.db}"}
+
+
+class WriteBackBuffer:
+    """
+    Dirty sessions waiting to be written to the store.
+
+    mark() encodes a changed session on the caller's thread (which should hold
+    the session's lock) and records it; a flusher thread writes everything
+    marked in one put_many batch every interval seconds (or mark() writes
+    through when the interval is 0). get() serves dirty copies first, so a
+    worker always sees its own latest writes.
+    """
+
+    def __init__(self, store, interval=SESSION_FLUSH_INTERVAL):
+        self.store = store
+        self.interval = interval
+        self.flushes = 0
+        self.written = 0
+        self.errors = 0
+        self._dirty = {}  # session_id -> (data, encoded value, expires_at)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._dirty.get(session_id)
+        if entry is not None:
+            return entry[0]
+        return self.store.get(session_id)
+
+    def mark(self, session_id, data, expires_at):
+        value = self.store.encode(data)
+        if self.interval <= 0:
+            self.store.put_many([(session_id, value, expires_at)])
+            return
+        with self._lock:
+            self._dirty[session_id] = (data, value, expires_at)
+        self._start()
+        self._wake.set()
+
+    def discard(self, session_id):
+        with self._lock:
+            self._dirty.pop(session_id, None)
+        self.store.delete(session_id)
+
+    def flush(self):
+        """Write every dirty session now, in one batch"""
+        with self._lock:
+            batch, self._dirty = self._dirty, {}
+        if not batch:
+            return 0
+        try:
+            self.store.put_many([(session_id, value, expires_at) for session_id, (_, value, expires_at) in batch.items()])
+        except Exception as e:
+            # Keep the sessions dirty (unless they changed again since) and retry next flush
+            with self._lock:
+                for session_id, entry in batch.items():
+                    self._dirty.setdefault(session_id, entry)
+                self.errors += 1
+            print(f"Session store write failed, will retry: {e}")
+            return 0
+        with self._lock:
+            self.flushes += 1
+            self.written += len(batch)
+        return len(batch)
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            # Let the other requests of this moment join the batch
+            time.sleep(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='session-write-back', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'dirty': len(self._dirty),
+                'flushes': self.flushes,
+                'sessions_written': self.written,
+                'write_errors': self.errors
+            }
+
+
+def open_session_store(spec, codec):
+    """Backend for a SESSION_STORE value; falls back to memory when it cannot be opened"""
+    try:
+        if spec.startswith('sqlite:///'):
+            store = SQLiteSessionStore(spec[len('sqlite:///'):], codec)
+        elif spec.startswith('redis://'):
+            store = RedisSessionStore(spec, codec)
+            store.ping()
+        else:
+            return MemorySessionStore()
+        print(f"💾 Sessions stored in {store.name}")
+        return store
+    except Exception as e:
+        print(f"Session store {spec} unavailable, keeping sessions in memory: {e}")
+        return MemorySessionStore()
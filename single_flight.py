@@ -0,0 +1,79 @@
+"""
+Single Flight - coalesce identical concurrent upstream fetches into one call
+
+When several threads ask for the same key at once, the first one (the leader)
+runs the fetch and the rest wait for it and share its result - or its
+exception - instead of each going to the network.
+"""
+
+import threading
+
+
+class _Call:
+    """One in-flight fetch that followers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Per-key coalescing of concurrent calls, with counters of upstream requests saved"""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.executions = 0
+        self.shared = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fetch):
+        """Return fetch() for key, running it once for all concurrent callers"""
+        with self._lock:
+            self.calls += 1
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.executions += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fetch()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+
+    def stats(self):
+        """Calls made, upstream fetches actually run and fetches saved by sharing"""
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'upstream_requests': self.executions,
+                'saved_requests': self.shared,
+                'in_flight': len(self._inflight)
+            }
+
+
+wikipedia_flight = SingleFlight('wikipedia')
+google_flight = SingleFlight('google')
+help_page_flight = SingleFlight('netra_help')
+
+
+def get_single_flight_stats():
+    """Counters for every single-flight group"""
+    return {group.name: group.stats() for group in (wikipedia_flight, google_flight, help_page_flight)}
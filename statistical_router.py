@@ -0,0 +1,149 @@
+"""
+Statistical Router - hashed bag-of-words engine classifier scored with one matrix multiply
+
+Train offline from a JSONL log, one query per line:
+
+    {"message": "what is the velocity of a falling rock", "engine": "physics"}
+
+    python statistical_router.py train queries.jsonl --output router_weights.npz
+
+Lines without an "engine" label are skipped unless --weak-labels is given, in
+which case the keyword router labels them.
+"""
+
+import argparse
+import json
+import sys
+import zlib
+
+import numpy as np # type: ignore
+
+from query_features import QueryFeatures
+
+ENGINES = ('netra', 'physics', 'chemistry', 'biology', 'general')
+NUM_FEATURES = 2 ** 14
+
+# Fields a logged line may keep its text in
+MESSAGE_FIELDS = ('message', 'text', 'query')
+LABEL_FIELDS = ('engine', 'label')
+
+
+def feature_indices(tokens, num_features=NUM_FEATURES):
+    """Hash unigrams and bigrams into column indices (crc32 is stable across workers)"""
+    grams = list(tokens) + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+    return [zlib.crc32(gram.encode('utf-8')) % num_features for gram in grams]
+
+
+def vectorize(tokens, num_features=NUM_FEATURES):
+    """Hashed bag-of-words count vector for one message"""
+    vector = np.zeros(num_features, dtype=np.float32)
+    np.add.at(vector, feature_indices(tokens, num_features), 1.0)
+    return vector
+
+
+class StatisticalRouter:
+    """Multinomial naive Bayes over hashed n-grams: one (engines x features) weight matrix"""
+
+    def __init__(self, weights, bias, engines=ENGINES):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.engines = tuple(engines)
+        self.num_features = self.weights.shape[1]
+
+    def scores(self, tokens):
+        """Probability per engine for a tokenized message"""
+        logits = self.weights @ vectorize(tokens, self.num_features) + self.bias
+        logits -= logits.max()
+        probabilities = np.exp(logits)
+        return probabilities / probabilities.sum()
+
+    def predict(self, features):
+        """Return (engine, confidence) for a QueryFeatures object"""
+        if not features.tokens:
+            return 'general', 0.0
+
+        probabilities = self.scores(features.tokens)
+        best = int(probabilities.argmax())
+        return self.engines[best], float(probabilities[best])
+
+    @classmethod
+    def train(cls, examples, num_features=NUM_FEATURES, alpha=1.0):
+        """Fit from (message, engine) pairs"""
+        engines = ENGINES
+        counts = np.zeros((len(engines), num_features), dtype=np.float64)
+        documents = np.zeros(len(engines), dtype=np.float64)
+
+        for message, engine in examples:
+            row = engines.index(engine)
+            tokens = QueryFeatures(message).tokens
+            np.add.at(counts[row], feature_indices(tokens, num_features), 1.0)
+            documents[row] += 1
+
+        # Laplace-smoothed log likelihoods and log priors
+        weights = np.log((counts + alpha) / (counts.sum(axis=1, keepdims=True) + alpha * num_features))
+        bias = np.log((documents + alpha) / (documents.sum() + alpha * len(engines)))
+        return cls(weights, bias, engines)
+
+    def save(self, path):
+        """Write the weights to a compressed .npz file"""
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, engines=np.array(self.engines))
+
+    @classmethod
+    def load(cls, path):
+        """Load weights written by save()"""
+        with np.load(path) as data:
+            return cls(data['weights'], data['bias'], [str(engine) for engine in data['engines']])
+
+
+def read_examples(path, weak_labels=False):
+    """Yield (message, engine) pairs from a JSONL log"""
+    if weak_labels:
+        from engine_router import route_by_keywords
+
+    with open(path, encoding='utf-8') as log:
+        for line in log:
+            line = line.strip()
+            if not line:
+                continue
+
+            record = json.loads(line)
+            message = next((record[field] for field in MESSAGE_FIELDS if record.get(field)), None)
+            if not message:
+                continue
+
+            engine = next((record[field] for field in LABEL_FIELDS if record.get(field)), None)
+            if engine is None and weak_labels:
+                engine = route_by_keywords(QueryFeatures(message))
+
+            if engine in ENGINES:
+                yield message, engine
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the statistical engine router")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    train = subcommands.add_parser('train', help="fit weights from a JSONL query log")
+    train.add_argument('log', help="JSONL file with a message and (optionally) an engine label per line")
+    train.add_argument('--output', default='router_weights.npz')
+    train.add_argument('--features', type=int, default=NUM_FEATURES)
+    train.add_argument('--weak-labels', action='store_true',
+                       help="label unlabeled lines with the keyword router")
+
+    args = parser.parse_args(argv)
+
+    examples = list(read_examples(args.log, args.weak_labels))
+    if not examples:
+        print("No labelled examples found", file=sys.stderr)
+        return 1
+
+    router = StatisticalRouter.train(examples, num_features=args.features)
+    router.save(args.output)
+
+    per_engine = {engine: sum(1 for _, label in examples if label == engine) for engine in ENGINES}
+    print(f"Trained on {len(examples)} examples {per_engine} -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
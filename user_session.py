@@ -0,0 +1,141 @@
+"""
+User Session - the server-side state of one chat session
+
+A slotted object instead of a 25-key dict: scalar fields are plain slots, and
+the lists and dicts most sessions never touch (interests, personal details,
+calculation history...) are only allocated when first used. Sessions serialize
+to compact, versioned JSON (zlib-compressed) for the shared session stores: plain
+data only, readable by any Python version during a rolling deploy.
+"""
+
+import json
+import time
+import zlib
+from collections import deque
+from types import MappingProxyType
+
+from message_record import Message
+
+FORMAT_VERSION = 1
+
+# Scalar fields and their values in a new session
+SCALAR_FIELDS = {
+    'session_start': 0.0,
+    'last_activity': 0.0,
+    'last_interaction': 0.0,
+    'last_topic': None,
+    'user_name': None,
+    'conversation_stage': 'greeting',
+    'mood': 'friendly',
+    'question_count': 0,
+    'session_warnings': 0,
+    'image_requests': 0,
+    'coding_help_requests': 0,
+    'voice_requests': 0,
+    'browsing_sessions': 0,
+    'external_searches': 0,
+    'mathematical_requests': 0,
+}
+
+# Containers allocated on first access
+LAZY_FIELDS = {
+    'user_interests': list,
+    'recent_topics': list,
+    'preferred_domains': list,
+    'calculation_history': list,
+    'remembered_facts': dict,
+    'personal_details': dict,
+    'knowledge_usage': dict,
+    'memory_retention': dict,
+}
+
+# What peek() returns for a container that was never written
+EMPTY = {list: (), dict: MappingProxyType({})}
+
+
+def _lazy_field(name, factory):
+    slot = '_' + name
+
+    def get(self):
+        value = getattr(self, slot)
+        if value is None:
+            value = factory()
+            setattr(self, slot, value)
+        return value
+
+    def set(self, value):
+        # None drops the container; it is created again on next use
+        setattr(self, slot, value)
+
+    return property(get, set, doc=f"{name} ({factory.__name__}, created on first use)")
+
+
+class UserSession:
+    """One chat session; conversation_context is a ring buffer of Message records"""
+
+    __slots__ = tuple(SCALAR_FIELDS) + tuple('_' + name for name in LAZY_FIELDS) + (
+        'context_size', '_conversation_context', 'memory_context'
+    )
+
+    def __init__(self, session_start=None, context_size=10):
+        for name, value in SCALAR_FIELDS.items():
+            setattr(self, name, value)
+        for name in LAZY_FIELDS:
+            setattr(self, '_' + name, None)
+        now = time.time()
+        self.session_start = now if session_start is None else session_start
+        self.last_activity = self.last_interaction = now
+        self.context_size = context_size
+        self._conversation_context = None
+        self.memory_context = None  # (inputs, rendered memory facts); None until rendered or after a fact changes
+
+    @property
+    def conversation_context(self):
+        """The last context_size messages (created on first use)"""
+        if self._conversation_context is None:
+            self._conversation_context = deque(maxlen=self.context_size)
+        return self._conversation_context
+
+    def peek(self, name):
+        """Read a lazy container without allocating it (an empty, read-only one if never written)"""
+        return getattr(self, '_' + name) or EMPTY[LAZY_FIELDS[name]]
+
+    def to_bytes(self):
+        """Compact form: JSON arrays in field order (no key names), zlib-compressed"""
+        context = self._conversation_context
+        state = [
+            FORMAT_VERSION,
+            self.context_size,
+            [getattr(self, name) for name in SCALAR_FIELDS],
+            [getattr(self, '_' + name) or None for name in LAZY_FIELDS],
+            [[message.sender, message.text, message.timestamp] for message in context] if context else None,
+        ]
+        return zlib.compress(json.dumps(state, separators=(',', ':')).encode('utf-8'))
+
+    @classmethod
+    def from_bytes(cls, blob):
+        """Rebuild a session written by to_bytes; raises ValueError for anything else"""
+        try:
+            version, context_size, scalars, containers, context = json.loads(zlib.decompress(blob))
+        except (zlib.error, UnicodeDecodeError, TypeError, ValueError) as e:
+            raise ValueError(f"Unreadable session: {e}") from e
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unknown session format {version}")
+        user_session = cls.__new__(cls)
+        for name, value in zip(SCALAR_FIELDS, scalars):
+            setattr(user_session, name, value)
+        for name, value in zip(LAZY_FIELDS, containers):
+            setattr(user_session, '_' + name, value)
+        user_session.context_size = context_size
+        user_session._conversation_context = None
+        user_session.memory_context = None
+        if context:
+            user_session.conversation_context.extend(Message(*message) for message in context)
+        return user_session
+
+    def __repr__(self):
+        return f"UserSession(started={self.session_start:.0f}, messages={len(self._conversation_context or ())})"
+
+
+for _name, _factory in LAZY_FIELDS.items():
+    setattr(UserSession, _name, _lazy_field(_name, _factory))
@@ -1,4 +1,3 @@
-import requests
 from bs4 import BeautifulSoup
 import urllib.parse
 import re
@@ -7,106 +6,225 @@ from collections import Counter
 import random
 import hashlib
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timezone, timedelta
 import math
 
-def search_google(query, num_results=5):
-    """Search Google for information using a free approach"""
-    try:
-        # Using a simple Google search through their basic HTML interface
-        search_url = f"https://www.google.com/search?q={quote_plus(query)}&num={num_results}"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(search_url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        results = []
+from analysis_cache import domain_cache
+from http_client import CONNECT_TIMEOUT, READ_TIMEOUT, http_get
+from response_cache import google_cache, normalize_query, wikipedia_cache
+from single_flight import google_flight, wikipedia_flight
+from circuit_breaker import currency_breaker, google_breaker, weather_breaker, wikipedia_breaker
+from help_index import help_index
+from knowledge_base import KNOWLEDGE_DOMAINS
+from query_features import extract_query_features, register_keyword_groups
+
+# Patterns that indicate person search
+PERSON_NAME_PATTERNS = [re.compile(pattern) for pattern in [
+    r'someone called (.+)',
+    r'person named (.+)',
+    r'who is (.+)',
+    r'search (?:for|about) (.+)',
+    r'look up (.+)',
+    r'information about (.+)',
+    r'details about (.+)',
+    r'tell me about (.+)',
+    r'do you know (.+)'
+]]
+
+EXTERNAL_SEARCH_KEYWORDS = {
+    # Questions that typically need external knowledge
+    'phrase': [
+        'what is', 'who is', 'when was', 'where is', 'how does', 'why does',
+        'history of', 'facts about', 'definition of', 'explain', 'tell me about',
+        'current', 'latest', 'recent', 'news about', 'update on', 'search for',
+        'look up', 'find information', 'information about', 'details about'
+    ],
+
+    # Topics that benefit from external sources
+    'topic': [
+        'scientific', 'historical', 'biography', 'geography', 'technology news',
+        'medical', 'space', 'physics', 'chemistry', 'biology', 'mathematics',
+        'person', 'people', 'celebrity', 'politician', 'scientist', 'inventor'
+    ],
+
+    # Person search patterns
+    'person': [
+        'someone called', 'person named', 'who is', 'information about',
+        'search for', 'look up', 'do you know'
+    ],
+
+    'factual': ['fact', 'information', 'details', 'research', 'search']
+}
+
+SPECIAL_QUERY_KEYWORDS = {
+    'time': ['time', 'current time', 'what time']
+}
+
+# domain -> (trigger words, score boost) applied on top of the keyword counts
+DOMAIN_BOOSTS = {
+    # Boost Netra for service-related queries
+    'netra': (['service', 'provider', 'book', 'hire', 'clean', 'repair', 'netra', 'aidnest'], 3),
+    # Boost science for factual queries
+    'science': (['fact', 'science', 'history', 'research', 'study'], 2),
+    # Boost calculations for math queries
+    'calculations': (['calculate', 'compute', 'solve', 'math', 'equation'], 3),
+    # Boost physics for physics queries
+    'physics': (['physics', 'force', 'motion', 'energy', 'electric', 'electricity'], 3),
+    # Boost biology for biology queries
+    'biology': (['biology', 'cell', 'cellular', 'dna', 'genetics', 'ecosystem'], 3),
+    # Boost chemistry for chemistry queries
+    'chemistry': (['chemistry', 'reaction', 'molecule', 'molecular', 'atom', 'atomic', 'mechanism'], 3)
+}
+
+TIME_LOCATION_PATTERN = re.compile(r'(?:in|at)?\s*([^.?]+)?')
+CURRENCY_PATTERN = re.compile(r'(?:currency|exchange rate|convert)\s+([^.?]+)')
+WEATHER_PATTERN = re.compile(r'(?:weather|temperature)\s*(?:in|at)?\s*([^.?]+)')
+
+register_keyword_groups('external', EXTERNAL_SEARCH_KEYWORDS)
+register_keyword_groups('special', SPECIAL_QUERY_KEYWORDS)
+register_keyword_groups('domain', {domain: info['keywords'] for domain, info in KNOWLEDGE_DOMAINS.items()})
+register_keyword_groups('domain_boost', {domain: words for domain, (words, boost) in DOMAIN_BOOSTS.items()})
+
+# External research runs on a bounded pool; a request waits at most RESEARCH_DEADLINE
+# seconds in total and then uses whichever lookups have finished
+RESEARCH_DEADLINE = float(os.environ.get("RESEARCH_DEADLINE", 4.0))
+RESEARCH_WORKERS = int(os.environ.get("RESEARCH_WORKERS", 8))
+research_pool = ThreadPoolExecutor(max_workers=RESEARCH_WORKERS, thread_name_prefix='research')
+
+def research_timeout(deadline):
+    """HTTP (connect, read) timeouts that end by the research deadline (the defaults without one)"""
+    if deadline is None:
+        return None
+    remaining = max(0.1, deadline - time.monotonic())
+    return (min(CONNECT_TIMEOUT, remaining), min(READ_TIMEOUT, remaining))
+
+def deadline_passed(deadline):
+    """True once the request that wanted this lookup has stopped waiting for it"""
+    return deadline is not None and time.monotonic() >= deadline
+
+# Help center passages added to the context of Netra questions
+NETRA_INFO_PASSAGES = 3
+
+def _fetch_google(query, num_results, deadline=None):
+    """Scrape one Google results page; raises on HTTP errors so they are not cached"""
+    # Using a simple Google search through their basic HTML interface
+    search_url = f"https://www.google.com/search?q={quote_plus(query)}&num={num_results}"
+    
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    }
+    
+    response = http_get(search_url, upstream='google', headers=headers, timeout=research_timeout(deadline))
+    response.raise_for_status()
+    soup = BeautifulSoup(response.content, 'html.parser')
+    
+    results = []
+    
+    # Extract search results
+    for g in soup.find_all('div', class_='g'):
+        title_element = g.find('h3')
+        link_element = g.find('a')
+        desc_element = g.find('span', class_='aCOpRe')
         
-        # Extract search results
-        for g in soup.find_all('div', class_='g'):
-            title_element = g.find('h3')
-            link_element = g.find('a')
-            desc_element = g.find('span', class_='aCOpRe')
+        if title_element and link_element:
+            title = title_element.get_text()
+            link = link_element.get('href')
+            description = desc_element.get_text() if desc_element else "No description available"
             
-            if title_element and link_element:
-                title = title_element.get_text()
-                link = link_element.get('href')
-                description = desc_element.get_text() if desc_element else "No description available"
-                
-                # Clean the link
-                if link.startswith('/url?q='):
-                    link = link[7:].split('&')[0]
-                
-                results.append({
-                    'title': title,
-                    'link': link,
-                    'description': description[:200]  # Limit description length
-                })
-                
-                if len(results) >= num_results:
-                    break
-        
-        return results
+            # Clean the link
+            if link.startswith('/url?q='):
+                link = link[7:].split('&')[0]
+            
+            results.append({
+                'title': title,
+                'link': link,
+                'description': description[:200]  # Limit description length
+            })
+            
+            if len(results) >= num_results:
+                break
+    
+    return results
+
+def search_google(query, num_results=5, deadline=None):
+    """Search Google for information using a free approach (cached, including empty pages)"""
+    try:
+        key = f"{num_results}:{normalize_query(query)}"
+        if deadline_passed(deadline):
+            # Queued behind slower lookups until the request gave up: nobody wants the result
+            return []
+        # Concurrent misses for the same query share one fetch
+        return google_cache.get_or_fetch(
+            key, lambda: google_flight.do(
+                key, lambda: google_breaker.call(lambda: _fetch_google(query, num_results, deadline))
+            )
+        )
         
     except Exception as e:
         print(f"Google search error: {e}")
         return []
 
-def search_wikipedia(query):
-    """Search Wikipedia for information"""
-    try:
-        # Search Wikipedia API
-        search_url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{quote_plus(query)}"
-        
-        response = requests.get(search_url, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            return {
-                'title': data.get('title', ''),
-                'extract': data.get('extract', ''),
-                'url': data.get('content_urls', {}).get('desktop', {}).get('page', ''),
-                'thumbnail': data.get('thumbnail', {}).get('source', '')
-            }
-        else:
-            # Try search instead of direct page
-            search_url = f"https://en.wikipedia.org/w/api.php?action=query&list=search&srsearch={quote_plus(query)}&format=json&srlimit=1"
-            response = requests.get(search_url, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data['query']['search']:
-                    page_title = data['query']['search'][0]['title']
-                    return search_wikipedia(page_title)  # Recursive call with exact title
-            
+def _fetch_wikipedia(query, allow_search=True, deadline=None):
+    """Look up a page summary, falling back to a title search; None means no article"""
+    # Search Wikipedia API
+    search_url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{quote_plus(query)}"
+    
+    response = http_get(search_url, upstream='wikipedia', timeout=research_timeout(deadline))
+    
+    if response.status_code == 200:
+        data = response.json()
+        return {
+            'title': data.get('title', ''),
+            'extract': data.get('extract', ''),
+            'url': data.get('content_urls', {}).get('desktop', {}).get('page', ''),
+            'thumbnail': data.get('thumbnail', {}).get('source', '')
+        }
+    
+    # Server trouble is an error, not an answer - do not let it be cached as "no article"
+    if response.status_code == 429 or response.status_code >= 500:
+        response.raise_for_status()
+    
+    if not allow_search:
         return None
+    
+    # Try search instead of direct page
+    search_url = f"https://en.wikipedia.org/w/api.php?action=query&list=search&srsearch={quote_plus(query)}&format=json&srlimit=1"
+    response = http_get(search_url, upstream='wikipedia', timeout=research_timeout(deadline))
+    response.raise_for_status()
+    
+    data = response.json()
+    if data['query']['search']:
+        page_title = data['query']['search'][0]['title']
+        return _fetch_wikipedia(page_title, allow_search=False, deadline=deadline)  # Exact title, no second search
+    
+    return None
+
+def search_wikipedia(query, deadline=None):
+    """Search Wikipedia for information (cached, including misses)"""
+    try:
+        key = normalize_query(query)
+        if deadline_passed(deadline):
+            # Queued behind slower lookups until the request gave up: nobody wants the result
+            return None
+        # Concurrent misses for the same query share one fetch
+        return wikipedia_cache.get_or_fetch(
+            key, lambda: wikipedia_flight.do(
+                key, lambda: wikipedia_breaker.call(lambda: _fetch_wikipedia(query, deadline=deadline))
+            )
+        )
         
     except Exception as e:
         print(f"Wikipedia search error: {e}")
         return None
 
-def extract_person_name(query):
+def extract_person_name(query, features=None):
     """Extract person name from search query"""
-    query_lower = query.lower()
-    
-    # Patterns that indicate person search
-    patterns = [
-        r'someone called (.+)',
-        r'person named (.+)',
-        r'who is (.+)',
-        r'search (?:for|about) (.+)',
-        r'look up (.+)',
-        r'information about (.+)',
-        r'details about (.+)',
-        r'tell me about (.+)',
-        r'do you know (.+)'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, query_lower)
+    features = extract_query_features(query, features)
+    
+    for pattern in PERSON_NAME_PATTERNS:
+        match = pattern.search(features.lower)
         if match:
             name = match.group(1).strip()
             # Clean up the name - remove question marks, extra words
@@ -127,98 +245,147 @@ def extract_person_name(query):
     
     return None
 
-def search_person_info(person_name):
-    """Enhanced search specifically for person information"""
-    try:
-        print(f"Searching for person: {person_name}")
-        
-        # Check if it's Nowamaani Donath (CEO information)
-        if 'nowamaani' in person_name.lower() or 'donath' in person_name.lower():
-            from knowledge_base import COMPANY_INFO
-            ceo_info = COMPANY_INFO['ceo']
-            return {
-                'source': 'company_database',
-                'name': ceo_info['name'],
-                'information': f"{ceo_info['title']} of {', '.join(ceo_info['companies'])}. Based in {ceo_info['location']}. {ceo_info['bio']}",
-                'url': 'https://myaidnest.com',
-                'confidence': 'high'
-            }
+def _company_person_info(person_name):
+    """Answer from our own records for people we know (the CEO)"""
+    if 'nowamaani' in person_name.lower() or 'donath' in person_name.lower():
+        from knowledge_base import COMPANY_INFO
+        ceo_info = COMPANY_INFO['ceo']
+        return {
+            'source': 'company_database',
+            'name': ceo_info['name'],
+            'information': f"{ceo_info['title']} of {', '.join(ceo_info['companies'])}. Based in {ceo_info['location']}. {ceo_info['bio']}",
+            'url': 'https://myaidnest.com',
+            'confidence': 'high'
+        }
+    return None
+
+def _submit_research(lookups):
+    """Submit {source: (breaker, function, args)} to the pool, skipping sources whose breaker is open"""
+    futures = {}
+    for source, (breaker, function, args) in lookups.items():
+        if breaker.is_open():
+            print(f"⚡ Skipping {source}: circuit open")
+            continue
+        futures[source] = research_pool.submit(function, *args)
+    return futures
+
+def _submit_person_search(person_name, deadline):
+    """Start the Wikipedia and Google biography lookups side by side"""
+    return _submit_research({
+        'wikipedia': (wikipedia_breaker, search_wikipedia, (person_name, deadline)),
+        'google': (google_breaker, search_google, (f"{person_name} biography information", 3, deadline))
+    })
+
+def _person_info_from_results(person_name, results):
+    """Pick the best biography from finished lookups - Wikipedia first, then Google"""
+    wiki_result = results.get('wikipedia')
+    if wiki_result and len(wiki_result.get('extract', '')) > 50:
+        return {
+            'source': 'wikipedia',
+            'name': person_name,
+            'information': wiki_result['extract'],
+            'url': wiki_result.get('url', ''),
+            'confidence': 'high'
+        }
+    
+    google_results = results.get('google')
+    if google_results:
+        # Combine information from multiple Google results
+        combined_info = ""
+        for result in google_results:
+            if person_name.lower() in result['title'].lower() or 'biography' in result['description'].lower():
+                combined_info += f"{result['title']}: {result['description']}\n"
         
-        # Try Wikipedia first for reliable biographical information
-        wiki_result = search_wikipedia(person_name)
-        if wiki_result and len(wiki_result.get('extract', '')) > 50:
+        if combined_info:
             return {
-                'source': 'wikipedia',
+                'source': 'google',
                 'name': person_name,
-                'information': wiki_result['extract'],
-                'url': wiki_result.get('url', ''),
-                'confidence': 'high'
+                'information': combined_info[:500],  # Limit length
+                'url': google_results[0]['link'],
+                'confidence': 'medium'
             }
-        
-        # If Wikipedia fails, try Google search
-        google_results = search_google(f"{person_name} biography information", num_results=3)
-        if google_results:
-            # Combine information from multiple Google results
-            combined_info = ""
-            for result in google_results:
-                if person_name.lower() in result['title'].lower() or 'biography' in result['description'].lower():
-                    combined_info += f"{result['title']}: {result['description']}\n"
-            
-            if combined_info:
-                return {
-                    'source': 'google',
-                    'name': person_name,
-                    'information': combined_info[:500],  # Limit length
-                    'url': google_results[0]['link'],
-                    'confidence': 'medium'
-                }
-        
-        return None
-        
-    except Exception as e:
-        print(f"Person search error: {e}")
-        return None
+    
+    return None
+
+def _await_person_info(person_name, futures, deadline):
+    """Wikipedia wins when it has a real biography, so Google is only waited for when it does not"""
+    for source in ('wikipedia', 'google'):
+        if source in futures:
+            person_info = _person_info_from_results(person_name, collect_research({source: futures[source]}, deadline))
+            if person_info:
+                return person_info
+    return None
 
-def should_search_externally(query):
+def collect_research(futures, deadline):
+    """Wait for {source: future} until the deadline; return {source: result} for those that finished"""
+    done, _ = wait(futures.values(), timeout=max(0.0, deadline - time.monotonic()))
+    
+    results = {}
+    for source, future in futures.items():
+        if future not in done:
+            # cancel() only drops lookups still queued; a running fetch cannot be stopped, which is
+            # why every lookup's HTTP timeouts are capped at the deadline (research_timeout)
+            future.cancel()
+            print(f"⏱️ Research deadline passed, skipping {source}")
+        elif future.exception() is None:
+            results[source] = future.result()
+        else:
+            print(f"{source} research error: {future.exception()}")
+    return results
+
+def should_search_externally(query, features=None):
     """Determine if a query should trigger external search - ENHANCED VERSION"""
-    query_lower = query.lower()
+    features = extract_query_features(query, features)
     
-    # Questions that typically need external knowledge
-    external_keywords = [
-        'what is', 'who is', 'when was', 'where is', 'how does', 'why does',
-        'history of', 'facts about', 'definition of', 'explain', 'tell me about',
-        'current', 'latest', 'recent', 'news about', 'update on', 'search for',
-        'look up', 'find information', 'information about', 'details about'
-    ]
-    
-    # Topics that benefit from external sources
-    external_topics = [
-        'scientific', 'historical', 'biography', 'geography', 'technology news',
-        'medical', 'space', 'physics', 'chemistry', 'biology', 'mathematics',
-        'person', 'people', 'celebrity', 'politician', 'scientist', 'inventor'
-    ]
+    # Check if query matches external search criteria
+    has_external_phrase = features.has('external', 'phrase')
+    has_external_topic = features.has('external', 'topic')
+    has_person_pattern = features.has('external', 'person')
+    is_complex_factual = len(features.words) > 3 and features.has('external', 'factual')
     
-    # Person search patterns
-    person_patterns = [
-        'someone called', 'person named', 'who is', 'information about',
-        'search for', 'look up', 'do you know'
-    ]
+    return has_external_phrase or has_external_topic or is_complex_factual or has_person_pattern
+
+def _submit_general_search(query, deadline):
+    """Start the Wikipedia and Google lookups for a factual query side by side"""
+    return _submit_research({
+        'wikipedia': (wikipedia_breaker, search_wikipedia, (query, deadline)),
+        'google': (google_breaker, search_google, (query, 3, deadline))
+    })
+
+def start_external_research(query, features=None):
+    """Submit every lookup the query needs to the research pool and return without waiting"""
+    features = extract_query_features(query, features)
+    research = {
+        'query': query,
+        'deadline': time.monotonic() + RESEARCH_DEADLINE,
+        'person_name': None,
+        'person_info': None,
+        'futures': {}
+    }
     
-    # Check if query matches external search criteria
-    has_external_phrase = any(phrase in query_lower for phrase in external_keywords)
-    has_external_topic = any(topic in query_lower for topic in external_topics)
-    has_person_pattern = any(pattern in query_lower for pattern in person_patterns)
-    is_complex_factual = len(query.split()) > 3 and any(word in query_lower for word in ['fact', 'information', 'details', 'research', 'search'])
+    try:
+        # Check if this is a person search
+        person_name = extract_person_name(query, features)
+        if person_name:
+            print(f"Detected person search for: {person_name}")
+            research['person_name'] = person_name
+            research['person_info'] = _company_person_info(person_name)
+            if not research['person_info']:
+                research['futures'] = _submit_person_search(person_name, research['deadline'])
+        
+        # Only search for complex or factual queries
+        elif should_search_externally(query, features):
+            print(f"Searching externally for: {query}")
+            research['futures'] = _submit_general_search(query, research['deadline'])
     
-    # Special case: Direct requests to search for people
-    is_person_search = any(indicator in query_lower for indicator in [
-        'search about', 'look up', 'find info', 'information on', 'who is'
-    ]) and any(word in query_lower for word in ['called', 'named', 'person', 'someone'])
+    except Exception as e:
+        print(f"External knowledge error: {e}")
     
-    return has_external_phrase or has_external_topic or is_complex_factual or has_person_pattern or is_complex_factual
+    return research
 
-def get_external_knowledge(query):
-    """Get information from external sources (Google + Wikipedia) - ENHANCED VERSION"""
+def finish_external_research(research, features=None):
+    """Collect what started research found by its deadline"""
+    query = research['query']
     external_info = {
         'google_results': [],
         'wikipedia_result': None,
@@ -227,31 +394,35 @@ def get_external_knowledge(query):
     }
     
     try:
-        # Check if this is a person search
-        person_name = extract_person_name(query)
-        if person_name:
-            print(f"Detected person search for: {person_name}")
-            person_info = search_person_info(person_name)
+        futures = research['futures']
+        
+        if research['person_name']:
+            person_info = research['person_info'] or _await_person_info(
+                research['person_name'], futures, research['deadline']
+            )
             if person_info:
                 external_info['person_info'] = person_info
                 external_info['sources_used'].append(person_info['source'])
                 return external_info
-        
-        # Only search for complex or factual queries
-        if should_search_externally(query):
-            print(f"Searching externally for: {query}")
-            
-            # Search Wikipedia first (more reliable for facts)
-            wiki_result = search_wikipedia(query)
-            if wiki_result and len(wiki_result.get('extract', '')) > 50:
-                external_info['wikipedia_result'] = wiki_result
-                external_info['sources_used'].append('wikipedia')
             
-            # Search Google for additional context
-            google_results = search_google(query, num_results=3)
-            if google_results:
-                external_info['google_results'] = google_results
-                external_info['sources_used'].append('google')
+            # No biography found - fall back to a general search within what is left of the deadline
+            futures = {}
+            if time.monotonic() < research['deadline'] and should_search_externally(query, features):
+                print(f"Searching externally for: {query}")
+                futures = _submit_general_search(query)
+        
+        results = collect_research(futures, research['deadline'])
+        
+        # Wikipedia first (more reliable for facts), Google for additional context
+        wiki_result = results.get('wikipedia')
+        if wiki_result and len(wiki_result.get('extract', '')) > 50:
+            external_info['wikipedia_result'] = wiki_result
+            external_info['sources_used'].append('wikipedia')
+        
+        google_results = results.get('google')
+        if google_results:
+            external_info['google_results'] = google_results
+            external_info['sources_used'].append('google')
         
         return external_info
         
@@ -259,6 +430,11 @@ def get_external_knowledge(query):
         print(f"External knowledge error: {e}")
         return external_info
 
+def get_external_knowledge(query, features=None):
+    """Get information from external sources (Google + Wikipedia) - ENHANCED VERSION"""
+    features = extract_query_features(query, features)
+    return finish_external_research(start_external_research(query, features), features)
+
 def get_current_time(timezone_str=None):
     """Get current time in different timezones - ENHANCED FOR EAST AFRICA"""
     try:
@@ -309,11 +485,20 @@ def get_current_time(timezone_str=None):
         print(f"Timezone error: {e}")
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S EAT")
 
+def _breaker_get(breaker, url, **kwargs):
+    """GET through a circuit breaker; network errors, 429 and 5xx count as failures (a 404 does not)"""
+    def fetch():
+        response = http_get(url, **kwargs)
+        if response.status_code == 429 or response.status_code >= 500:
+            response.raise_for_status()
+        return response
+    return breaker.call(fetch)
+
 def get_currency_rates(base_currency='USD'):
     """Get current currency exchange rates"""
     try:
         # Using a free currency API
-        response = requests.get(f'https://api.exchangerate-api.com/v4/latest/{base_currency}', timeout=10)
+        response = _breaker_get(currency_breaker, f'https://api.exchangerate-api.com/v4/latest/{base_currency}', upstream='currency')
         if response.status_code == 200:
             data = response.json()
             rates = data.get('rates', {})
@@ -339,9 +524,10 @@ def get_weather(city="Nairobi"):
         if not api_key:
             return None
             
-        response = requests.get(
+        response = _breaker_get(
+            weather_breaker,
             f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric",
-            timeout=10
+            upstream='weather'
         )
         if response.status_code == 200:
             data = response.json()
@@ -357,20 +543,20 @@ def get_weather(city="Nairobi"):
         print(f"Weather API error: {e}")
         return None
 
-def handle_special_queries(message):
+def handle_special_queries(message, features=None):
     """Handle special queries like time, weather, calculations, etc."""
-    message_lower = message.lower()
+    features = extract_query_features(message, features)
+    message_lower = features.lower
     
     # Time queries
-    if any(word in message_lower for word in ['time', 'current time', 'what time']):
-        time_match = re.search(r'(?:in|at)?\s*([^.?]+)?', message_lower)
+    if features.has('special', 'time'):
+        time_match = TIME_LOCATION_PATTERN.search(message_lower)
         location = time_match.group(1) if time_match and time_match.group(1) else None
         current_time = get_current_time(location.strip() if location else None)
         return f"⏰ {current_time}"
     
     # Currency queries
-    currency_pattern = r'(?:currency|exchange rate|convert)\s+([^.?]+)'
-    currency_match = re.search(currency_pattern, message_lower)
+    currency_match = CURRENCY_PATTERN.search(message_lower)
     if currency_match:
         currency_query = currency_match.group(1)
         rates = get_currency_rates()
@@ -381,8 +567,7 @@ def handle_special_queries(message):
             return "I couldn't fetch current exchange rates. Please check a financial website for the most up-to-date information."
     
     # Weather queries
-    weather_pattern = r'(?:weather|temperature)\s*(?:in|at)?\s*([^.?]+)'
-    weather_match = re.search(weather_pattern, message_lower)
+    weather_match = WEATHER_PATTERN.search(message_lower)
     if weather_match:
         city = weather_match.group(1).strip()
         weather = get_weather(city)
@@ -393,54 +578,30 @@ def handle_special_queries(message):
     
     return None
 
-def analyze_query_domain(query):
-    """Analyze which knowledge domains are relevant to the query"""
-    from knowledge_base import KNOWLEDGE_DOMAINS
-    
-    query_lower = query.lower()
-    domain_scores = {}
-    
-    for domain, info in KNOWLEDGE_DOMAINS.items():
-        score = 0
-        for keyword in info['keywords']:
-            if keyword in query_lower:
-                score += 1
-        domain_scores[domain] = score
-    
-    # Boost Netra for service-related queries
-    if any(word in query_lower for word in ['service', 'provider', 'book', 'hire', 'clean', 'repair', 'netra', 'aidnest']):
-        domain_scores['netra'] = domain_scores.get('netra', 0) + 3
-    
-    # Boost science for factual queries
-    if any(word in query_lower for word in ['fact', 'science', 'history', 'research', 'study']):
-        domain_scores['science'] = domain_scores.get('science', 0) + 2
-    
-    # Boost calculations for math queries
-    if any(word in query_lower for word in ['calculate', 'compute', 'solve', 'math', 'equation']):
-        domain_scores['calculations'] = domain_scores.get('calculations', 0) + 3
-    
-    # Boost physics for physics queries
-    if any(word in query_lower for word in ['physics', 'force', 'motion', 'energy', 'electric']):
-        domain_scores['physics'] = domain_scores.get('physics', 0) + 3
+def _score_query_domains(features):
+    """Rank knowledge domains by keyword hits plus topic boosts"""
+    domain_scores = {
+        domain: len(features.hits('domain', domain))
+        for domain in KNOWLEDGE_DOMAINS
+    }
     
-    # Boost biology for biology queries
-    if any(word in query_lower for word in ['biology', 'cell', 'dna', 'genetics', 'ecosystem']):
-        domain_scores['biology'] = domain_scores.get('biology', 0) + 3
-    
-    # Boost chemistry for chemistry queries
-    if any(word in query_lower for word in ['chemistry', 'reaction', 'molecule', 'atom', 'mechanism']):
-        domain_scores['chemistry'] = domain_scores.get('chemistry', 0) + 3
+    for domain, (words, boost) in DOMAIN_BOOSTS.items():
+        if features.has('domain_boost', domain):
+            domain_scores[domain] = domain_scores.get(domain, 0) + boost
     
     # Sort by relevance
     sorted_domains = sorted(domain_scores.items(), key=lambda x: x[1], reverse=True)
     relevant_domains = [domain for domain, score in sorted_domains if score > 0]
     
-    return relevant_domains[:3] if relevant_domains else ['general_tech']
+    return tuple(relevant_domains[:3]) if relevant_domains else ('general_tech',)
+
+def analyze_query_domain(query, features=None):
+    """Analyze which knowledge domains are relevant to the query"""
+    features = extract_query_features(query, features)
+    return list(domain_cache.get_or_compute(features.cache_key, lambda: _score_query_domains(features)))
 
 def build_diverse_context(user_session, relevant_domains, query, external_info):
     """Build context for diverse knowledge domains - ENHANCED VERSION"""
-    from knowledge_base import KNOWLEDGE_DOMAINS
-    
     context_parts = []
     
     # Add Netra context for service-related queries
@@ -478,28 +639,32 @@ def build_diverse_context(user_session, relevant_domains, query, external_info):
         
         context_parts.append(external_context)
     
-    # Add memory context
+    # Count domain usage first, so the memory context below (and the copy in the system prompt) includes this query
     from session_manager import get_memory_context
-    memory_context = get_memory_context(user_session)
-    if memory_context != "New conversation":
-        context_parts.append(f"CONVERSATION MEMORY:\n{memory_context}")
-    
-    # Add domain-specific context
     domain_descriptions = []
     for domain in relevant_domains:
         domain_info = KNOWLEDGE_DOMAINS[domain]
         domain_descriptions.append(f"{domain_info['name']}: {domain_info['description']}")
-        user_session['knowledge_usage'] = user_session.get('knowledge_usage', {})
-        user_session['knowledge_usage'][domain] = user_session['knowledge_usage'].get(domain, 0) + 1
+        knowledge_usage = user_session.knowledge_usage
+        knowledge_usage[domain] = knowledge_usage.get(domain, 0) + 1
     
+    # Add memory context
+    memory_context = get_memory_context(user_session)
+    if memory_context != "New conversation":
+        context_parts.append(f"CONVERSATION MEMORY:\n{memory_context}")
+    
+    # Add domain-specific context
     context_parts.append(f"RELEVANT KNOWLEDGE DOMAINS: {', '.join(domain_descriptions)}")
     
     return "\n\n".join(context_parts)
 
 def get_dynamic_netra_info(query):
-    """Get real-time information by browsing Netra website with analysis"""
+    """Netra help center passages most relevant to the query, from the crawled and indexed corpus"""
     try:
-        return get_static_netra_info(query)  # Simplified version for now
+        passages = help_index.search(query, k=NETRA_INFO_PASSAGES)
+        if not passages:
+            return get_static_netra_info(query)
+        return '\n\n'.join(f"{passage['text']}\n(Source: {passage['url']})" for passage in passages)
     except Exception as e:
         print(f"Dynamic info error: {e}")
         return get_static_netra_info(query)